@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Pattern Generator Benchmark
+Compares the keystream backends against the original per-byte
+random.randint() generator used by the random overwrite passes.
+
+Usage: python benchmarks/bench_patterns.py [total_mib]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from secure_wipe import CHUNK_SIZE, Keystream, aligned_buffer, available_backends
+
+LEGACY_SAMPLE = 256 * 1024  # the legacy generator is far too slow for more
+
+
+def bench_legacy(size=LEGACY_SAMPLE):
+    start = time.perf_counter()
+    bytes([random.randint(0, 255) for _ in range(size)])
+    return size / (time.perf_counter() - start)
+
+
+def bench_keystream(backend, total):
+    keystream = Keystream(backend=backend)
+    buf = aligned_buffer(CHUNK_SIZE)
+    view = memoryview(buf)
+    start = time.perf_counter()
+    for offset in range(0, total, CHUNK_SIZE):
+        keystream.fill(view, offset)
+    elapsed = time.perf_counter() - start
+    view.release()
+    buf.close()
+    return total / elapsed
+
+
+def main():
+    total = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 256 * 1024 * 1024
+    legacy = bench_legacy()
+    print(f"{'generator':<22}{'MB/s':>12}{'speedup':>12}")
+    print(f"{'random.randint (old)':<22}{legacy / 1e6:>12.2f}{1:>11.0f}x")
+    for backend in available_backends():
+        rate = bench_keystream(backend, total)
+        print(f"{backend:<22}{rate / 1e6:>12.2f}{rate / legacy:>11.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Pipeline Benchmark
+Measures random-pass throughput with pattern generation and writes taking
+turns (pipeline off) against the producer/consumer pipeline, for every
+keystream backend. The file is synced after each pass, so the disk time is
+included.
+
+Usage: python benchmarks/bench_pipeline.py [file_mib] [passes] [io_mode]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from secure_wipe import OverwriteEngine, available_backends, make_schedule
+from secure_wipe.patterns import RandomPattern
+
+
+def bench(path, passes, io_mode, backend, pipeline):
+    schedule = make_schedule('random', passes)
+    engine = OverwriteEngine(io_mode=io_mode, schedule=schedule, pipeline=pipeline)
+    # Pin the keystream backend for this run
+    engine.patterns = lambda count: [RandomPattern(backend=backend) for _ in range(count)]
+    with engine:
+        start = time.perf_counter()
+        engine.overwrite(path, passes)
+        elapsed = time.perf_counter() - start
+    return engine.bytes_written / elapsed, engine.rng_seconds, engine.write_seconds, elapsed
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 512 * 1024 * 1024
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    io_mode = sys.argv[3] if len(sys.argv) > 3 else 'buffered'
+    print(f"{size // (1024 * 1024)} MiB file, {passes} random pass(es), {io_mode} I/O, sync per pass")
+    print(f"{'backend':<10}{'pipeline':<10}{'MB/s':>10}{'rng s':>10}{'write s':>10}{'wall s':>10}{'speedup':>10}")
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        path = Path(tmp) / "target.bin"
+        with open(path, 'wb') as f:
+            for _ in range(size // (1024 * 1024)):
+                f.write(os.urandom(1024 * 1024))
+        for backend in available_backends():
+            baseline = None
+            for pipeline in (False, True):
+                rate, rng, write, wall = bench(path, passes, io_mode, backend, pipeline)
+                baseline = baseline or rate
+                print(f"{backend:<10}{'on' if pipeline else 'off':<10}{rate / 1e6:>10.1f}{rng:>10.2f}"
+                      f"{write:>10.2f}{wall:>10.2f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
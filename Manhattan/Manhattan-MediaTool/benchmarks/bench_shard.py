@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Sharded Overwrite Benchmark
+Overwrites one large file with a growing number of range workers. Every pass
+is synced before the next starts, so the device time is included.
+
+Usage: python benchmarks/bench_shard.py [file_mib] [shard_counts] [io_mode] [passes]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from secure_wipe import ShardedOverwriter
+
+
+def bench(path, shards, passes, io_mode):
+    with ShardedOverwriter(shards, 0, io_mode=io_mode) as sharder:
+        start = time.perf_counter()
+        sharder.overwrite(path, passes)
+        elapsed = time.perf_counter() - start
+    return sharder.bytes_written / elapsed, elapsed
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 512 * 1024 * 1024
+    counts = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 2, 4, 8]
+    io_mode = sys.argv[3] if len(sys.argv) > 3 else 'buffered'
+    passes = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+    print(f"{size // (1024 * 1024)} MiB file, {passes} pass(es), {io_mode} I/O, sync per pass")
+    print(f"{'shards':<10}{'MB/s':>10}{'wall s':>10}{'speedup':>10}")
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        path = Path(tmp) / "target.bin"
+        with open(path, 'wb') as f:
+            for _ in range(size // (1024 * 1024)):
+                f.write(os.urandom(1024 * 1024))
+        baseline = None
+        for shards in counts:
+            rate, wall = bench(path, shards, passes, io_mode)
+            baseline = baseline or rate
+            print(f"{shards:<10}{rate / 1e6:>10.1f}{wall:>10.2f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Small-File Benchmark
+Measures files per second for many tiny files: the per-file path (one
+overwrite with a sync per pass, then unlink) against SmallFileBatcher.
+
+Usage: python benchmarks/bench_small_files.py [files] [file_bytes] [durability]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from secure_wipe import OverwriteEngine, SmallFileBatcher, make_policy
+
+
+def make_files(directory, count, size):
+    paths = []
+    for i in range(count):
+        path = Path(directory) / f"f{i:06d}.dat"
+        path.write_bytes(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def bench_per_file(paths, policy):
+    start = time.perf_counter()
+    with OverwriteEngine(durability=make_policy(policy)) as engine:
+        for path in paths:
+            engine.overwrite(path, passes=3)
+            engine.unlink(path)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def bench_batched(paths, policy):
+    start = time.perf_counter()
+    with OverwriteEngine(durability=make_policy(policy)) as engine, SmallFileBatcher(engine, passes=3) as batcher:
+        results = []
+        for path in paths:
+            results += batcher.add(path, 0)
+        results += batcher.flush()
+    assert all(result.ok for result in results)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    policy = sys.argv[3] if len(sys.argv) > 3 else 'pass'
+    print(f"{count} files of {size} bytes, 3 passes, '{policy}' durability")
+    print(f"{'path':<22}{'files/s':>12}{'speedup':>12}")
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        baseline = bench_per_file(make_files(tmp, count, size), policy)
+        print(f"{'per-file (old)':<22}{baseline:>12.0f}{1:>11.1f}x")
+        batched = bench_batched(make_files(tmp, count, size), policy)
+        print(f"{'batched':<22}{batched:>12.0f}{batched / baseline:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Benchmark Suite
+Reproducible benchmarks for the sanitization hot paths on plain Linux:
+- secure_overwrite_file across file sizes and pass schedules
+- calculate_vc_hash on large credential batches
+- drive discovery from sysfs, full scan and cached refresh (fake sysfs tree)
+- the ISO write path (image copied to the target, synced at the end)
+
+Each case runs on every available target: a temp directory on disk, tmpfs
+(/dev/shm) and an ext4 file-backed loop image (root only). Results are saved
+as JSON; `compare` reports the change between two runs and exits 1 when a
+result regressed by more than the threshold.
+
+Usage: python benchmarks/bench_suite.py run [--out results.json] [--quick] [--repeat N]
+                                            [--targets disk,tmpfs,loop] [--cases overwrite,...]
+       python benchmarks/bench_suite.py compare baseline.json current.json [--threshold 0.10]
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import stat
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from secure_wipe import ALIGNMENT, CHUNK_SIZE, aligned_buffer, make_schedule
+from demo_secure_delete import secure_overwrite_file
+
+GUI_MAIN = ROOT / "sanitization_engine" / "gui" / "main.py"
+RESULTS_VERSION = 1
+MIB = 1024 * 1024
+LOOP_IMAGE_MIB = 1024
+
+# name -> (full run, --quick run)
+SIZES_MIB = ([1, 16, 256], [1, 16])
+SCHEDULE_NAMES = ['nist-clear', 'standard', 'dod']
+VC_BATCH = (20000, 2000)
+DRIVE_FIXTURE = ((24, 4, 8), (8, 2, 2))  # (disks, partitions per disk, NVMe namespaces)
+DRIVE_CALLS = (50, 10)
+ISO_MIB = (512, 64)
+
+
+class Skip(Exception):
+    """A case or target cannot run on this machine; the reason is recorded"""
+
+
+# --- targets ---------------------------------------------------------------
+
+@contextlib.contextmanager
+def disk_target():
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        yield Path(tmp)
+
+
+@contextlib.contextmanager
+def tmpfs_target():
+    shm = Path('/dev/shm')
+    if _fstype(shm) != 'tmpfs':
+        raise Skip("/dev/shm is not a tmpfs mount")
+    with tempfile.TemporaryDirectory(dir=shm) as tmp:
+        yield Path(tmp)
+
+
+@contextlib.contextmanager
+def loop_target():
+    if not hasattr(os, 'geteuid') or os.geteuid() != 0:
+        raise Skip("loop images need root")
+    for tool in ('losetup', 'mkfs.ext4', 'mount', 'umount'):
+        if not shutil.which(tool):
+            raise Skip(f"{tool} not found")
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        image = Path(tmp) / "loop.img"
+        mountpoint = Path(tmp) / "mnt"
+        mountpoint.mkdir()
+        with open(image, 'wb') as f:
+            f.truncate(LOOP_IMAGE_MIB * MIB)
+        try:
+            device = _check(['losetup', '--find', '--show', str(image)]).strip()
+        except RuntimeError as e:
+            raise Skip(str(e))
+        try:
+            _check(['mkfs.ext4', '-q', '-F', device])
+            _check(['mount', device, str(mountpoint)])
+        except RuntimeError as e:
+            subprocess.run(['losetup', '-d', device])
+            raise Skip(str(e))
+        try:
+            yield mountpoint
+        finally:
+            subprocess.run(['umount', str(mountpoint)])
+            subprocess.run(['losetup', '-d', device])
+
+
+TARGETS = {'disk': disk_target, 'tmpfs': tmpfs_target, 'loop': loop_target}
+
+
+def _fstype(path):
+    """Filesystem type of the mount holding `path`, from /proc/mounts"""
+    best, fstype = '', None
+    path = str(Path(path).resolve())
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                mount, kind = line.split()[1:3]
+                if (path == mount or path.startswith(mount.rstrip('/') + '/')) and len(mount) > len(best):
+                    best, fstype = mount, kind
+    except OSError:
+        return None
+    return fstype
+
+
+def _check(cmd):
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)}: {result.stderr.strip() or result.returncode}")
+    return result.stdout
+
+
+# --- cases -----------------------------------------------------------------
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _result(name, unit, samples, higher_is_better=True):
+    value = statistics.median(samples)
+    return {'name': name, 'unit': unit, 'higher_is_better': higher_is_better,
+            'value': value, 'samples': samples}
+
+
+def bench_overwrite(directory, target, quick, repeat):
+    results = []
+    for size_mib in SIZES_MIB[quick]:
+        path = directory / "overwrite.bin"
+        with open(path, 'wb') as f:
+            for _ in range(size_mib):
+                f.write(os.urandom(MIB))
+        for name in SCHEDULE_NAMES:
+            schedule = make_schedule(name)
+
+            def run():
+                if not secure_overwrite_file(path, len(schedule), schedule=schedule):
+                    raise RuntimeError(f"secure_overwrite_file failed on {path}")
+
+            seconds = _timed(run, repeat)
+            rates = [size_mib * MIB * len(schedule) / s / 1e6 for s in seconds]
+            results.append(_result(f"overwrite/{target}/{size_mib}MiB/{name}", 'MB/s', rates))
+        path.unlink()
+    return results
+
+
+def bench_iso_write(directory, target, quick, repeat):
+    size = ISO_MIB[quick] * MIB
+    iso = directory / "image.iso"
+    with open(iso, 'wb') as f:
+        for _ in range(size // MIB):
+            f.write(os.urandom(MIB))
+    results = []
+    for direct in (False, True):
+        if direct and not hasattr(os, 'O_DIRECT'):
+            continue
+        usb = directory / "usb.img"
+        try:
+            seconds = _timed(lambda: write_image(iso, usb, direct), repeat)
+        except OSError as e:
+            if direct:  # e.g. tmpfs does not support O_DIRECT
+                continue
+            raise
+        mode = 'direct' if direct else 'buffered'
+        results.append(_result(f"iso_write/{target}/{mode}", 'MB/s', [size / s / 1e6 for s in seconds]))
+        usb.unlink()
+    iso.unlink()
+    return results
+
+
+def write_image(source, device, direct=False, chunk_size=CHUNK_SIZE):
+    """Copy an ISO onto a device (or image file) and sync it, as `dd conv=fsync` would"""
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_DIRECT if direct else 0)
+    buf = aligned_buffer(chunk_size)
+    view = memoryview(buf)
+    fd = os.open(device, flags, 0o600)
+    try:
+        with open(source, 'rb', buffering=0) as src:
+            offset = 0
+            while True:
+                n = src.readinto(view)
+                if not n:
+                    break
+                # O_DIRECT writes whole aligned blocks; the tail block is zero padded
+                length = -(-n // ALIGNMENT) * ALIGNMENT if direct else n
+                view[n:length] = bytes(length - n)
+                os.pwrite(fd, view[:length], offset)
+                offset += n
+        if stat.S_ISREG(os.fstat(fd).st_mode):
+            os.ftruncate(fd, offset)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+        view.release()
+        buf.close()
+
+
+def _load_gui():
+    """The sanitization GUI module, loaded from its file; needs PyQt5 installed"""
+    spec = importlib.util.spec_from_file_location("sanitization_gui", GUI_MAIN)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        raise Skip(f"sanitization GUI not importable: {e}")
+    return module.SanitizationEngineGUI
+
+
+def bench_vc_hash(quick, repeat):
+    gui = _load_gui()
+    count = VC_BATCH[quick]
+    batch = [gui.generate_verifiable_credential(None, {
+        'serial': f"WD-BENCH-{i:06d}", 'name': f"/dev/sd{i % 26:c}", 'model': "WDC WD40EFRX",
+        'size': "3.6T", 'tran': 'sata', 'type': 'disk'}, 'ATA Secure Erase') for i in range(count)]
+    seconds = _timed(lambda: [gui.calculate_vc_hash(None, vc) for vc in batch], repeat)
+    return [_result(f"vc_hash/batch{count}", 'hashes/s', [count / s for s in seconds])]
+
+
+def _attrs(directory, **attrs):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, value in attrs.items():
+        (directory / name).write_text(f"{value}\n")
+
+
+def drive_fixture(root, disks, partitions, namespaces):
+    """A sysfs tree (block devices, NVMe controllers) for a synthetic wipe station; returns its /sys"""
+    sysfs = root / 'sys'
+    (sysfs / 'block').mkdir(parents=True)
+    (sysfs / 'class' / 'nvme').mkdir(parents=True)
+    for i in range(disks):
+        name = f"sd{chr(97 + i % 26)}{'' if i < 26 else i // 26}"
+        device = sysfs / 'devices' / 'pci0000:00' / '0000:00:17.0' / f"ata{i + 1}" / f"host{i}" / f"{i}:0:0:0"
+        _attrs(device, model="WDC WD40EFRX-68N32N0", wwid=f"t10.ATA     WDC WD40EFRX-68N32N0 WD-WCC7K{i:07d}")
+        block = device / 'block' / name
+        _attrs(block, dev=f"8:{i * 16}", size=7814037168, removable=0, ro=0)
+        _attrs(block / 'queue', rotational=1)
+        (block / 'device').symlink_to('../..')
+        for p in range(partitions):
+            _attrs(block / f"{name}{p + 1}", dev=f"8:{i * 16 + p + 1}", size=1887436800, partition=p + 1)
+        (sysfs / 'block' / name).symlink_to(block)
+    for n in range(namespaces):
+        ctrl = sysfs / 'devices' / 'pci0000:00' / f"0000:{n + 1:02x}:00.0" / 'nvme' / f"nvme{n}"
+        _attrs(ctrl, model="Samsung SSD 980 PRO 2TB", serial=f"S6B0NL0T{n:07d}")
+        block = ctrl / f"nvme{n}n1"
+        _attrs(block, dev=f"259:{n}", size=3907029168, removable=0, ro=0, wwid=f"eui.002538b{n:07d}")
+        _attrs(block / 'queue', rotational=0)
+        (block / 'device').symlink_to('..')
+        (sysfs / 'block' / f"nvme{n}n1").symlink_to(block)
+        (sysfs / 'class' / 'nvme' / f"nvme{n}").symlink_to(ctrl)
+    return sysfs
+
+
+def bench_drive_discovery(quick, repeat):
+    """Drive list refreshes from sysfs: a full scan, and a refresh with the inventory cached"""
+    sys.path.insert(0, str(ROOT / "sanitization_engine"))
+    from drive_tools import DriveInventory
+
+    disks, partitions, namespaces = DRIVE_FIXTURE[quick]
+    calls = DRIVE_CALLS[quick]
+    expected = disks * (1 + partitions) + namespaces  # each NVMe namespace once, no matter how many tools see it
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sysfs = drive_fixture(Path(tmp), disks, partitions, namespaces)
+        mounts = Path(tmp) / 'mounts'
+        mounts.write_text('')
+        inventory = DriveInventory(str(sysfs), str(Path(tmp) / 'udev'), str(mounts))
+        for mode, refresh in (('scan', True), ('cached', False)):
+            def run():
+                for _ in range(calls):
+                    drives = inventory.drives(refresh)
+                found = len(drives) + sum(len(d.partitions) for d in drives)
+                if found != expected:
+                    raise RuntimeError(f"discovery found {found} devices, expected {expected}")
+
+            seconds = _timed(run, repeat)
+            name = f"drive_discovery/{disks}disks_{partitions}parts_{namespaces}nvme/{mode}"
+            results.append(_result(name, 'ms/refresh', [s / calls * 1000 for s in seconds], higher_is_better=False))
+    return results
+
+
+TARGET_CASES = {'overwrite': bench_overwrite, 'iso_write': bench_iso_write}
+CPU_CASES = {'vc_hash': bench_vc_hash, 'drive_discovery': bench_drive_discovery}
+
+
+# --- run / compare ---------------------------------------------------------
+
+def run_suite(targets, cases, quick=False, repeat=3):
+    report = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpus': os.cpu_count(), 'quick': quick, 'repeat': repeat},
+        'results': [],
+        'skipped': {},
+    }
+
+    def record(label, fn):
+        try:
+            for result in fn():
+                report['results'].append(result)
+                print(f"{result['name']:<48}{result['value']:>12.2f} {result['unit']}")
+        except Skip as e:
+            report['skipped'][label] = str(e)
+            print(f"{label:<48}{'skipped':>12} ({e})")
+
+    for name in cases:
+        if name in CPU_CASES:
+            record(name, lambda: CPU_CASES[name](quick, repeat))
+    target_cases = [name for name in cases if name in TARGET_CASES]
+    for target in targets if target_cases else []:
+        try:
+            with TARGETS[target]() as directory:
+                for name in target_cases:
+                    record(f"{name}/{target}", lambda: TARGET_CASES[name](directory, target, quick, repeat))
+        except Skip as e:
+            report['skipped'][target] = str(e)
+            print(f"{target:<48}{'skipped':>12} ({e})")
+    return report
+
+
+def compare(baseline, current, threshold=0.10):
+    """Print the change per result; return the names that regressed by more than `threshold`"""
+    old = {r['name']: r for r in baseline['results']}
+    regressions = []
+    print(f"{'benchmark':<48}{'baseline':>12}{'current':>12}{'change':>10}")
+    for result in current['results']:
+        before = old.get(result['name'])
+        if before is None:
+            print(f"{result['name']:<48}{'-':>12}{result['value']:>12.2f}{'new':>10}")
+            continue
+        change = result['value'] / before['value'] - 1 if before['value'] else 0.0
+        worse = -change if result['higher_is_better'] else change
+        flag = ''
+        if worse > threshold:
+            regressions.append(result['name'])
+            flag = '  REGRESSION'
+        print(f"{result['name']:<48}{before['value']:>12.2f}{result['value']:>12.2f}{change:>+9.1%}{flag}")
+    for name in sorted(old.keys() - {r["name"] for r in current["results"]}):
+        print(f"{name:<48}{old[name]['value']:>12.2f}{'-':>12}{'missing':>10}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sanitization hot paths")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="Run the suite and save the results as JSON")
+    run.add_argument('--out', default='bench_results.json')
+    run.add_argument('--quick', action='store_true', help="Smaller sizes and batches")
+    run.add_argument('--repeat', type=int, default=3, help="Samples per result; the median is reported")
+    run.add_argument('--targets', default=','.join(TARGETS))
+    run.add_argument('--cases', default=','.join([*TARGET_CASES, *CPU_CASES]))
+    cmp = sub.add_parser('compare', help="Compare two result files")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.10, help="Allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+        return 0
+
+    targets = [t for t in args.targets.split(',') if t]
+    cases = [c for c in args.cases.split(',') if c]
+    unknown = set(targets) - TARGETS.keys() | set(cases) - TARGET_CASES.keys() - CPU_CASES.keys()
+    if unknown:
+        parser.error(f"unknown target or case: {', '.join(sorted(unknown))}")
+    report = run_suite(targets, cases, quick=args.quick, repeat=max(1, args.repeat))
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {len(report['results'])} result(s) to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
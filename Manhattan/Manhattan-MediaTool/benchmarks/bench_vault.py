@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Crypto-Shredding Benchmark
+Time to destroy one file of growing size: multi-pass overwrite then unlink
+(a sync per pass) against shredding it from a vault (key destroyed, then
+the ciphertext unlinked). The one-off cost of storing the file encrypted is
+reported separately.
+
+Usage: python benchmarks/bench_vault.py [sizes_mib] [passes]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from secure_wipe import CryptoVault, OverwriteEngine
+
+
+def make_file(path, size_mib):
+    with open(path, 'wb') as f:
+        for _ in range(size_mib):
+            f.write(os.urandom(1024 * 1024))
+    return path
+
+
+def bench_overwrite(path, passes):
+    start = time.perf_counter()
+    with OverwriteEngine() as engine:
+        engine.overwrite(path, passes)
+        engine.unlink(path)
+    return time.perf_counter() - start
+
+
+def bench_vault(vault, path, name):
+    start = time.perf_counter()
+    vault.store(path, name)
+    stored = time.perf_counter() - start
+    result = vault.shred(name)
+    return stored, result.key_seconds, result.seconds
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1, 16, 256, 1024]
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f"{passes}-pass overwrite vs crypto-shred, sync per pass")
+    print(f"{'MiB':<8}{'overwrite s':>14}{'shred ms':>12}{'key ms':>10}{'speedup':>12}{'store MB/s':>12}")
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        vault = CryptoVault.create(Path(tmp) / "vault")
+        for size_mib in sizes:
+            plain = make_file(Path(tmp) / "plain.bin", size_mib)
+            stored, key, shred = bench_vault(vault, plain, f"f{size_mib}.bin")
+            overwrite = bench_overwrite(plain, passes)
+            print(f"{size_mib:<8}{overwrite:>14.3f}{shred * 1000:>12.2f}{key * 1000:>10.2f}"
+                  f"{overwrite / shred:>11.0f}x{size_mib * 1.048576 / stored:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
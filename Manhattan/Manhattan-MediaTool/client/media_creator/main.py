@@ -2,12 +2,17 @@ import sys
 import subprocess
 import platform
 import json
+from pathlib import Path
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, QFileDialog, QComboBox, QMessageBox, QHBoxLayout, QFrame, QSizePolicy
 )
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtCore import Qt
 
+# Drive discovery is shared with the sanitization engine (drive_tools)
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'sanitization_engine'))
+from drive_tools import DriveInventory, format_size
+
 DARK_STYLE = """
 QWidget {
     background-color: #232629;
@@ -66,6 +71,7 @@ class MediaCreator(QWidget):
 
         self.iso_path = None
         self.usb_devices = []
+        self.inventory = DriveInventory()
 
         main_layout = QVBoxLayout()
         main_layout.setContentsMargins(36, 28, 36, 28)
@@ -285,25 +291,17 @@ class MediaCreator(QWidget):
         return devices
 
     def _detect_usb_linux(self):
-        """Detect USB devices on Linux using lsblk"""
-        try:
-            result = subprocess.run([
-                'lsblk', '-o', 'NAME,SIZE,MODEL,TRAN,RM', '-J'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
-            
-            data = json.loads(result.stdout)
-            devices = []
-            for blk in data.get('blockdevices', []):
-                if blk.get('rm') == True or blk.get('tran') == 'usb':
-                    devices.append({
-                        'name': f"/dev/{blk['name']}",
-                        'size': blk.get('size', 'Unknown'),
-                        'model': blk.get('model', 'Unknown'),
-                        'device_path': f"/dev/{blk['name']}"
-                    })
-            return devices
-        except Exception as e:
-            return []
+        """Detect USB and removable disks on Linux from sysfs (cached until the drive topology changes)"""
+        devices = []
+        for drive in self.inventory.drives():
+            if drive.kind == 'disk' and (drive.removable or drive.tran == 'usb'):
+                devices.append({
+                    'name': drive.path,
+                    'size': format_size(drive.size),
+                    'model': drive.model or 'Unknown',
+                    'device_path': drive.path
+                })
+        return devices
 
     def flash_placeholder(self):
         QMessageBox.information(self, 'Flash', 'Media creation (flashing) will be implemented here.')
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Crypto-Shredding Vault Demo
+Stores folders encrypted in a vault so they can be destroyed later by
+destroying their keys, in constant time, instead of overwriting every byte.
+Run without arguments to store the demo folder and shred it.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from secure_wipe import KEY_SCOPES, CryptoVault, VaultError, format_bytes
+
+from demo_secure_delete import create_demo_folder, secure_delete_file, secure_delete_folder
+
+DEFAULT_VAULT = "manhattan_vault"
+
+
+def shred_line(result):
+    """One-line description of a ShredResult"""
+    return (f"{result.name}: {result.files} file(s), {format_bytes(result.bytes)}, {result.keys} key(s) destroyed; "
+            f"unrecoverable after {result.key_seconds * 1000:.1f} ms, removed after {result.seconds * 1000:.1f} ms")
+
+
+def open_vault(args):
+    try:
+        return CryptoVault(args.vault, args.master_key)
+    except VaultError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+def demo_mode(vault_path=DEFAULT_VAULT, key_scope='file'):
+    """Store the demo folder in a fresh vault, read one file back, then shred everything"""
+    demo_folder, files = create_demo_folder()
+    vault = CryptoVault.create(vault_path, key_scope)
+    count, size = vault.store_tree(demo_folder, demo_folder.name)
+    for path in files:  # the plaintext copies are overwritten the slow way
+        secure_delete_file(path)
+    demo_folder.rmdir()
+    print(f"\nStored {count} file(s), {format_bytes(size)} in {vault_path} ({key_scope} keys, {vault.backend})")
+    name = vault.names()[0]
+    print(f"Read back {name}: {b''.join(vault.read(name))[:40]!r}...")
+    print("\nShredding the folder...")
+    print(f"  {shred_line(vault.shred_dir(demo_folder.name))}")
+    print("Destroying the vault (master key)...")
+    print(f"  {shred_line(vault.destroy())}")
+    return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manhattan Project - Crypto-Shredding Vault")
+    parser.add_argument('--vault', default=DEFAULT_VAULT, help=f"vault directory (default: {DEFAULT_VAULT})")
+    parser.add_argument('--master-key', default=None, metavar='PATH',
+                        help="master key file (default: <vault>/master.key); keep it on separate media if you can")
+    sub = parser.add_subparsers(dest='command')
+    init = sub.add_parser('init', help="create a vault")
+    init.add_argument('--key-scope', choices=KEY_SCOPES, default='file',
+                      help="one data key per file, or one per vault directory")
+    store = sub.add_parser('store', help="encrypt a folder (or file) into the vault")
+    store.add_argument('source')
+    store.add_argument('--as', dest='name', default=None, help="vault name (default: the source's name)")
+    store.add_argument('--remove-source', action='store_true',
+                       help="securely delete the plaintext source after storing it")
+    sub.add_parser('list', help="list stored files")
+    extract = sub.add_parser('extract', help="decrypt a stored file")
+    extract.add_argument('name')
+    extract.add_argument('dest')
+    shred = sub.add_parser('shred', help="destroy a stored file or vault directory by destroying its keys")
+    shred.add_argument('name')
+    sub.add_parser('destroy', help="destroy the master key and the whole vault")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command is None:
+        return demo_mode(args.vault)
+    if args.command == 'init':
+        vault = CryptoVault.create(args.vault, args.key_scope, args.master_key)
+        print(f"Created vault {args.vault} ({vault.key_scope} keys, {vault.backend})")
+        return True
+    vault = open_vault(args)
+    if args.command == 'store':
+        source = Path(args.source)
+        name = args.name or source.name
+        if source.is_dir():
+            count, size = vault.store_tree(source, name)
+        else:
+            count, size = 1, vault.store(source, name)
+        print(f"Stored {count} file(s), {format_bytes(size)} as {name}")
+        if args.remove_source:
+            return secure_delete_folder(source) if source.is_dir() else secure_delete_file(source)
+    elif args.command == 'list':
+        for name in vault.names():
+            print(name)
+    elif args.command == 'extract':
+        print(f"Extracted {format_bytes(vault.extract(args.name, args.dest))} to {args.dest}")
+    elif args.command == 'shred':
+        path = vault.path(args.name)
+        result = vault.shred_dir(args.name) if path.is_dir() else vault.shred(args.name)
+        print(shred_line(result))
+    elif args.command == 'destroy':
+        print(shred_line(vault.destroy()))
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
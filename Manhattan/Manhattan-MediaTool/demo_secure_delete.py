@@ -4,11 +4,26 @@ Manhattan Project - Secure File Deletion Demo
 This script demonstrates secure file deletion by actually overwriting and deleting files.
 Creates a demo folder with sample files and then securely deletes them.
 """
+import argparse
 import os
-import random
-import sys
+import time
+from contextlib import ExitStack
+from itertools import islice
 from pathlib import Path
 
+from secure_wipe import (
+    DEFAULT_RESERVE, DURABILITY_POLICIES, FILL_FILE_BYTES, FLASH_MODES, IO_MODES, SHARD_MIN_BYTES, SMALL_FILE_THRESHOLD,
+    VERIFY_MODES, SCHEDULES, BackgroundVerifier, FileEvent, FlashWiper, FreeSpaceWiper, OverwriteEngine, ParallelWiper,
+    PassEvent, ShardedOverwriter, SmallFileBatcher, TreeWalker, WipeJournal, WipeMetrics, WipeProgress,
+    describe_verification, format_bytes, format_duration, iter_files, make_policy, make_schedule, overwrite_file,
+    plan_wipe,
+)
+from secure_wipe.durability import DEFAULT_GROUP_BYTES, DEFAULT_GROUP_FILES
+from secure_wipe.verify import DEFAULT_CONFIDENCE, DEFAULT_DEFECT_RATE
+
+PREVIEW_FILES = 20
+PROGRESS_INTERVAL = 1.0  # seconds between progress lines
+
 def create_demo_folder(base_path="manhattan_demo_folder"):
     """Create a demo folder with sample files"""
     demo_path = Path(base_path)
@@ -35,78 +50,199 @@ def create_demo_folder(base_path="manhattan_demo_folder"):
     
     return demo_path, created_files
 
-def secure_overwrite_file(file_path, passes=3):
+def secure_overwrite_file(file_path, passes=3, io_mode='buffered', schedule=None):
     """
     Securely overwrite a file with random data multiple times (NIST SP 800-88 inspired)
-    This implements a Purge-level deletion by overwriting file content
+    This implements a Purge-level deletion by overwriting file content.
+    Passes are streamed in fixed-size chunks, so memory use does not grow with file size.
+    io_mode 'direct' or 'nocache' keeps the passes out of the page cache.
+    schedule is an optional PassSchedule (see make_schedule) for the pass patterns.
     """
     file_path = Path(file_path)
     if not file_path.exists():
         return False
     
-    file_size = file_path.stat().st_size
-    
-    # Multiple overwrite passes with different patterns
-    patterns = [
-        lambda: bytes([0x00] * file_size),  # All zeros
-        lambda: bytes([0xFF] * file_size),  # All ones
-        lambda: bytes([random.randint(0, 255) for _ in range(file_size)]),  # Random
-        lambda: bytes([random.randint(0, 255) for _ in range(file_size)]),  # Random again
-    ]
-    
     try:
-        with open(file_path, 'r+b') as f:
-            for i in range(passes):
-                if i < len(patterns):
-                    pattern = patterns[i]
-                else:
-                    pattern = lambda: bytes([random.randint(0, 255) for _ in range(file_size)])
-                
-                f.seek(0)
-                f.write(pattern())
-                f.flush()
-                os.fsync(f.fileno())  # Force write to disk
-                
+        overwrite_file(file_path, passes, io_mode=io_mode, schedule=schedule)
         return True
     except Exception as e:
         print(f"Error overwriting {file_path}: {e}")
         return False
 
-def secure_delete_file(file_path, passes=3):
+def secure_delete_file(file_path, passes=3, file_size=None, engine=None):
     """
     Securely delete a file by overwriting it multiple times, then deleting it
-    Implements NIST SP 800-88 Purge-level deletion
+    Implements NIST SP 800-88 Purge-level deletion.
+    Callers that already know the size (e.g. from a DirEntry) and hold an
+    engine can pass both to avoid an extra stat and buffer allocation.
     """
     file_path = Path(file_path)
     
-    if not file_path.exists():
-        print(f"File not found: {file_path}")
-        return False
+    if file_size is None:
+        try:
+            file_size = file_path.stat().st_size
+        except FileNotFoundError:
+            print(f"File not found: {file_path}")
+            return False
     
-    file_size = file_path.stat().st_size
     print(f"\n[Secure Delete] {file_path.name} ({file_size} bytes)")
     print(f"  Step 1: Overwriting file with random data ({passes} passes)...")
     
     # Secure overwrite
-    if not secure_overwrite_file(file_path, passes):
+    try:
+        if engine is not None:
+            engine.overwrite(file_path, passes)
+            if engine.allocated < file_size:
+                print(f"  Sparse file: {engine.allocated} bytes allocated, holes skipped")
+        else:
+            overwrite_file(file_path, passes)
+    except Exception as e:
+        print(f"Error overwriting {file_path}: {e}")
         return False
     
     print(f"  Step 2: Deleting file...")
     
-    # Delete the file
+    # Delete the file (the engine's durability policy may defer the unlink
+    # until the overwrite has been synced)
     try:
-        file_path.unlink()
+        if engine is not None:
+            engine.unlink(file_path)
+        else:
+            file_path.unlink()
         print(f"  [SUCCESS] File securely deleted: {file_path.name}")
         return True
     except Exception as e:
         print(f"  [ERROR] Failed to delete file: {e}")
         return False
 
-def secure_delete_folder(folder_path, passes=3):
+def verified_line(result):
+    """One-line description of a VerifyResult"""
+    if result.detail and result.ok:
+        return result.detail
+    return f"{result.mode} read-back of {result.checked} bytes ({result.source})"
+
+def finish_verified(result, engine, folder_path):
+    """Unlink a file whose read-back matched; keep (and report) one that did not"""
+    name = os.path.relpath(result.path, folder_path)
+    if not result.ok:
+        print(f"  [ERROR] Verification failed for {name}: {result.detail} - file kept")
+        return False
+    try:
+        engine.unlink(result.path)
+    except Exception as e:
+        print(f"  [ERROR] Failed to delete file {name}: {e}")
+        return False
+    print(f"  [VERIFIED] {name}: {verified_line(result)}; file deleted")
+    return True
+
+def report_batch(results, passes, folder_path):
+    """Print the outcome of a small-file batch; returns the number deleted"""
+    if not results:
+        return 0
+    print(f"\n[Batch] {len(results)} small files overwritten together ({passes} passes)")
+    success_count = 0
+    for result in results:
+        name = os.path.relpath(result.path, folder_path)
+        if result.ok:
+            success_count += 1
+            print(f"  [SUCCESS] {name} ({result.size} bytes)")
+        else:
+            print(f"  [ERROR] {name}: {result.error}")
+    return success_count
+
+def report_flash(result, folder_path):
+    """Print a FlashResult; returns 1 for the success count, 0 for a file kept after failed verification"""
+    name = os.path.relpath(result.path, folder_path)
+    reason = f" ({result.reason})" if result.reason else ""
+    print(f"[Flash] {name} ({result.size} bytes): {result.strategy}{reason} in {result.seconds * 1000:.1f} ms")
+    if result.verify is None:
+        return 1
+    if not result.verify.ok:
+        print(f"  [ERROR] Verification failed for {name}: {result.verify.detail} - file kept")
+        return 0
+    print(f"  [VERIFIED] {name}: {verified_line(result.verify)}")
+    return 1
+
+def wipe_sequential(walker, engine, passes, folder_path, verifier=None, batcher=None, sharder=None, flash=None):
     """
-    Securely delete all files in a folder, then delete the folder
+    Wipe the walker's files one at a time. Files on flash devices the
+    FlashWiper accepts are deallocated and discarded instead of overwritten.
+    Files the batcher accepts are wiped together in small-file batches,
+    files the sharder accepts are split into ranges overwritten by several
+    workers at once. With a BackgroundVerifier each other file is read back
+    on the verifier's thread while the next one is overwritten, and unlinked
+    only once it has passed.
+    Returns (success_count, total).
+    """
+    success_count = 0
+    total = 0
+    for total, entry in enumerate(walker, 1):
+        st = entry.stat(follow_symlinks=False)
+        size = st.st_size
+        if flash is not None and flash.accepts(entry.path, st.st_dev):
+            try:
+                success_count += report_flash(flash.wipe(entry.path, size), folder_path)
+            except Exception as e:
+                print(f"  [ERROR] Error wiping {entry.path}: {e}")
+            continue
+        if batcher is not None and batcher.accepts(size):
+            success_count += report_batch(batcher.add(entry.path, size), passes, folder_path)
+            continue
+        wiper = engine
+        if sharder is not None and sharder.accepts(size):
+            wiper = sharder
+            print(f"\n[Sharded] {os.path.relpath(entry.path, folder_path)}: {sharder.shards} range workers")
+        if verifier is None:
+            success_count += secure_delete_file(entry.path, passes, size, wiper)
+            continue
+        print(f"\n[Secure Delete] {os.path.relpath(entry.path, folder_path)} ({size} bytes)")
+        print(f"  Step 1: Overwriting file ({passes} passes)...")
+        try:
+            wiper.overwrite(entry.path, passes)
+        except Exception as e:
+            print(f"  [ERROR] Error overwriting {entry.path}: {e}")
+            continue
+        if wiper.allocated < size:
+            print(f"  Sparse file: {wiper.allocated} bytes allocated, holes skipped")
+        print(f"  Step 2: Read-back verification queued")
+        for result in verifier.submit(entry.path, size, wiper.final_pattern):
+            success_count += finish_verified(result, engine, folder_path)
+    if batcher is not None:
+        success_count += report_batch(batcher.flush(), passes, folder_path)
+    if verifier is not None:
+        for result in verifier.finish():
+            success_count += finish_verified(result, engine, folder_path)
+    return success_count, total
+
+def secure_delete_folder(folder_path, passes=3, parallel=False, workers=None, io_mode='buffered',
+                         durability=None, verify='off', verify_options=None, small_threshold=SMALL_FILE_THRESHOLD,
+                         journal=True, metrics_json=None, schedule=None, shard_workers=0,
+                         shard_threshold=SHARD_MIN_BYTES, flash='off'):
+    """
+    Securely delete all files in a folder tree, then remove its directories
+    bottom-up. Files are streamed from the walker straight into the wipe, so
+    deletion starts immediately however large the tree is.
+    With parallel=True files are wiped concurrently by per-device worker pools
+    (`workers` overrides the automatically sized pool per device).
+    io_mode selects buffered, direct (O_DIRECT) or nocache page-cache handling.
+    durability is a DurabilityPolicy (default: sync after every pass).
+    verify ('off', 'sample' or 'full') reads each file back before unlinking
+    it; verify_options may set confidence and defect_rate for sampling.
+    Sequential runs wipe files up to small_threshold bytes in batches
+    (0 disables batching).
+    With journal=True progress is journalled beside the folder; running the
+    same command after an interruption resumes where it stopped.
+    A metrics summary (throughput, latency histograms, time per phase) is
+    printed at the end; metrics_json writes it as JSON to a file ('-' for stdout).
+    schedule is a PassSchedule (default: the standard schedule of `passes`).
+    With shard_workers > 1, sequential runs overwrite each file of at least
+    shard_threshold bytes with that many range workers at once.
+    flash ('auto' or 'always') makes sequential runs deallocate and discard
+    files on flash devices instead of overwriting them (see FlashWiper).
     """
     folder_path = Path(folder_path)
+    schedule = schedule or make_schedule('standard', passes)
+    passes = len(schedule)
     
     if not folder_path.exists():
         print(f"Folder not found: {folder_path}")
@@ -121,51 +257,235 @@ def secure_delete_folder(folder_path, passes=3):
     print(f"{'='*60}")
     print(f"Target: {folder_path}")
     print(f"Overwrite passes: {passes}")
+    print(f"Schedule: {schedule.describe()}")
+    if parallel:
+        print(f"Mode: parallel ({workers or 'auto'} worker(s) per device)")
+    elif shard_workers > 1:
+        print(f"Sharding: files from {format_bytes(shard_threshold)} up split over {shard_workers} range workers")
+    if flash != 'off' and not parallel:
+        print(f"Flash: {flash} (punch/zero-range + discard on SSDs, overwrite elsewhere)")
+    durability = durability or make_policy('pass')
+    print(f"I/O mode: {io_mode}")
+    print(f"Durability: {durability.describe()}")
+    verify_options = verify_options or {}
+    print(f"Verification: {describe_verification(verify, **verify_options)}")
     print(f"{'='*60}\n")
     
-    # Get all files
-    files = list(folder_path.glob('*'))
-    files = [f for f in files if f.is_file()]
-    
-    if not files:
+    # Plan the run: parallel scan of the tree, then a short benchmark of the
+    # device with the chosen passes and durability policy, run next to the
+    # folder so nothing is written into it before the wipe is confirmed
+    print("Planning...")
+    plan = plan_wipe(folder_path, passes, 0 if parallel else small_threshold)
+    if not plan.files:
         print("No files found in the folder.")
         return False
+    try:
+        plan.calibrate(io_mode, durability.name, schedule=schedule)
+    except OSError as e:
+        print(f"[NOTE] Device benchmark skipped: {e}")
+    print()
+    for line in plan.describe():
+        print(f"  {line}")
+    print()
     
-    print(f"Found {len(files)} file(s) to securely delete:\n")
-    for f in files:
-        print(f"  - {f.name} ({f.stat().st_size} bytes)")
+    # Preview the first few files
+    preview = list(islice(iter_files(folder_path), PREVIEW_FILES + 1))
+    
+    print(f"Files to securely delete (including subfolders):\n")
+    for entry in preview[:PREVIEW_FILES]:
+        print(f"  - {os.path.relpath(entry.path, folder_path)} ({entry.stat(follow_symlinks=False).st_size} bytes)")
+    if len(preview) > PREVIEW_FILES:
+        print("  ... and more")
     
     # Confirm
     response = input("\n⚠️  WARNING: This will PERMANENTLY delete all files in this folder!\nContinue? (yes/no): ")
     if response.lower() not in ['yes', 'y']:
         print("Cancelled.")
         return False
+    if plan.write_rate is None and plan.scratch_parent() is None:
+        # A mount point (or a folder in a read-only parent): benchmark inside it now that it will be wiped
+        try:
+            plan.calibrate(io_mode, durability.name, schedule=schedule, scratch_parent=folder_path)
+            print(f"Estimated time: {format_duration(plan.estimate_seconds)}")
+        except OSError as e:
+            print(f"[NOTE] Device benchmark skipped: {e}")
+    
+    if journal:
+        try:
+            journal = WipeJournal(folder_path, passes, schedule=schedule)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return False
+        if journal.resumed:
+            print(f"\nResuming from journal {journal.path}: {journal.files_done} file(s) finished, "
+                  f"{journal.files_in_progress} in progress")
+    else:
+        journal = None
     
     print("\nStarting secure deletion process...\n")
     
-    # Delete each file
+    # Delete each file as the walker finds it
+    walker = TreeWalker(folder_path)
     success_count = 0
-    for file_path in files:
-        if secure_delete_file(file_path, passes):
-            success_count += 1
+    total = 0
+    metrics = WipeMetrics()
+    progress = WipeProgress(plan, metrics)
+    last_report = [time.perf_counter()]
+    
+    def report_progress(event):
+        now = time.perf_counter()
+        if isinstance(event, (FileEvent, PassEvent)) and now - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = now
+            print(f"  Progress: {progress.describe()}")
     
-    # Delete the folder if empty
+    metrics.subscribe(report_progress)
+    flash_wiper = None
     try:
-        remaining = list(folder_path.glob('*'))
-        if not remaining:
-            folder_path.rmdir()
-            print(f"\n[SUCCESS] Folder deleted: {folder_path}")
-    except Exception as e:
-        print(f"\n[NOTE] Could not delete folder: {e}")
+        if parallel:
+            with ParallelWiper(passes, workers, durability, verify, verify_options,
+                               io_mode=io_mode, journal=journal, metrics=metrics, schedule=schedule) as wiper:
+                for total, result in enumerate(wiper.wipe(walker), 1):
+                    if result.ok:
+                        success_count += 1
+                        verified = f" - {verified_line(result.verify)}" if result.verify else ""
+                        print(f"[{total}] [SUCCESS] {os.path.relpath(result.path, folder_path)} "
+                              f"({result.size} bytes){verified}")
+                    else:
+                        print(f"[{total}] [ERROR] {os.path.relpath(result.path, folder_path)}: {result.error}")
+                cache_avoided = wiper.cache_avoided
+        else:
+            with ExitStack() as stack:
+                engine = stack.enter_context(OverwriteEngine(io_mode=io_mode, durability=durability,
+                                                             journal=journal, metrics=metrics, schedule=schedule))
+                verifier = batcher = sharder = None
+                if flash != 'off':
+                    flash_wiper = stack.enter_context(FlashWiper(engine, passes, flash, verify=verify,
+                                                                 verify_options=verify_options))
+                if shard_workers > 1:
+                    sharder = stack.enter_context(ShardedOverwriter(shard_workers, shard_threshold, io_mode=io_mode,
+                                                                    durability=durability, journal=journal,
+                                                                    metrics=metrics, schedule=schedule))
+                if verify != 'off':
+                    verifier = stack.enter_context(BackgroundVerifier(verify, **verify_options))
+                if small_threshold:
+                    batcher = stack.enter_context(SmallFileBatcher(engine, passes, small_threshold, verify=verify,
+                                                                   verify_options=verify_options))
+                success_count, total = wipe_sequential(walker, engine, passes, folder_path, verifier, batcher,
+                                                       sharder, flash_wiper)
+                cache_avoided = engine.cache_avoided + (sharder.cache_avoided if sharder else 0)
+    except BaseException:
+        if journal is not None:
+            journal.close()  # keep it so the next run can resume
+        raise
+    
+    # Deferred unlinks were committed when the engine/wiper closed, so the
+    # deallocated blocks are free and can be trimmed; then remove the extra
+    # hardlink names and folders the walk could not remove yet
+    trims = flash_wiper.finish() if flash_wiper is not None else []
+    for path, error in durability.failed:
+        success_count -= 1
+        print(f"[ERROR] Failed to delete file: {path}: {error}")
+    walker.remove_leftovers()
+    durability.track_removal(folder_path)
+    durability.finish()
+    if journal is not None:
+        journal.close(remove=True)
+    for path, error in walker.errors:
+        print(f"[NOTE] {path}: {error}")
+    if folder_path.exists():
+        print(f"\n[NOTE] Could not delete folder: {folder_path} is not empty")
+    else:
+        print(f"\n[SUCCESS] Folder deleted: {folder_path}")
+    
+    print(f"\n{'='*60}")
+    print(f"Deletion Complete: {success_count}/{total} files securely deleted")
+    if plan.estimate_seconds is not None:
+        print(f"Time: {time.perf_counter() - metrics.started:.1f}s (planned {plan.estimate_seconds:.1f}s)")
+    print(f"Data overwritten: {metrics.bytes_written / (1024 * 1024):.1f} MiB allocated across all passes")
+    print(f"Throughput: {metrics.describe(durability)}")
+    if io_mode != 'buffered':
+        print(f"Page cache avoided: {cache_avoided / (1024 * 1024):.1f} MiB")
+    print(f"Sync: {durability.summary()}")
+    if flash_wiper is not None:
+        print(f"Flash: {flash_wiper.summary()}")
+        for trim in trims:
+            status = f"failed: {trim.error}" if trim.error else f"{format_bytes(trim.bytes)} discarded"
+            print(f"  FITRIM {trim.mount}: {status} in {trim.seconds:.2f}s")
+    print(f"{'='*60}\n")
+    if metrics_json == '-':
+        print(metrics.to_json(durability))
+    elif metrics_json:
+        Path(metrics_json).write_text(metrics.to_json(durability), encoding='utf-8')
+        print(f"Metrics written to {metrics_json}")
+    
+    return success_count == total
+
+def wipe_free_space(path, passes=1, io_mode='buffered', durability=None, reserve=DEFAULT_RESERVE,
+                    fill_bytes=FILL_FILE_BYTES, metrics_json=None, schedule=None):
+    """
+    Overwrite the free space of the filesystem holding `path` (a mount point
+    or any directory on it), leaving `reserve` bytes free, so data deleted
+    earlier without a secure wipe cannot be recovered. The fill files are
+    removed at the end, also when the wipe is interrupted.
+    """
+    if not os.path.isdir(path):
+        print(f"Path is not a directory: {path}")
+        return False
     
+    schedule = schedule or make_schedule('standard', passes)
+    passes = len(schedule)
+    metrics = WipeMetrics()
+    wiper = FreeSpaceWiper(path, passes, reserve, fill_bytes, io_mode, durability, metrics, schedule)
     print(f"\n{'='*60}")
-    print(f"Deletion Complete: {success_count}/{len(files)} files securely deleted")
+    print(f"Manhattan Project - Free-Space Wipe")
+    print(f"{'='*60}")
+    print(f"Filesystem of: {os.path.abspath(path)}")
+    print(f"Free space: {format_bytes(wiper.free_before)}")
+    print(f"Reserve left free: {format_bytes(reserve)}")
+    print(f"To fill: {format_bytes(wiper.target_bytes)} in files of up to {format_bytes(wiper.fill_bytes)}, "
+          f"{passes} pass(es)")
+    print(f"Schedule: {schedule.describe()}")
+    print(f"I/O mode: {io_mode}")
+    print(f"Durability: {wiper.durability.describe()}")
     print(f"{'='*60}\n")
     
-    return success_count == len(files)
+    if not wiper.target_bytes:
+        print("Nothing to do: free space is already within the reserve.")
+        return True
+    
+    response = input("⚠️  The filesystem will be filled up to the reserve for the duration of the wipe.\n"
+                     "Continue? (yes/no): ")
+    if response.lower() not in ['yes', 'y']:
+        print("Cancelled.")
+        return False
+    
+    print()
+    for fill in wiper.wipe():
+        done = wiper.filled / wiper.target_bytes if wiper.target_bytes else 1.0
+        elapsed = time.perf_counter() - metrics.started
+        eta = elapsed * (1 - done) / done if done else None
+        rate = fill.size * passes / fill.seconds / 1e6 if fill.seconds else 0.0
+        print(f"[fill {wiper.files}] {format_bytes(fill.size)} in {fill.seconds:.1f}s ({rate:.1f} MB/s) - "
+              f"{format_bytes(wiper.filled)}/{format_bytes(wiper.target_bytes)} ({min(done, 1.0):.0%}), "
+              f"ETA {format_duration(eta)}")
+    if wiper.stopped is not None:
+        print(f"[NOTE] Filling stopped early: {wiper.stopped}")
+    
+    print(f"\n{'='*60}")
+    print(f"Free-Space Wipe Complete: {format_bytes(wiper.filled)} overwritten in {wiper.files} fill file(s), "
+          f"fill files removed")
+    print(f"Throughput: {metrics.describe(wiper.durability)}")
+    print(f"Sync: {wiper.durability.summary()}")
+    print(f"{'='*60}\n")
+    if metrics_json == '-':
+        print(metrics.to_json(wiper.durability))
+    elif metrics_json:
+        Path(metrics_json).write_text(metrics.to_json(wiper.durability), encoding='utf-8')
+        print(f"Metrics written to {metrics_json}")
+    return True
 
-def demo_mode():
-    """Create demo folder and then securely delete it"""
+def demo_mode(**options):
+    """Create demo folder and then securely delete it (options as for secure_delete_folder)"""
     demo_folder, files = create_demo_folder()
     
     print(f"\n{'='*60}")
@@ -179,14 +499,92 @@ def demo_mode():
     print(f"{'='*60}\n")
     
     # Securely delete the folder
-    return secure_delete_folder(demo_folder, passes=3)
+    return secure_delete_folder(demo_folder, **options)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manhattan Project - Secure File Deletion Demo")
+    parser.add_argument('folder', nargs='?', help="folder to securely delete (omit to run the demo)")
+    parser.add_argument('--passes', type=int, default=None,
+                        help="overwrite passes per file for the standard/random schedules "
+                             "(default: 3; 1 with --free-space)")
+    parser.add_argument('--schedule', choices=list(SCHEDULES), default='standard',
+                        help="pass schedule: standard (zeros, ones, random), nist-clear (one zero pass), "
+                             "random, dod (DoD 5220.22-M, 3 passes), dod-ece (7 passes) or custom")
+    parser.add_argument('--patterns', default=None, metavar='LIST',
+                        help="custom schedule: comma-separated hex patterns or 'random', e.g. 55,AA,random")
+    parser.add_argument('--parallel', action='store_true',
+                        help="wipe files concurrently with one worker pool per device")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="workers per device in parallel mode (default: sized from the device)")
+    parser.add_argument('--shard-workers', type=int, default=0,
+                        help="sequential mode: overwrite large files with this many range workers at once (0 = off)")
+    parser.add_argument('--shard-mib', type=int, default=SHARD_MIN_BYTES // (1024 * 1024),
+                        help="sharding: only split files of at least this many MiB (default: 1024)")
+    parser.add_argument('--flash', choices=FLASH_MODES, default='off',
+                        help="sequential mode: deallocate and discard files on SSDs instead of overwriting them "
+                             "(auto: detect SSDs via sysfs; always: also on devices sysfs cannot identify; "
+                             "spinning and non-discarding disks are always overwritten)")
+    parser.add_argument('--io-mode', choices=IO_MODES, default='buffered',
+                        help="page cache handling: buffered, direct (O_DIRECT) or nocache (fadvise DONTNEED)")
+    parser.add_argument('--durability', choices=sorted(DURABILITY_POLICIES), default='pass',
+                        help="pass: fdatasync every pass; file: once per file; group: syncfs per batch")
+    parser.add_argument('--group-files', type=int, default=DEFAULT_GROUP_FILES,
+                        help="group policy: commit after this many files")
+    parser.add_argument('--group-mib', type=int, default=DEFAULT_GROUP_BYTES // (1024 * 1024),
+                        help="group policy: commit after this many MiB")
+    parser.add_argument('--verify', choices=VERIFY_MODES, default='off',
+                        help="read files back before unlinking: sample (random blocks) or full")
+    parser.add_argument('--confidence', type=float, default=DEFAULT_CONFIDENCE,
+                        help="sample mode: probability of catching the defect rate below (default: 0.99)")
+    parser.add_argument('--defect-rate', type=float, default=DEFAULT_DEFECT_RATE,
+                        help="sample mode: share of unwritten blocks that must be detected (default: 0.01)")
+    parser.add_argument('--small-kib', type=int, default=SMALL_FILE_THRESHOLD // 1024,
+                        help="batch files up to this many KiB together (sequential mode, 0 = off, default: 64)")
+    parser.add_argument('--no-journal', action='store_true',
+                        help="do not keep a resume journal beside the folder")
+    parser.add_argument('--metrics', nargs='?', const='-', default=None, metavar='FILE',
+                        help="write the JSON metrics summary to FILE (stdout when FILE is omitted)")
+    parser.add_argument('--free-space', metavar='PATH', default=None,
+                        help="instead of deleting a folder, overwrite the free space of the filesystem holding PATH")
+    parser.add_argument('--reserve-mib', type=int, default=DEFAULT_RESERVE // (1024 * 1024),
+                        help="free-space wipe: MiB to leave free for running services (default: 1024)")
+    parser.add_argument('--fill-mib', type=int, default=FILL_FILE_BYTES // (1024 * 1024),
+                        help="free-space wipe: size of each fill file in MiB (default: 1024)")
+    parser.add_argument('--no-dir-sync', action='store_true',
+                        help="skip the final fsync of directories after unlinking")
+    args = parser.parse_args(argv)
+    if args.free_space and args.schedule == 'standard' and args.passes is None:
+        args.passes = 1  # one pass is enough for free space unless asked otherwise
+    try:
+        make_schedule(args.schedule, args.passes, args.patterns)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+def build_options(args):
+    """Translate parsed arguments into secure_delete_folder keyword arguments"""
+    group = {'group_files': args.group_files, 'group_bytes': args.group_mib * 1024 * 1024}
+    durability = make_policy(args.durability, sync_dirs=not args.no_dir_sync,
+                             **(group if args.durability == 'group' else {}))
+    schedule = make_schedule(args.schedule, args.passes, args.patterns)
+    return dict(passes=len(schedule), schedule=schedule, parallel=args.parallel, workers=args.workers,
+                io_mode=args.io_mode, durability=durability, verify=args.verify,
+                verify_options={'confidence': args.confidence, 'defect_rate': args.defect_rate},
+                small_threshold=args.small_kib * 1024, journal=not args.no_journal, metrics_json=args.metrics,
+                shard_workers=args.shard_workers, shard_threshold=args.shard_mib * 1024 * 1024,
+                flash=args.flash)
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    args = parse_args()
+    if args.free_space:
+        # Overwrite the free space of a filesystem instead of deleting a folder
+        options = build_options(args)
+        wipe_free_space(args.free_space, options['passes'], options['io_mode'], options['durability'],
+                        args.reserve_mib * 1024 * 1024, args.fill_mib * 1024 * 1024, args.metrics,
+                        options['schedule'])
+    elif args.folder:
         # Delete specified folder
-        target_folder = sys.argv[1]
-        secure_delete_folder(target_folder, passes=3)
+        secure_delete_folder(args.folder, **build_options(args))
     else:
         # Demo mode - create and delete demo folder
-        demo_mode()
-
+        demo_mode(**build_options(args))
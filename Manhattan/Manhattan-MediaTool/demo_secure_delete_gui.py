@@ -5,15 +5,28 @@ GUI version for demonstrating secure file deletion
 """
 import sys
 import os
-import random
+import time
+from collections import deque
+from itertools import chain, islice
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, QHBoxLayout, 
-    QFileDialog, QMessageBox, QFrame, QTextEdit, QProgressBar
+    QFileDialog, QMessageBox, QFrame, QTextEdit, QProgressBar, QCheckBox, QListView, QComboBox
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread, QAbstractListModel, QModelIndex, QTimer
 from PyQt5.QtGui import QFont
 
+from secure_wipe import (
+    SCHEDULES, SMALL_FILE_THRESHOLD, BackgroundVerifier, LogStream, OverwriteEngine, ParallelWiper, SmallFileBatcher, TreeWalker,
+    WipeJournal, WipeMetrics, WipeProgress, describe_verification, format_bytes, format_duration, iter_files,
+    make_policy, make_schedule, plan_wipe,
+)
+from secure_wipe.metrics import PassEvent
+
+SCAN_PREVIEW_FILES = 200
+LOG_VIEW_LINES = 5000  # lines kept in the on-screen log; the log file has everything
+LOG_REFRESH_MS = 100  # how often queued log lines are moved into the view
+
 DARK_STYLE = """
 QWidget {
     background-color: #1a1d21;
@@ -85,142 +98,363 @@ QProgressBar::chunk {
 }
 """
 
+class LogListModel(QAbstractListModel):
+    """
+    Ring buffer of the last `capacity` log lines. Lines arrive in batches
+    from the refresh timer, so the view repaints once per batch instead of
+    once per line.
+    """
+
+    def __init__(self, capacity=LOG_VIEW_LINES, parent=None):
+        super().__init__(parent)
+        self._lines = deque(maxlen=capacity)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self._lines[index.row()]
+        return None
+
+    def append_lines(self, lines):
+        lines = list(lines)[-self._lines.maxlen:]
+        if not lines:
+            return
+        overflow = len(self._lines) + len(lines) - self._lines.maxlen
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+        start = len(self._lines)
+        self.beginInsertRows(QModelIndex(), start, start + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+class PlanWorker(QThread):
+    """
+    Scans the tree and benchmarks the device with the chosen schedule off the
+    GUI thread; given an existing `plan`, only the benchmark is rerun
+    """
+    planned = pyqtSignal(object)  # WipePlan
+    
+    def __init__(self, folder_path, schedule, io_mode='buffered', durability='pass', plan=None, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.schedule = schedule
+        self.io_mode = io_mode
+        self.durability = durability
+        self.plan = plan
+    
+    def run(self):
+        plan = self.plan or plan_wipe(self.folder_path, len(self.schedule))
+        plan.passes = len(self.schedule)
+        if plan.files:
+            try:
+                plan.calibrate(self.io_mode, self.durability, schedule=self.schedule)
+            except OSError:
+                pass  # read-only, full or a mount point: the plan simply has no time estimate
+        self.planned.emit(plan)
+
 class DeleteWorkerSignals(QObject):
     finished = pyqtSignal(bool, str)
-    progress = pyqtSignal(str)
     file_deleted = pyqtSignal(str)
+    metric = pyqtSignal(object)  # PassEvent / FileEvent from secure_wipe.metrics
+    metrics_summary = pyqtSignal(dict)  # WipeMetrics.summary() at the end of the run
 
 class SecureDeleteWorker(QThread):
-    def __init__(self, folder_path, passes=3):
+    def __init__(self, folder_path, passes=3, parallel=False, workers=None, io_mode='buffered',
+                 durability=None, verify='off', small_threshold=SMALL_FILE_THRESHOLD, journal=True, log=None,
+                 schedule=None):
         super().__init__()
         self.folder_path = Path(folder_path)
-        self.passes = passes
+        self.schedule = schedule or make_schedule('standard', passes)
+        self.passes = len(self.schedule)
+        self.parallel = parallel
+        self.workers = workers
+        self.io_mode = io_mode
+        self.durability = durability or make_policy('pass')
+        self.verify = verify
+        self.small_threshold = small_threshold
+        self.use_journal = journal
         self.signals = DeleteWorkerSignals()
+        # Log lines are queued here (and streamed to the log file) instead of
+        # being sent to the GUI thread one signal at a time
+        self.log = log or LogStream()
+        self.engine = None
+        self.journal = None
+        self.metrics = WipeMetrics()
+        self.metrics.subscribe(self._on_metric)
+        self._last_pass = None
+    
+    def _on_metric(self, event):
+        # Runs on the thread that did the I/O; Qt queues the signal to the GUI thread
+        if isinstance(event, PassEvent):
+            self._last_pass = event
+        self.signals.metric.emit(event)
     
     def run(self):
+        # The resume journal lives beside the folder; an interrupted run continues from it
+        if self.use_journal and self.folder_path.is_dir():
+            try:
+                self.journal = WipeJournal(self.folder_path, self.passes, schedule=self.schedule)
+            except ValueError as e:
+                self.signals.finished.emit(False, str(e))
+                return
+        # One engine (and one chunk buffer) is shared by every file in the run
+        self.engine = OverwriteEngine(io_mode=self.io_mode, durability=self.durability, journal=self.journal,
+                                      metrics=self.metrics, schedule=self.schedule)
+        self.cache_avoided = 0
         try:
             if not self.folder_path.exists():
                 self.signals.finished.emit(False, f"Folder not found: {self.folder_path}")
                 return
             
-            files = [f for f in self.folder_path.glob('*') if f.is_file()]
+            # Stream files straight from the walker - no up-front file list
+            walker = TreeWalker(self.folder_path)
+            files = iter(walker)
+            first = next(files, None)
             
-            if not files:
+            if first is None:
                 self.signals.finished.emit(False, "No files found in the folder.")
                 return
+            files = chain([first], files)
             
             # Algorithm introduction
-            self.signals.progress.emit("=" * 80)
-            self.signals.progress.emit("MANHATTAN PROJECT - SECURE DELETION ALGORITHM")
-            self.signals.progress.emit("=" * 80)
-            self.signals.progress.emit("")
-            self.signals.progress.emit("Algorithm: NIST SP 800-88 Rev. 1 (Purge-Level Sanitization)")
-            self.signals.progress.emit("Implementation: Multi-Pass Overwrite with Cryptographic Patterns")
-            self.signals.progress.emit("Security Level: Data Recovery Impossible (Forensic-Grade)")
-            self.signals.progress.emit("")
-            self.signals.progress.emit(f"Target: {self.folder_path}")
-            self.signals.progress.emit(f"Files Detected: {len(files)}")
-            self.signals.progress.emit(f"Overwrite Passes: {self.passes}")
-            self.signals.progress.emit("")
-            self.signals.progress.emit("=" * 80)
-            self.signals.progress.emit("")
+            self.log("=" * 80)
+            self.log("MANHATTAN PROJECT - SECURE DELETION ALGORITHM")
+            self.log("=" * 80)
+            self.log("")
+            self.log("Algorithm: NIST SP 800-88 Rev. 1 (Purge-Level Sanitization)")
+            self.log("Implementation: Multi-Pass Overwrite with Cryptographic Patterns")
+            self.log("Security Level: Data Recovery Impossible (Forensic-Grade)")
+            self.log("")
+            self.log(f"Target: {self.folder_path}")
+            self.log(f"Traversal: Recursive (subfolders included, streamed)")
+            self.log(f"Overwrite Passes: {self.passes}")
+            self.log(f"Pass Schedule: {self.schedule.describe()}")
+            self.log(f"I/O Mode: {self.engine.effective_io_mode}")
+            self.log(f"Durability: {self.durability.describe()}")
+            self.log(f"Read-back Verification: {describe_verification(self.verify)}")
+            if self.journal is not None and self.journal.resumed:
+                self.log(f"Resuming: {self.journal.files_done} file(s) finished, "
+                         f"{self.journal.files_in_progress} in progress before the interruption")
+            self.log("")
+            self.log("=" * 80)
+            self.log("")
             
-            success_count = 0
-            for i, file_path in enumerate(files, 1):
-                file_size = file_path.stat().st_size
-                self.signals.progress.emit(f"\n[{i}/{len(files)}] PROCESSING: {file_path.name}")
-                self.signals.progress.emit(f"  File Size: {file_size:,} bytes ({file_size/1024:.2f} KB)")
-                self.signals.progress.emit(f"  Algorithm: Multi-Pass Overwrite (NIST SP 800-88)")
-                self.signals.progress.emit("")
-                
-                if self._secure_delete_file(file_path, file_size):
-                    success_count += 1
-                    self.signals.file_deleted.emit(file_path.name)
-                    self.signals.progress.emit(f"  [SUCCESS] File securely deleted: {file_path.name}")
-                    self.signals.progress.emit(f"  Verification: File handle released, disk blocks marked for overwrite")
-                else:
-                    self.signals.progress.emit(f"  [ERROR] Failed to delete: {file_path.name}")
-                
-                self.signals.progress.emit("")
+            if self.parallel:
+                success_count, total = self._run_parallel(files)
+            else:
+                success_count, total = self._run_sequential(files)
             
-            # Try to delete folder if empty
-            try:
-                remaining = list(self.folder_path.glob('*'))
-                if not remaining:
-                    self.folder_path.rmdir()
-                    self.signals.progress.emit("")
-                    self.signals.progress.emit("Folder cleanup: Empty folder removed")
-            except:
-                pass
+            # Commit deferred unlinks, then remove the extra hardlink names
+            # and folders the walk could not remove yet
+            self.durability.finish()
+            for path, error in self.durability.failed:
+                success_count -= 1
+                self.log(f"  [ERROR] Failed to delete: {path}: {error}")
+            removed = walker.remove_leftovers()
+            self.durability.track_removal(self.folder_path)
+            self.durability.finish()
+            if self.journal is not None:
+                self.journal.close(remove=True)
+            for path, error in walker.errors:
+                self.log(f"  [NOTE] {path}: {error}")
+            if removed:
+                self.log("")
+                self.log(f"Folder cleanup: {removed} empty folder(s) removed")
             
-            self.signals.progress.emit("")
-            self.signals.progress.emit("=" * 80)
-            self.signals.progress.emit("ALGORITHM EXECUTION COMPLETE")
-            self.signals.progress.emit("=" * 80)
+            self.log("")
+            self.log("=" * 80)
+            self.log("ALGORITHM EXECUTION COMPLETE")
+            if self.io_mode != 'buffered':
+                cache_avoided = self.cache_avoided + self.engine.cache_avoided
+                self.log(f"Page cache avoided: {cache_avoided / (1024 * 1024):.1f} MiB")
+            self.log(f"Sync: {self.durability.summary()}")
+            self.log(f"Throughput: {self.metrics.describe(self.durability)}")
+            self.log("=" * 80)
+            self.signals.metrics_summary.emit(self.metrics.summary(self.durability))
             
-            if success_count == len(files):
-                self.signals.finished.emit(True, f"Successfully deleted {success_count}/{len(files)} files using NIST SP 800-88 algorithm!")
+            if success_count == total:
+                self.signals.finished.emit(True, f"Successfully deleted {success_count}/{total} files using NIST SP 800-88 algorithm!")
             else:
-                self.signals.finished.emit(False, f"Deleted {success_count}/{len(files)} files. Some files failed to delete.")
+                self.signals.finished.emit(False, f"Deleted {success_count}/{total} files. Some files failed to delete.")
                 
         except Exception as e:
             self.signals.finished.emit(False, f"Error: {str(e)}")
+        finally:
+            self.engine.close()
+            if self.journal is not None:
+                self.journal.close()  # no-op once removed; otherwise kept for resuming
     
-    def _secure_delete_file(self, file_path, file_size):
-        """Securely overwrite and delete a file with detailed logging"""
+    def _run_sequential(self, files):
+        """
+        Wipe files one at a time with the detailed per-pass log. With
+        verification on, each file is read back on a background thread while
+        the next one is overwritten, and unlinked once it has passed.
+        Small files skip the per-pass log and are wiped in batches.
+        """
+        success_count = 0
+        i = 0
+        verifier = BackgroundVerifier(self.verify) if self.verify != 'off' else None
+        batcher = None
+        if self.small_threshold:
+            batcher = SmallFileBatcher(self.engine, self.passes, self.small_threshold, verify=self.verify)
         try:
-            self.signals.progress.emit(f"  [STEP 1] Opening file handle: {file_path.name}")
-            
-            with open(file_path, 'r+b') as f:
-                self.signals.progress.emit(f"  [STEP 2] File opened successfully, beginning overwrite sequence...")
+            for i, entry in enumerate(files, 1):
+                file_path = Path(entry.path)
+                file_size = entry.stat(follow_symlinks=False).st_size
+                if batcher is not None and batcher.accepts(file_size):
+                    success_count += self._report_batch(batcher.add(file_path, file_size))
+                    continue
+                self.log(f"\n[{i}] PROCESSING: {file_path.relative_to(self.folder_path)}")
+                self.log(f"  File Size: {file_size:,} bytes ({file_size/1024:.2f} KB)")
+                self.log(f"  Algorithm: Multi-Pass Overwrite (NIST SP 800-88)")
+                self.log("")
                 
-                # Multiple overwrite passes with detailed logging
-                for pass_num in range(self.passes):
-                    # Different patterns for each pass
-                    if pass_num == 0:
-                        pattern = bytes([0x00] * file_size)  # Zeros
-                        pattern_name = "Zero Fill (0x00)"
-                        algorithm_desc = "Deterministic Pattern Erasure - NIST Pattern 1"
-                    elif pass_num == 1:
-                        pattern = bytes([0xFF] * file_size)  # Ones
-                        pattern_name = "One Fill (0xFF)"
-                        algorithm_desc = "Complement Pattern Erasure - NIST Pattern 2"
-                    else:
-                        pattern = bytes([random.randint(0, 255) for _ in range(file_size)])  # Random
-                        pattern_name = "Cryptographic Random"
-                        algorithm_desc = "Pseudorandom Data Overwrite - NIST Pattern 3"
-                    
-                    self.signals.progress.emit(f"    Pass {pass_num + 1}/{self.passes}: {pattern_name}")
-                    self.signals.progress.emit(f"      Algorithm: {algorithm_desc}")
-                    self.signals.progress.emit(f"      Pattern: {'0x00' if pass_num == 0 else '0xFF' if pass_num == 1 else 'Random bytes (0x00-0xFF)'}")
-                    
-                    f.seek(0)
-                    f.write(pattern)
-                    f.flush()
-                    os.fsync(f.fileno())  # Force write to disk
-                    
-                    self.signals.progress.emit(f"      Status: Written to disk buffer, synced to physical media")
-                    self.signals.progress.emit(f"      Verification: {file_size:,} bytes overwritten")
-                    
-                    # Small delay for visual effect
-                    self.msleep(200)
+                if not self._secure_delete_file(file_path, file_size, unlink=verifier is None):
+                    self.log(f"  [ERROR] Failed to delete: {file_path.name}")
+                elif verifier is None:
+                    success_count += 1
+                    self.signals.file_deleted.emit(file_path.name)
+                    self.log(f"  [SUCCESS] File securely deleted: {file_path.name}")
+                    self.log(f"  Read-back verification: off")
+                else:
+                    for result in verifier.submit(file_path, file_size, self.engine.final_pattern):
+                        success_count += self._finish_verified(result)
                 
-                self.signals.progress.emit(f"  [STEP 3] All overwrite passes completed")
-                self.signals.progress.emit(f"      Total overwrites: {self.passes} passes × {file_size:,} bytes = {self.passes * file_size:,} bytes written")
+                self.log("")
+            if batcher is not None:
+                success_count += self._report_batch(batcher.flush())
+            if verifier is not None:
+                for result in verifier.finish():
+                    success_count += self._finish_verified(result)
+        finally:
+            if batcher is not None:
+                batcher.close()
+            if verifier is not None:
+                verifier.close()
+        return success_count, i
+    
+    def _report_batch(self, results):
+        """One summary line per small-file batch plus one line per failure"""
+        if not results:
+            return 0
+        deleted = [result for result in results if result.ok]
+        for result in deleted:
+            self.signals.file_deleted.emit(result.path.name)
+        self.log(f"[BATCH] {len(deleted)}/{len(results)} small files securely deleted "
+                 f"({self.passes} passes, syncs shared across the batch)")
+        for result in results:
+            if not result.ok:
+                self.log(f"  [ERROR] {result.path.relative_to(self.folder_path)}: {result.error}")
+        return len(deleted)
+    
+    def _finish_verified(self, result):
+        """Unlink a file whose final pass read back correctly; keep it otherwise"""
+        name = result.path.relative_to(self.folder_path)
+        if not result.ok:
+            self.log(f"  [VERIFICATION FAILED] {name}: {result.detail} - file kept")
+            return False
+        try:
+            self.engine.unlink(result.path)
+        except Exception as e:
+            self.log(f"  [ERROR] Failed to delete: {name}: {e}")
+            return False
+        self.signals.file_deleted.emit(result.path.name)
+        self.log(f"  [VERIFIED] {name}: {self._verified_text(result)}; file securely deleted")
+        return True
+    
+    def _verified_text(self, result):
+        if result.detail:
+            return result.detail
+        return f"{result.mode} read-back, {result.checked:,} bytes match the final pass ({result.source} reads)"
+    
+    def _run_parallel(self, files):
+        """Wipe files concurrently with one worker pool per device"""
+        self.log("Mode: Parallel (device-aware worker pools)")
+        self.log("")
+        success_count = 0
+        i = 0
+        with ParallelWiper(self.passes, self.workers, self.durability, self.verify,
+                           io_mode=self.io_mode, journal=self.journal, metrics=self.metrics,
+                           schedule=self.schedule) as wiper:
+            for i, result in enumerate(wiper.wipe(files), 1):
+                name = result.path.relative_to(self.folder_path)
+                if result.ok:
+                    success_count += 1
+                    self.signals.file_deleted.emit(result.path.name)
+                    self.log(f"[{i}] [SUCCESS] {name} ({result.size:,} bytes, {self.passes} passes)")
+                    if result.verify:
+                        self.log(f"      Verified: {self._verified_text(result.verify)}")
+                else:
+                    self.log(f"[{i}] [ERROR] {name}: {result.error}")
+            self.cache_avoided = wiper.cache_avoided
+        return success_count, i
+    
+    def _secure_delete_file(self, file_path, file_size, unlink=True):
+        """
+        Securely overwrite and delete a file with detailed logging.
+        With unlink=False the file is left for read-back verification.
+        """
+        try:
+            self.log(f"  [STEP 1] Opening file handle: {file_path.name}")
+            
+            self.log(f"  [STEP 2] File opened successfully, beginning overwrite sequence...")
+            
+            def on_pass_start(pass_num, pattern):
+                self.log(f"    Pass {pass_num + 1}/{self.passes}: {pattern.name}")
+                self.log(f"      Algorithm: {pattern.description}")
+                self.log(f"      Pattern: {pattern.spec}")
+            
+            def on_pass_complete(pass_num, pattern, written):
+                if self.durability.syncs_each_pass:
+                    self.log(f"      Status: Written to disk buffer, synced to physical media")
+                else:
+                    self.log(f"      Status: Written to disk buffer (sync deferred: {self.durability.name} policy)")
+                self.log(f"      Verification: {written:,} allocated bytes overwritten")
+                event = self._last_pass
+                if event is not None and event.seconds > 0:
+                    self.log(f"      Measured: {event.bytes / event.seconds / 1e6:.1f} MB/s, "
+                             f"{event.seconds * 1000:.1f} ms (rng {event.rng_seconds * 1000:.1f} ms, "
+                             f"write {event.write_seconds * 1000:.1f} ms)")
+                    # ETA from the measured rate of allocated bytes (holes are never written)
+                    remaining = self.passes - pass_num - 1
+                    if remaining:
+                        self.log(f"      ETA: {event.seconds * remaining:.1f}s for {remaining} more pass(es)")
+            
+            # Multiple overwrite passes, streamed through the shared chunk buffer
+            self.engine.overwrite(file_path, self.passes, on_pass_start, on_pass_complete)
             
-            self.signals.progress.emit(f"  [STEP 4] Closing file handle, releasing file lock")
-            self.signals.progress.emit(f"  [STEP 5] Removing file entry from filesystem")
+            allocated = self.engine.allocated
+            self.log(f"  [STEP 3] All overwrite passes completed")
+            if allocated < file_size:
+                self.log(f"      Sparse file: {allocated:,} of {file_size:,} bytes allocated, holes skipped")
+            self.log(f"      Total overwrites: {self.passes} passes × {allocated:,} bytes = {self.passes * allocated:,} bytes written")
             
-            # Delete the file
-            file_path.unlink()
+            self.log(f"  [STEP 4] Closing file handle, releasing file lock")
+            if not unlink:
+                self.log(f"  [STEP 5] Final pass queued for read-back verification "
+                         f"(runs while the next file is overwritten)")
+                return True
+            self.log(f"  [STEP 5] Removing file entry from filesystem")
             
-            self.signals.progress.emit(f"  [STEP 6] File entry deleted from directory structure")
-            self.signals.progress.emit(f"  [STEP 7] Disk blocks marked as free (available for reuse)")
-            self.signals.progress.emit(f"  [VERIFICATION] File recovery probability: < 0.0001% (Forensic-grade deletion)")
+            # Delete the file (deferred by the group policy until it is synced)
+            self.engine.unlink(file_path)
+            
+            self.log(f"  [STEP 6] File entry deleted from directory structure")
+            self.log(f"  [STEP 7] Disk blocks marked as free (available for reuse)")
             
             return True
         except Exception as e:
-            self.signals.progress.emit(f"  [ERROR] Algorithm execution failed: {str(e)}")
+            self.log(f"  [ERROR] Algorithm execution failed: {str(e)}")
             return False
 
 class SecureDeleteDemo(QWidget):
@@ -236,6 +470,9 @@ class SecureDeleteDemo(QWidget):
         
         self.selected_folder = None
         self.worker = None
+        self.plan = None
+        self.plan_worker = None
+        self.wipe_progress = None
         
         main_layout = QVBoxLayout()
         main_layout.setContentsMargins(60, 40, 60, 40)
@@ -298,7 +535,7 @@ class SecureDeleteDemo(QWidget):
         # Progress bar
         self.progress = QProgressBar()
         self.progress.setMinimum(0)
-        self.progress.setMaximum(0)
+        self.progress.setMaximum(1000)  # per mille of the planned bytes
         self.progress.setVisible(False)
         main_layout.addWidget(self.progress)
         
@@ -307,11 +544,22 @@ class SecureDeleteDemo(QWidget):
         log_label.setStyleSheet('color: #e76f00; font-weight: bold; font-size: 28px; margin-top: 25px; padding: 15px;')
         main_layout.addWidget(log_label)
         
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
-        self.log_text.setStyleSheet('font-family: "Consolas", "Courier New", monospace; font-size: 20px; line-height: 1.7;')
+        # Only the last LOG_VIEW_LINES lines are kept on screen; uniform row
+        # heights let the view lay out any number of rows without measuring them
+        self.log_model = LogListModel()
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setSelectionMode(QListView.ExtendedSelection)
+        self.log_view.setStyleSheet('background-color: #0d1117; color: #e0e0e0; border: 2px solid #30363d; '
+                                    'border-radius: 8px; padding: 20px; '
+                                    'font-family: "Consolas", "Courier New", monospace; font-size: 20px;')
         # Larger log area for fullscreen
-        main_layout.addWidget(self.log_text, stretch=2)  # Takes more space
+        main_layout.addWidget(self.log_view, stretch=2)  # Takes more space
+        self.log_stream = None
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_REFRESH_MS)
+        self.log_timer.timeout.connect(self.refresh)
         
         # Action buttons
         button_layout = QHBoxLayout()
@@ -341,6 +589,26 @@ class SecureDeleteDemo(QWidget):
             }
         ''')
         button_layout.addWidget(self.delete_button)
+        
+        self.parallel_check = QCheckBox('Parallel mode (one worker pool per device)')
+        self.parallel_check.setToolTip('Wipe several files at once to use the full queue depth of SSD/NVMe devices')
+        self.parallel_check.setStyleSheet('font-size: 20px; padding: 10px;')
+        button_layout.addWidget(self.parallel_check)
+        
+        self.verify_check = QCheckBox('Verify (sampled read-back)')
+        self.verify_check.setToolTip('Read back random blocks of every file before unlinking it: '
+                                     + describe_verification('sample'))
+        self.verify_check.setStyleSheet('font-size: 20px; padding: 10px;')
+        button_layout.addWidget(self.verify_check)
+        
+        self.schedule_combo = QComboBox()
+        for name, (title, _) in SCHEDULES.items():
+            if name != 'custom':  # custom patterns are a CLI option
+                self.schedule_combo.addItem(f"{title} ({len(make_schedule(name))} passes)", name)
+        self.schedule_combo.setToolTip('Overwrite pass schedule')
+        self.schedule_combo.setStyleSheet('font-size: 20px; padding: 10px;')
+        self.schedule_combo.currentIndexChanged.connect(self.recalibrate)
+        button_layout.addWidget(self.schedule_combo)
         button_layout.addStretch()
         
         main_layout.addLayout(button_layout)
@@ -404,36 +672,82 @@ class SecureDeleteDemo(QWidget):
             return
         
         folder_path = Path(self.selected_folder)
+        self.plan = None
         if not folder_path.exists():
             self.files_text.setText("Folder not found.")
             return
         
-        files = [f for f in folder_path.glob('*') if f.is_file()]
+        # Plan in the background (byte totals, size distribution, ETA);
+        # parented to the window so a superseded scan can finish safely
+        self.plan_worker = PlanWorker(folder_path, make_schedule(self.schedule_combo.currentData()), parent=self)
+        self.plan_worker.planned.connect(self.on_planned)
+        self.plan_worker.start()
+        
+        # Only preview the first entries so huge trees do not block the UI
+        files = list(islice(iter_files(folder_path), SCAN_PREVIEW_FILES + 1))
         
         if not files:
-            self.files_text.setText("No files found in the folder.")
+            self.preview_text = "No files found in the folder."
+            self.files_text.setText(self.preview_text)
             return
         
-        file_list = f"Found {len(files)} file(s):\n\n"
-        for f in files:
-            size = f.stat().st_size
-            file_list += f"  • {f.name} ({size:,} bytes)\n"
+        if len(files) > SCAN_PREVIEW_FILES:
+            file_list = f"Showing the first {SCAN_PREVIEW_FILES} file(s) (subfolders included):\n\n"
+        else:
+            file_list = f"Found {len(files)} file(s):\n\n"
+        for entry in files[:SCAN_PREVIEW_FILES]:
+            size = entry.stat(follow_symlinks=False).st_size
+            file_list += f"  • {os.path.relpath(entry.path, folder_path)} ({size:,} bytes)\n"
         
-        self.files_text.setText(file_list)
+        self.preview_text = file_list
+        self.files_text.setText("Planning...\n\n" + file_list)
+    
+    def on_planned(self, plan):
+        """Show the finished plan above the file preview"""
+        if self.sender() is not self.plan_worker or not plan.files:
+            return  # superseded by a newer scan, or nothing to delete
+        self.plan = plan
+        if self.sender().schedule.name != self.schedule_combo.currentData():
+            self.recalibrate()  # the schedule changed while this plan was being measured
+            return
+        self.files_text.setText("\n".join(plan.describe()) + "\n\n" + self.preview_text)
+    
+    def recalibrate(self):
+        """The per-pass cost depends on the schedule: benchmark the scanned plan again with the new one"""
+        if self.plan is None:
+            return  # a scan in progress is checked against the selection when it finishes
+        plan, self.plan = self.plan, None
+        self.files_text.setText("Measuring the device for the selected schedule...\n\n" + self.preview_text)
+        self.plan_worker = PlanWorker(plan.root, make_schedule(self.schedule_combo.currentData()), plan=plan,
+                                      parent=self)
+        self.plan_worker.planned.connect(self.on_planned)
+        self.plan_worker.start()
     
     def start_deletion(self):
         """Start the secure deletion process"""
         if not self.selected_folder:
             QMessageBox.warning(self, 'No Folder', 'Please select a folder first.')
             return
+        if self.plan is None:
+            if self.plan_worker is not None and self.plan_worker.isRunning():
+                QMessageBox.information(self, 'Planning', 'The folder is still being scanned. Please wait a moment.')
+            else:
+                self.scan_folder()
+            return
+        
+        # The plan was calibrated with the selected schedule (recalibrate() follows changes)
+        schedule = make_schedule(self.schedule_combo.currentData())
+        verify = 'sample' if self.verify_check.isChecked() else 'off'
         
-        # Confirmation with algorithm details
+        # Confirmation with algorithm details and the plan
         reply = QMessageBox.question(
             self, 'Confirm Secure Deletion',
             f'⚠️ WARNING: This will PERMANENTLY delete all files in:\n{self.selected_folder}\n\n'
             f'Algorithm: NIST SP 800-88 Rev. 1 (Purge-Level)\n'
-            f'Method: Multi-Pass Overwrite (3 passes)\n'
-            f'Recovery Probability: < 0.0001%\n\n'
+            f'Method: {schedule.describe()}\n'
+            f'Read-back Verification: {describe_verification(verify)}\n\n'
+            f'Plan: {self.plan.files:,} file(s), {format_bytes(self.plan.total_bytes)} to write, '
+            f'estimated {format_duration(self.plan.estimate_seconds)}\n\n'
             f'This action CANNOT be undone!\n\nContinue?',
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
@@ -445,38 +759,67 @@ class SecureDeleteDemo(QWidget):
         self.select_button.setEnabled(False)
         self.create_demo_button.setEnabled(False)
         self.delete_button.setEnabled(False)
+        self.parallel_check.setEnabled(False)
+        self.verify_check.setEnabled(False)
+        self.schedule_combo.setEnabled(False)
         self.progress.setVisible(True)
-        self.log_text.clear()
+        self.log_model.clear()
+        
+        # The full log is streamed to a file in the working directory
+        log_path = Path.cwd() / f"secure_delete_{time.strftime('%Y%m%d-%H%M%S')}.log"
+        self.log_stream = LogStream(log_path)
         
         # Initialize log with algorithm info
-        self.log_text.append("=" * 80)
-        self.log_text.append("MANHATTAN PROJECT - SECURE DELETION SYSTEM")
-        self.log_text.append("=" * 80)
-        self.log_text.append("")
-        self.log_text.append("Initializing NIST SP 800-88 Rev. 1 Algorithm...")
-        self.log_text.append("Algorithm Status: READY")
-        self.log_text.append("Security Level: FORENSIC-GRADE DELETION")
-        self.log_text.append("")
-        self.log_text.append("Starting secure deletion process...")
-        self.log_text.append("")
-        
-        # Start worker thread
-        self.worker = SecureDeleteWorker(self.selected_folder, passes=3)
-        self.worker.signals.progress.connect(self.update_log)
-        self.worker.signals.file_deleted.connect(self.on_file_deleted)
+        self.log_stream("=" * 80)
+        self.log_stream("MANHATTAN PROJECT - SECURE DELETION SYSTEM")
+        self.log_stream("=" * 80)
+        self.log_stream("")
+        self.log_stream("Initializing NIST SP 800-88 Rev. 1 Algorithm...")
+        self.log_stream("Algorithm Status: READY")
+        self.log_stream("Security Level: FORENSIC-GRADE DELETION")
+        self.log_stream(f"Full log: {log_path}")
+        self.log_stream("")
+        for line in self.plan.describe():
+            self.log_stream(f"Plan: {line}")
+        self.log_stream("")
+        self.log_stream("Starting secure deletion process...")
+        self.log_stream("")
+        
+        # Start worker thread; per-file signals are left unconnected so the GUI
+        # thread only wakes up for the log timer
+        self.worker = SecureDeleteWorker(self.selected_folder, parallel=self.parallel_check.isChecked(),
+                                         verify=verify, log=self.log_stream, schedule=schedule)
         self.worker.signals.finished.connect(self.on_deletion_finished)
+        self.wipe_progress = WipeProgress(self.plan, self.worker.metrics)
+        self.progress.setValue(0)
+        self.refresh()
+        self.log_timer.start()
         self.worker.start()
     
-    def update_log(self, message):
-        """Update log text with auto-scroll"""
-        self.log_text.append(message)
-        # Auto-scroll to bottom
-        scrollbar = self.log_text.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+    def refresh(self):
+        """Timer tick: new log lines and the progress bar"""
+        self.drain_log()
+        if self.wipe_progress is not None:
+            progress = self.wipe_progress
+            self.progress.setValue(int(progress.fraction * 1000))
+            self.progress.setFormat(f"%p% - {progress.metrics.files:,}/{progress.plan.files:,} files - "
+                                    f"ETA {format_duration(progress.eta_seconds)}")
     
-    def on_file_deleted(self, filename):
-        """Called when a file is deleted"""
-        pass
+    def drain_log(self):
+        """Move the lines queued since the last tick into the view in one batch"""
+        if self.log_stream is None:
+            return
+        lines, dropped = self.log_stream.drain()
+        if dropped:
+            lines.insert(0, f"... {dropped} line(s) skipped on screen (see {self.log_stream.path})")
+        if not lines:
+            return
+        scrollbar = self.log_view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        self.log_model.append_lines(lines)
+        # Follow the tail unless the user has scrolled up to read
+        if at_bottom:
+            self.log_view.scrollToBottom()
     
     def on_deletion_finished(self, success, message):
         """Called when deletion is complete"""
@@ -484,13 +827,25 @@ class SecureDeleteDemo(QWidget):
         self.select_button.setEnabled(True)
         self.create_demo_button.setEnabled(True)
         self.delete_button.setEnabled(True)
+        self.parallel_check.setEnabled(True)
+        self.verify_check.setEnabled(True)
+        self.schedule_combo.setEnabled(True)
+        
+        if success:
+            self.log_stream(f"\n[SUCCESS] {message}")
+        else:
+            self.log_stream(f"\n[ERROR] {message}")
+        self.log_timer.stop()
+        self.drain_log()
+        self.log_stream.close()
+        self.wipe_progress = None
+        self.plan = None  # the folder is gone or changed; rescan before the next run
         
         if success:
-            self.log_text.append(f"\n[SUCCESS] {message}")
             self.files_text.setText("All files securely deleted.")
             QMessageBox.information(self, 'Deletion Complete', message)
         else:
-            self.log_text.append(f"\n[ERROR] {message}")
+            self.scan_folder()
             QMessageBox.warning(self, 'Deletion Incomplete', message)
 
 if __name__ == '__main__':
@@ -0,0 +1,25 @@
+"""
+Manhattan Project - Drive Tools
+Shared drive-level helpers for the sanitization GUI and the ISO's
+auto-sanitization script (and the media creator's drive list).
+"""
+from .discovery import Drive, DriveInventory, Partition, discover, format_size, topology
+from .eventlog import DEFAULT_LOG, EventLog, current_tags, format_record, log_files, query, tagged
+from .process import CommandResult, OutputLine, run_command, terminate
+from .progress import (
+    NVME_SANITIZE_ARGS,
+    POLL_SECONDS,
+    AtaEraseProgress,
+    NvmeSanitizeProgress,
+    ProgressEvent,
+    ProgressMonitor,
+    SanitizeStatus,
+    ata_erase_estimate,
+    ata_erase_estimate_async,
+    follow_nvme_sanitize,
+    format_event,
+    parse_erase_estimate,
+    parse_sanitize_log,
+    read_sanitize_log,
+    wait_for_nvme_sanitize,
+)
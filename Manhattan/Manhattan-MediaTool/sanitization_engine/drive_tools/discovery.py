@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Drive Discovery
+One inventory of the machine's drives for the sanitization GUI, the ISO's
+auto-sanitization script and the media creator, read straight from sysfs
+instead of forking lsblk and nvme-cli on every refresh:
+
+  /sys/block/<name>     size, rotational, removable, read-only, partitions,
+                        serial/wwid (virtio, NVMe namespaces) and the device
+                        link, whose path gives the transport (usb, sata, sas,
+                        nvme, mmc) and whose model/serial/wwid/vpd_pg80
+                        attributes identify SCSI, ATA and NVMe disks
+  /sys/class/nvme       NVMe controllers, including those with no namespace
+                        (still sanitizable through /dev/nvmeX)
+  /run/udev/data        serial and WWN where sysfs has none (plain file reads)
+  /proc/self/mounts     mount points
+
+The same disk seen through several paths (multipath SAS, dual-port NVMe) is
+listed once, under its first name, with the other paths as aliases: drives
+are the same when their WWNs match, or their model, serial and size do.
+DriveInventory caches the result until the topology changes (a disk or
+partition appears or goes, media changes, something is mounted), which it
+checks with a few small reads per disk.
+"""
+import os
+import re
+from collections import namedtuple
+
+SYSFS = '/sys'
+UDEV_DATA = '/run/udev/data'
+MOUNTS = '/proc/self/mounts'
+SECTOR = 512  # /sys/block sizes are in 512-byte sectors whatever the device's block size
+
+Drive = namedtuple('Drive', 'name path kind tran model serial wwn size rotational removable readonly '
+                            'mountpoint partitions controller aliases')
+Partition = namedtuple('Partition', 'name path size mountpoint')
+
+NVME_NAMESPACE = re.compile(r'^nvme\d+(c\d+)?n\d+$')
+VIRTUAL_KINDS = (('loop', 'loop'), ('dm-', 'dm'), ('md', 'raid'), ('zram', 'ram'), ('ram', 'ram'), ('nbd', 'nbd'))
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'replace').strip()
+    except OSError:
+        return ''
+
+
+def _read_int(path, default=0):
+    try:
+        return int(_read(path))
+    except ValueError:
+        return default
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+def _vpd_serial(path):
+    """Unit serial number from a SCSI VPD page 0x80 (4-byte header, then the ASCII serial)"""
+    try:
+        with open(path, 'rb') as f:
+            page = f.read()
+    except OSError:
+        return ''
+    if len(page) < 4:
+        return ''
+    return page[4:4 + page[3]].decode('ascii', 'replace').strip(' \x00')
+
+
+def _udev(udev, dev):
+    """udev's properties for a block device (major:minor), from its database file"""
+    props = {}
+    try:
+        with open(os.path.join(udev, f"b{dev}"), encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith('E:') and '=' in line:
+                    key, _, value = line[2:].rstrip('\n').partition('=')
+                    props[key] = value
+    except OSError:
+        pass
+    return props
+
+
+def read_mounts(mounts=MOUNTS):
+    """{device path: first mount point}"""
+    points = {}
+    try:
+        with open(mounts) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0].startswith('/dev/'):
+                    # mount points escape spaces as \040
+                    points.setdefault(fields[0], fields[1].replace('\\040', ' '))
+    except OSError:
+        pass
+    return points
+
+
+def format_size(size):
+    """Bytes in lsblk's style: 512B, 900G, 3.6T"""
+    for unit in 'BKMGTP':
+        if size < 1024 or unit == 'P':
+            break
+        size /= 1024
+    if unit == 'B':
+        return f"{int(size)}B"
+    return f"{size:.1f}".rstrip('0').rstrip('.') + unit
+
+
+def _kind(name, base):
+    if name.startswith('sr'):
+        return 'rom'
+    for prefix, kind in VIRTUAL_KINDS:
+        if name.startswith(prefix):
+            return kind
+    return 'disk' if os.path.exists(os.path.join(base, 'device')) else 'virtual'
+
+
+def _transport(name, parts):
+    """Transport from the sysfs device path, as lsblk names it; '' when unknown"""
+    if any(re.match(r'^usb\d+$', p) for p in parts):
+        return 'usb'
+    if name.startswith('nvme'):
+        return 'nvme'
+    if any(re.match(r'^ata\d+$', p) for p in parts):
+        return 'sata'
+    if any(p.startswith('end_device-') for p in parts):
+        return 'sas'
+    if any(p.startswith('rport-') for p in parts):
+        return 'fc'
+    if any(p.startswith('session') for p in parts):
+        return 'iscsi'
+    if name.startswith('mmcblk'):
+        return 'mmc'
+    if any(p.startswith('virtio') for p in parts):
+        return 'virtio'
+    return ''
+
+
+def _drive(name, sysfs, udev, mounts):
+    base = os.path.join(sysfs, 'block', name)
+    device = os.path.join(base, 'device')
+    real = os.path.realpath(base)
+    dev = _read(os.path.join(base, 'dev'))
+    props = _udev(udev, dev) if dev else {}
+    model = _read(os.path.join(device, 'model')) or props.get('ID_MODEL', '').replace('_', ' ')
+    serial = (_read(os.path.join(base, 'serial')) or _read(os.path.join(device, 'serial'))
+              or _vpd_serial(os.path.join(device, 'vpd_pg80')) or props.get('ID_SERIAL_SHORT', ''))
+    wwn = (_read(os.path.join(base, 'wwid')) or _read(os.path.join(device, 'wwid'))
+           or props.get('ID_WWN_WITH_EXTENSION') or props.get('ID_WWN', ''))
+    partitions = []
+    for entry in sorted(_listdir(real)):
+        part = os.path.join(real, entry)
+        if entry.startswith(name) and os.path.exists(os.path.join(part, 'partition')):
+            path = f"/dev/{entry}"
+            partitions.append(Partition(entry, path, _read_int(os.path.join(part, 'size')) * SECTOR,
+                                        mounts.get(path, '')))
+    controller = os.path.basename(os.path.realpath(device)) if name.startswith('nvme') else ''
+    return Drive(name, f"/dev/{name}", _kind(name, base), _transport(name, real.split(os.sep)), model, serial,
+                 ' '.join(wwn.split()), _read_int(os.path.join(base, 'size')) * SECTOR,
+                 _read(os.path.join(base, 'queue', 'rotational')) == '1',
+                 _read(os.path.join(base, 'removable')) == '1', _read(os.path.join(base, 'ro')) == '1',
+                 mounts.get(f"/dev/{name}", ''), tuple(partitions), controller, ())
+
+
+def _idle_controllers(sysfs, drives):
+    """NVMe controllers with no namespace block device, as drives of size 0"""
+    found = []
+    known = {drive.controller for drive in drives}
+    for ctrl in sorted(_listdir(os.path.join(sysfs, 'class', 'nvme'))):
+        base = os.path.join(sysfs, 'class', 'nvme', ctrl)
+        if ctrl in known or any(NVME_NAMESPACE.match(entry) for entry in _listdir(base)):
+            continue
+        found.append(Drive(ctrl, f"/dev/{ctrl}", 'disk', 'nvme', _read(os.path.join(base, 'model')),
+                           _read(os.path.join(base, 'serial')), '', 0, False, False, False, '', (), ctrl, ()))
+    return found
+
+
+def identity(drive):
+    """What makes two entries the same physical drive, or None when nothing reliable is known"""
+    if drive.wwn:
+        return ('wwn', drive.wwn)
+    if drive.serial:
+        return ('serial', drive.model, drive.serial, drive.size)
+    return None
+
+
+def dedupe(drives):
+    """Merge entries with the same identity into the first, listing the other paths as aliases"""
+    merged = []
+    seen = {}
+    for drive in drives:
+        key = identity(drive)
+        if key is not None and key in seen:
+            first = seen[key]
+            merged[first] = merged[first]._replace(aliases=merged[first].aliases + (drive.path,))
+            continue
+        if key is not None:
+            seen[key] = len(merged)
+        merged.append(drive)
+    return merged
+
+
+def discover(sysfs=SYSFS, udev=UDEV_DATA, mounts=MOUNTS):
+    """Every block device (with its partitions) and every idle NVMe controller, deduplicated"""
+    points = read_mounts(mounts)
+    drives = [_drive(name, sysfs, udev, points) for name in sorted(_listdir(os.path.join(sysfs, 'block')))]
+    return dedupe(drives + _idle_controllers(sysfs, drives))
+
+
+def topology(sysfs=SYSFS, mounts=MOUNTS):
+    """
+    A cheap fingerprint of what discover() would see: per block device its
+    number, size, media sequence and partitions, the NVMe controllers, and
+    the mount table. Equal fingerprints mean the inventory is unchanged.
+    """
+    block = os.path.join(sysfs, 'block')
+    entries = []
+    for name in sorted(_listdir(block)):
+        base = os.path.join(block, name)
+        entries.append((name, _read(os.path.join(base, 'dev')), _read(os.path.join(base, 'size')),
+                        _read(os.path.join(base, 'diskseq')),
+                        tuple(sorted(e for e in _listdir(base) if e.startswith(name)))))
+    return (tuple(entries), tuple(sorted(_listdir(os.path.join(sysfs, 'class', 'nvme')))), _read(mounts))
+
+
+class DriveInventory:
+    """discover() cached until topology() changes; drives() is cheap to call on every refresh"""
+
+    def __init__(self, sysfs=SYSFS, udev=UDEV_DATA, mounts=MOUNTS):
+        self.sysfs = sysfs
+        self.udev = udev
+        self.mounts = mounts
+        self.scans = 0  # full discover() runs so far
+        self._topology = None
+        self._drives = []
+
+    def drives(self, refresh=False):
+        """The current drive list; rescanned only when the topology changed (or `refresh`)"""
+        current = topology(self.sysfs, self.mounts)
+        if refresh or current != self._topology:
+            self._drives = discover(self.sysfs, self.udev, self.mounts)
+            self._topology = current
+            self.scans += 1
+        return list(self._drives)
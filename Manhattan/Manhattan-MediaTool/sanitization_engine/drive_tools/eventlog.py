@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Sanitization Event Log
+Structured log for runs that sanitize many drives at once. Each record is
+one JSON line tagged with the run, job, device, serial and phase it belongs
+to, so the lines of parallel drives can be told apart and filtered later.
+
+  buffering - write() only appends to an in-memory buffer; a background
+              thread writes it out in batches every `interval` seconds.
+              The buffer is bounded: a writer that finds it full waits for
+              the flush thread instead of growing memory or dropping records.
+              Error records are flushed (and fsynced) at once.
+  rotation  - when the file would exceed `max_bytes` it is renamed to .1
+              (shifting older ones up to `backups`) and a new one started
+  tags      - tagged() sets tags for the current thread or asyncio task and
+              everything it starts; records pick them up automatically
+  exit      - close() runs at interpreter exit, so buffered records reach
+              the disk on normal exit, uncaught exceptions and SystemExit
+
+Query it with `python3 -m drive_tools.logquery --device sda --serial WD-123`.
+"""
+import atexit
+import contextvars
+import json
+import os
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_LOG = '/var/log/sanitization.log'  # the plain-text log's path; query() skips its old lines
+MAX_BYTES = 16 * 1024 * 1024
+BACKUPS = 5
+MAX_BUFFER = 10000  # records held in memory before writers wait
+FLUSH_SECONDS = 0.5
+URGENT_LEVELS = ('error', 'critical')
+
+_tags = contextvars.ContextVar('drive_tools_log_tags', default={})
+
+
+@contextmanager
+def tagged(**tags):
+    """Add tags to every record written by this thread or task (and the tasks it starts) inside the block"""
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags():
+    return dict(_tags.get())
+
+
+def _fsync(f):
+    try:
+        os.fsync(f.fileno())
+    except OSError:  # not a regular file, e.g. /dev/null
+        pass
+
+
+class EventLog:
+    """Buffered JSON Lines writer; write() is safe from any thread or asyncio task"""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS, max_buffer=MAX_BUFFER,
+                 interval=FLUSH_SECONDS, echo=None, **tags):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_buffer = max(1, max_buffer)
+        self.interval = interval
+        self.echo = echo  # a text stream that gets each message as a plain line
+        self.tags = tags  # on every record, e.g. run=...
+        self.records = 0
+        self._buffer = []
+        self._urgent = False
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name='eventlog-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, msg, level='info', when=None, **fields):
+        """
+        Queue one record. Tags come from the log, then tagged(), then
+        `fields`; None values are left out. `when` is a time.time() value.
+        """
+        record = {'time': datetime.fromtimestamp(time.time() if when is None else when).isoformat(),
+                  'level': level}
+        for key, value in {**self.tags, **_tags.get(), **fields}.items():
+            if value is not None:
+                record[key] = value
+        record['msg'] = str(msg)
+        line = json.dumps(record, default=str)
+        urgent = level in URGENT_LEVELS
+        with self._cond:
+            while len(self._buffer) >= self.max_buffer and not self._closed:
+                self._wake.set()
+                self._cond.wait()
+            self._buffer.append((line, record['msg']))
+            self.records += 1
+            self._urgent = self._urgent or urgent
+            closed = self._closed
+        if closed:
+            self.flush()
+        elif urgent or len(self._buffer) >= self.max_buffer // 2:
+            self._wake.set()
+
+    __call__ = write
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _rotate(self, incoming):
+        """Start a new file if `incoming` bytes would take this one past max_bytes"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if not stat.S_ISREG(st.st_mode) or st.st_size == 0 or st.st_size + incoming <= self.max_bytes:
+            return
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.backups < 1:
+            os.truncate(self.path, 0)
+            return
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def flush(self):
+        """Write out everything buffered so far; fsync when an error record was among it"""
+        with self._io_lock:  # held from taking the batch to writing it, so batches stay in order
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                urgent, self._urgent = self._urgent, False
+                self._cond.notify_all()
+            if not batch:
+                return
+            data = ''.join(line + '\n' for line, _ in batch)
+            self._rotate(len(data.encode('utf-8')))
+            f = self._open()
+            f.write(data)
+            f.flush()
+            if urgent:
+                _fsync(f)
+            if self.echo is not None:
+                try:
+                    self.echo.write(''.join(msg + '\n' for _, msg in batch))
+                    self.echo.flush()
+                except (OSError, ValueError):  # the console went away; the file still has it all
+                    pass
+
+    def close(self):
+        """Stop the flush thread and write out the rest; later writes go straight to the file"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                _fsync(self._file)
+                self._file.close()
+                self._file = None
+        atexit.unregister(self.close)
+
+
+def log_files(path):
+    """The log and its rotated backups, oldest first"""
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    return backups[::-1] + ([path] if os.path.exists(path) else [])
+
+
+def query(path, device=None, serial=None, job=None, phase=None, level=None):
+    """
+    Yield the records of a log (with its backups) that match every filter
+    given. Devices match by name with or without /dev/. Lines that cannot
+    contain a match are skipped before they are parsed.
+    """
+    device = os.path.basename(device) if device else None
+    # Escaped as write() escapes them, or quotes, backslashes and non-ASCII never match
+    needles = [json.dumps(str(value))[1:-1] for value in (device, serial) if value]
+    for name in log_files(path):
+        with open(name, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if any(needle not in line for needle in needles):
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:  # a line cut short by a crash
+                    continue
+                if device and os.path.basename(str(record.get('device', ''))) != device:
+                    continue
+                if serial and record.get('serial') != serial:
+                    continue
+                if job is not None and str(record.get('job')) != str(job):
+                    continue
+                if phase and record.get('phase') != phase:
+                    continue
+                if level and record.get('level') != level:
+                    continue
+                yield record
+
+
+def format_record(record):
+    """One human-readable line for a record"""
+    device = os.path.basename(str(record.get('device', ''))) or '-'
+    return f"{record.get('time', '')} {record.get('level', 'info'):<7} {device:<8} " \
+           f"{record.get('phase', '-'):<12} {record.get('msg', '')}"
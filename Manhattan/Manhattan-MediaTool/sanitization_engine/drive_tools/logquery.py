@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Sanitization Log Query
+Prints the records of the sanitization event log (and its rotated backups)
+that match a device, serial, job, phase or level.
+
+Usage: python3 -m drive_tools.logquery [log] --device sda --serial WD-123
+"""
+import argparse
+import json
+import sys
+
+from .eventlog import DEFAULT_LOG, format_record, query
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manhattan Project - filter the sanitization log")
+    parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help=f"log file (default: {DEFAULT_LOG})")
+    parser.add_argument('--device', help="device name, e.g. sda or /dev/nvme0n1")
+    parser.add_argument('--serial', help="drive serial number")
+    parser.add_argument('--job', help="job number within a run")
+    parser.add_argument('--phase', help="e.g. plan, erase, result")
+    parser.add_argument('--level', help="e.g. error")
+    parser.add_argument('--json', action='store_true', help="print the matching records as JSON lines")
+    args = parser.parse_args(argv)
+    count = 0
+    for record in query(args.log, args.device, args.serial, args.job, args.phase, args.level):
+        print(json.dumps(record) if args.json else format_record(record))
+        count += 1
+    return count
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
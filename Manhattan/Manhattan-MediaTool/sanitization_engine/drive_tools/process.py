@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Process Supervisor
+Runs drive commands (hdparm, nvme, cryptsetup) as asyncio subprocesses, so
+one event loop can drive every disk at once without a thread per drive.
+
+  streaming    - each stdout/stderr line goes to a callback as it arrives,
+                 stamped with the time it was read
+  watchdog     - a command still running after its timeout is terminated
+                 (SIGTERM, then SIGKILL after a grace period), along with
+                 any children it started: each runs in a session of its own
+  cancellation - cancelling the awaiting task terminates the process the
+                 same way before the cancellation propagates, so no command
+                 outlives the run that started it
+
+Children are reaped by asyncio's default child watcher. run_command leaves
+that process-wide setting alone, so other asyncio users in the process are
+unaffected. Before Python 3.12 this means one short-lived waitpid thread
+per running command; drive work itself never leaves the event loop.
+
+A drive keeps executing an erase it has already accepted even when the tool
+that issued it is killed; stopping the command only stops waiting for it.
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import time
+from collections import namedtuple
+
+KILL_GRACE = 5  # seconds between SIGTERM and SIGKILL
+LINE_LIMIT = 1024 * 1024  # longest output line read as one
+
+OutputLine = namedtuple('OutputLine', 'time stream text')
+# returncode is None when the command never started; error holds why it
+# did not complete (OSError, TimeoutError), or None
+CommandResult = namedtuple('CommandResult', 'cmd returncode stdout stderr seconds error')
+
+
+async def _pump(reader, stream, lines, on_line):
+    while True:
+        raw = await reader.readline()
+        if not raw:
+            return
+        line = OutputLine(time.time(), stream, raw.decode(errors='replace').rstrip('\r\n'))
+        lines.append(line.text)
+        if on_line is not None:
+            on_line(line)
+
+
+def _signal(proc, sig):
+    """Send `sig` to the process group of a command started by run_command"""
+    if hasattr(os, 'killpg'):
+        os.killpg(proc.pid, sig)
+    else:
+        proc.terminate()
+
+
+async def terminate(proc, grace=KILL_GRACE):
+    """SIGTERM the command's process group, SIGKILL it if still there after `grace` seconds, and reap it"""
+    if proc.returncode is not None:
+        return
+    try:
+        _signal(proc, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(proc.wait(), grace)
+        except asyncio.TimeoutError:
+            _signal(proc, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            await proc.wait()
+    except ProcessLookupError:
+        await proc.wait()
+
+
+async def run_command(cmd, timeout=None, on_line=None, grace=KILL_GRACE, console=False):
+    """
+    Run `cmd` to completion and return a CommandResult. Output lines are
+    passed to on_line(OutputLine) while the command runs; a command that
+    does not exit within `timeout` seconds is terminated and reported with
+    a TimeoutError. Cancelling the caller terminates the command too. With
+    `console` the command shares our stdin and stdout, so it can prompt the
+    operator; only its stderr is captured.
+    """
+    start = time.monotonic()
+    try:
+        proc = await asyncio.create_subprocess_exec(*cmd, stdin=None if console else subprocess.DEVNULL,
+                                                    stdout=None if console else subprocess.PIPE,
+                                                    stderr=subprocess.PIPE, limit=LINE_LIMIT,
+                                                    start_new_session=hasattr(os, 'killpg'))
+    except OSError as e:
+        return CommandResult(cmd, None, [], [], time.monotonic() - start, e)
+    stdout, stderr = [], []
+    error = None
+    pumps = [_pump(proc.stderr, 'stderr', stderr, on_line)]
+    if proc.stdout is not None:
+        pumps.append(_pump(proc.stdout, 'stdout', stdout, on_line))
+    io = asyncio.gather(*pumps, proc.wait())
+    io.add_done_callback(lambda f: f.cancelled() or f.exception())  # consumed here when interrupted
+    try:
+        await asyncio.wait_for(io, timeout)
+    except asyncio.TimeoutError:
+        error = TimeoutError(f"{cmd[0]} still running after {timeout:.0f}s")
+        await terminate(proc, grace)
+    except BaseException:  # cancelled, or the callback failed
+        await terminate(proc, grace)
+        raise
+    return CommandResult(cmd, proc.returncode, stdout, stderr, time.monotonic() - start, error)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Sanitize Progress
+Device-level erases run inside the drive for minutes to hours, and neither
+command reports progress on its own:
+
+  NVMe - `nvme sanitize` returns as soon as the drive has accepted the
+         operation. The drive then reports it in its Sanitize Status log
+         page: SPROG (fraction done, out of 65536) and SSTAT (in progress,
+         completed, failed). NvmeSanitizeProgress polls `nvme sanitize-log`.
+  ATA  - SECURITY ERASE UNIT blocks until the erase is over. The drive only
+         publishes an estimate in its IDENTIFY data (`hdparm -I`:
+         "NNNmin for SECURITY ERASE UNIT"). AtaEraseProgress measures elapsed
+         time against that estimate, held below 100% until the command
+         returns.
+
+ProgressMonitor polls either source on a background thread, or as a task on
+an asyncio event loop, and hands each ProgressEvent to a callback: the GUI
+progress bar, or the headless log.
+"""
+import asyncio
+import json
+import re
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from .process import run_command
+
+POLL_SECONDS = 5
+LOG_TIMEOUT = 30  # watchdog for one sanitize-log read
+IDENTIFY_TIMEOUT = 30  # watchdog for `hdparm -I`
+MAX_POLL_ERRORS = 5  # consecutive failed polls before the monitor gives up
+ATA_CAP = 0.99  # an estimate-based fraction never claims completion
+MIN_RATE_FRACTION = 0.01  # progress needed before SPROG is extrapolated
+IDLE_GRACE_POLLS = 6  # idle readings allowed before a sanitize counts as never started
+
+# Sanitize actions (nvme sanitize --sanact)
+SANACT_BLOCK_ERASE = 2
+SANACT_OVERWRITE = 3
+SANACT_CRYPTO_ERASE = 4
+# Block erase, keeping the erased blocks mapped. This replaced
+# `--sanitize 1 --no-deallocate`, which named no real option and action 1
+# (exit failure mode); drives without block erase in SANICAP reject it
+NVME_SANITIZE_ARGS = [f'--sanact={SANACT_BLOCK_ERASE}', '--no-dealloc']
+
+# SSTAT bits 2:0
+SSTAT_STATES = {0: 'idle', 1: 'done', 2: 'running', 3: 'failed', 4: 'done'}
+# Drive-reported estimates (seconds) per action, with and without deallocation
+ESTIMATE_FIELDS = {
+    SANACT_BLOCK_ERASE: ('time_block_erase_no_dealloc', 'time_block_erase'),
+    SANACT_OVERWRITE: ('time_over_write_no_dealloc', 'time_over_write'),
+    SANACT_CRYPTO_ERASE: ('time_crypto_erase_no_dealloc', 'time_crypto_erase'),
+}
+NO_ESTIMATE = 0xFFFFFFFF
+POLL_ERRORS = (OSError, ValueError, subprocess.SubprocessError)
+
+ERASE_MINUTES = re.compile(r'(\d+)\s*min for SECURITY ERASE UNIT')
+ENHANCED_ERASE_MINUTES = re.compile(r'(\d+)\s*min for ENHANCED SECURITY ERASE UNIT')
+
+ProgressEvent = namedtuple('ProgressEvent', 'device method fraction elapsed eta state')
+SanitizeStatus = namedtuple('SanitizeStatus', 'fraction state estimate')
+
+
+def format_event(event):
+    """One line for a ProgressEvent, e.g. 'nvme0n1: 42.0%, about 12 min left'"""
+    name = event.device.rsplit('/', 1)[-1]
+    if event.state != 'running':
+        return f"{name}: {event.method} {event.state} after {event.elapsed / 60:.1f} min"
+    done = "in progress" if event.fraction is None else f"{event.fraction * 100:.1f}%"
+    if event.eta is None:
+        return f"{name}: {done}, {event.elapsed / 60:.1f} min elapsed"
+    return f"{name}: {done}, about {event.eta / 60:.0f} min left"
+
+
+def extrapolate(fraction, seconds, since=0.0):
+    """Seconds left at the rate that took `seconds` to go from `since` to `fraction`"""
+    if fraction is None or fraction - since < MIN_RATE_FRACTION:
+        return None
+    return seconds * (1 - fraction) / (fraction - since)
+
+
+def parse_erase_estimate(text, enhanced=False):
+    """Erase estimate in seconds from `hdparm -I` output, or None when the drive gives none"""
+    match = (ENHANCED_ERASE_MINUTES if enhanced else ERASE_MINUTES).search(text or '')
+    return int(match.group(1)) * 60 if match else None
+
+
+def ata_erase_estimate(device, enhanced=False):
+    """
+    The drive's own SECURITY ERASE UNIT estimate in seconds, or None. Blocks
+    the calling thread; code on an event loop uses ata_erase_estimate_async.
+    """
+    try:
+        info = subprocess.run(['hdparm', '-I', device], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True, timeout=IDENTIFY_TIMEOUT).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return parse_erase_estimate(info, enhanced)
+
+
+async def ata_erase_estimate_async(device, enhanced=False):
+    """ata_erase_estimate through the process supervisor, so many drives can be asked at once"""
+    result = await run_command(['hdparm', '-I', device], IDENTIFY_TIMEOUT)
+    if result.returncode is None or result.error is not None:
+        return None
+    return parse_erase_estimate('\n'.join(result.stdout), enhanced)
+
+
+def _find_log(data):
+    """The object holding 'sprog' anywhere in nvme-cli's JSON (keyed by controller name)"""
+    if isinstance(data, dict):
+        if 'sprog' in data:
+            return data
+        data = list(data.values())
+    if isinstance(data, list):
+        for item in data:
+            found = _find_log(item)
+            if found is not None:
+                return found
+    return None
+
+
+def parse_sanitize_log(text, action=SANACT_BLOCK_ERASE):
+    """SanitizeStatus from `nvme sanitize-log -o json`; raises ValueError on unexpected output"""
+    log = _find_log(json.loads(text))
+    if log is None:
+        raise ValueError("no sanitize status in nvme output")
+    sstat = log.get('sstat', 0)
+    if isinstance(sstat, dict):  # nvme-cli 2.x splits SSTAT into fields
+        status = int(sstat.get('status', 0))
+    else:
+        status = int(sstat) & 0x7
+    state = SSTAT_STATES.get(status, 'failed')
+    fraction = int(log['sprog']) / 65536 if state == 'running' else None
+    estimate = None
+    for field in ESTIMATE_FIELDS.get(action, ()):
+        value = log.get(field)
+        if value not in (None, 0, NO_ESTIMATE):
+            estimate = int(value)
+            break
+    return SanitizeStatus(fraction, state, estimate)
+
+
+def sanitize_log_command(device):
+    return ['nvme', 'sanitize-log', device, '-o', 'json']
+
+
+def read_sanitize_log(device, action=SANACT_BLOCK_ERASE):
+    """SanitizeStatus of `device`, blocking the calling thread (ProgressMonitor.start); see read_sanitize_log_async"""
+    result = subprocess.run(sanitize_log_command(device), stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True, check=True, timeout=LOG_TIMEOUT)
+    return parse_sanitize_log(result.stdout, action)
+
+
+async def read_sanitize_log_async(device, action=SANACT_BLOCK_ERASE):
+    """read_sanitize_log through the process supervisor, for ProgressMonitor.follow"""
+    result = await run_command(sanitize_log_command(device), LOG_TIMEOUT)
+    if result.returncode != 0:
+        raise OSError(f"nvme sanitize-log failed: {result.error or ' '.join(result.stderr)}")
+    return parse_sanitize_log('\n'.join(result.stdout), action)
+
+
+class NvmeSanitizeProgress:
+    """Progress of a running NVMe sanitize, from the drive's sanitize log"""
+
+    method = 'NVMe sanitize'
+
+    def __init__(self, device, action=SANACT_BLOCK_ERASE):
+        self.device = device
+        self.action = action
+        self._first = None  # (elapsed, fraction) of the first reading, for the rate
+        self._idle = 0  # idle readings in a row
+
+    def poll(self, elapsed):
+        return self.update(read_sanitize_log(self.device, self.action), elapsed)
+
+    async def poll_async(self, elapsed):
+        return self.update(await read_sanitize_log_async(self.device, self.action), elapsed)
+
+    def update(self, status, elapsed):
+        """(fraction, state, eta) for a SanitizeStatus; the ETA follows SPROG's rate, else the drive's estimate"""
+        if status.state == 'idle':
+            # Right after `nvme sanitize` returns the log may not show the
+            # operation yet; only a log that stays idle means it never started
+            self._idle += 1
+            if self._idle <= IDLE_GRACE_POLLS:
+                return None, 'running', None
+            return None, 'failed', None
+        self._idle = 0
+        if status.state != 'running':
+            return 1.0 if status.state == 'done' else None, status.state, 0
+        if self._first is None and status.fraction is not None:
+            self._first = (elapsed, status.fraction)
+        eta = None
+        if self._first is not None:
+            eta = extrapolate(status.fraction, elapsed - self._first[0], self._first[1])
+        if eta is None and status.estimate is not None:
+            eta = max(status.estimate - elapsed, 0)
+        return status.fraction, 'running', eta
+
+
+class AtaEraseProgress:
+    """Progress of a blocking ATA secure erase, modelled from the drive's estimate"""
+
+    method = 'ATA secure erase'
+
+    def __init__(self, device, estimate):
+        self.device = device
+        self.estimate = estimate
+
+    def poll(self, elapsed):
+        """(fraction, state, eta); past the estimate the fraction holds and the ETA is unknown"""
+        if not self.estimate:
+            return None, 'running', None
+        left = self.estimate - elapsed
+        return min(elapsed / self.estimate, ATA_CAP), 'running', left if left > 0 else None
+
+    async def poll_async(self, elapsed):
+        return self.poll(elapsed)
+
+
+class ProgressMonitor(threading.Thread):
+    """
+    Poll a progress source every `interval` seconds and pass a ProgressEvent
+    to `callback`, either as a thread (start) or as a coroutine (follow).
+    Polling ends by itself when the source leaves the running state (NVMe)
+    or when finish() is called once the blocking erase command has returned
+    (ATA). Polling errors are skipped until
+    MAX_POLL_ERRORS of them in a row mark the operation failed.
+    """
+
+    def __init__(self, source, callback, interval=POLL_SECONDS):
+        super().__init__(daemon=True)
+        self.source = source
+        self.callback = callback
+        self.interval = interval
+        self.state = 'running'
+        self.last = None
+        self.error = None
+        self._errors = 0
+        self._began = time.monotonic()
+        self._halt = threading.Event()
+        self._lock = threading.Lock()
+
+    def _emit(self, fraction, state, eta):
+        with self._lock:
+            if self.state != 'running':
+                return
+            self.state = state
+            self.last = ProgressEvent(self.source.device, self.source.method, fraction,
+                                      time.monotonic() - self._began, eta, state)
+        self.callback(self.last)
+
+    def _polled(self, reading, error=None):
+        if error is not None:
+            self.error = error
+            self._errors += 1
+            if self._errors >= MAX_POLL_ERRORS:
+                self._emit(None, 'failed', None)
+            return
+        self._errors = 0
+        self._emit(*reading)
+
+    def elapsed(self):
+        return time.monotonic() - self._began
+
+    def poll(self):
+        try:
+            reading = self.source.poll(self.elapsed())
+        except POLL_ERRORS as e:
+            self._polled(None, e)
+        else:
+            self._polled(reading)
+
+    def run(self):
+        while self.state == 'running':
+            self.poll()
+            if self._halt.wait(self.interval):
+                break
+
+    async def follow(self):
+        """The polling loop as a coroutine, for callers on an event loop; cancel it or call finish()"""
+        while self.state == 'running' and not self._halt.is_set():
+            try:
+                reading = await self.source.poll_async(self.elapsed())
+            except POLL_ERRORS as e:
+                self._polled(None, e)
+            else:
+                self._polled(reading)
+            if self.state == 'running':
+                await asyncio.sleep(self.interval)
+
+    def finish(self, ok):
+        """Stop polling and report the outcome of the erase command; returns the last event"""
+        self._halt.set()
+        if self.is_alive():
+            self.join()
+        self._emit(1.0 if ok else None, 'done' if ok else 'failed', 0 if ok else None)
+        return self.last
+
+
+def wait_for_nvme_sanitize(device, callback, interval=POLL_SECONDS, timeout=None, action=SANACT_BLOCK_ERASE):
+    """
+    Follow a sanitize started on `device` until the drive reports it over
+    and return the final ProgressEvent (state 'done' or 'failed'). Giving up
+    after `timeout` seconds does not stop the drive; the sanitize resumes
+    even across power cycles until it completes.
+    """
+    monitor = ProgressMonitor(NvmeSanitizeProgress(device, action), callback, interval)
+    monitor.start()
+    monitor.join(timeout)
+    if monitor.is_alive():
+        return monitor.finish(False)
+    return monitor.last
+
+
+async def follow_nvme_sanitize(device, callback, interval=POLL_SECONDS, timeout=None, action=SANACT_BLOCK_ERASE):
+    """wait_for_nvme_sanitize for callers on an asyncio event loop"""
+    monitor = ProgressMonitor(NvmeSanitizeProgress(device, action), callback, interval)
+    try:
+        await asyncio.wait_for(monitor.follow(), timeout)
+    except asyncio.TimeoutError:
+        return monitor.finish(False)
+    return monitor.last
@@ -11,6 +11,11 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QObject
 
+# drive_tools is installed with the ISO; from the source tree it sits next to gui/
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from drive_tools import (NVME_SANITIZE_ARGS, AtaEraseProgress, DriveInventory, ProgressMonitor, ata_erase_estimate,
+                         format_event, format_size, wait_for_nvme_sanitize)
+
 # Aptos Configuration
 APTOS_MODULE_ADDRESS = "0xd2d618ed1248e1ac5f715991af3de929f8f4aa064983956c01ca77521178ed05"
 APTOS_NETWORK = "testnet"
@@ -77,7 +82,7 @@ QProgressBar {
 
 class WorkerSignals(QObject):
     finished = pyqtSignal(str, bool, dict)  # Added dict for drive info
-    progress = pyqtSignal(int)
+    progress = pyqtSignal(int, str)  # percent (-1 while unknown), status line
 
 class EraseWorker(threading.Thread):
     def __init__(self, method, device, drive_info, signals):
@@ -87,6 +92,10 @@ class EraseWorker(threading.Thread):
         self.drive_info = drive_info  # Store full drive info
         self.signals = signals
 
+    def report_progress(self, event):
+        percent = -1 if event.fraction is None else int(event.fraction * 100)
+        self.signals.progress.emit(percent, format_event(event))
+
     def run(self):
         try:
             # Check if running on Windows (shouldn't happen, but safety check)
@@ -103,8 +112,14 @@ class EraseWorker(threading.Thread):
                 return
             
             if self.method == 'NVMe Sanitize':
-                # Use block erase (1) as default
-                cmd = ["nvme", "sanitize", self.device, "--sanitize", "1", "--no-deallocate"]
+                # Block erase; the command returns once the drive has started it
+                cmd = ["nvme", "sanitize", self.device] + NVME_SANITIZE_ARGS
+                proc = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                event = wait_for_nvme_sanitize(self.device, self.report_progress)
+                ok = event.state == 'done'
+                self.signals.finished.emit(proc.stdout + proc.stderr + format_event(event), ok,
+                                           self.drive_info if ok else {})
+                return
             elif self.method == 'SED Crypto-Erase':
                 # Try cryptsetup (for LUKS SEDs)
                 cmd = ["cryptsetup", "luksErase", self.device]
@@ -112,8 +127,18 @@ class EraseWorker(threading.Thread):
                 # Set password NULL, then erase
                 cmd1 = ["hdparm", "--user-master", "u", "--security-set-pass", "NULL", self.device]
                 cmd2 = ["hdparm", "--user-master", "u", "--security-erase", "NULL", self.device]
+                estimate = ata_erase_estimate(self.device)
                 subprocess.run(cmd1, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                proc = subprocess.run(cmd2, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                # Without a drive estimate the bar stays indeterminate
+                monitor = ProgressMonitor(AtaEraseProgress(self.device, estimate), self.report_progress)
+                if estimate:
+                    monitor.start()
+                ok = False
+                try:
+                    proc = subprocess.run(cmd2, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                    ok = True
+                finally:
+                    monitor.finish(ok)
                 self.signals.finished.emit(proc.stdout + proc.stderr, True, self.drive_info)
                 return
             proc = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -147,6 +172,7 @@ class SanitizationEngineGUI(QWidget):
         self.setStyleSheet(DARK_STYLE)
 
         self.drives = []
+        self.inventory = DriveInventory()
         self.selected_drive = None
         self.selected_method = None
         self.boot_device = self.get_boot_device()
@@ -459,67 +485,38 @@ class SanitizationEngineGUI(QWidget):
             return []
 
     def _detect_drives_linux(self):
-        """Detect all drives on Linux using lsblk"""
+        """Detect disks and their partitions on Linux from sysfs (cached until the drive topology changes)"""
         drives = []
-        try:
-            # lsblk for all block devices
-            result = subprocess.run(['lsblk', '-o', 'NAME,SIZE,MODEL,SERIAL,TYPE,TRAN,PKNAME,MOUNTPOINT', '-J'], 
-                                  stdout=subprocess.PIPE, text=True, check=True)
-            data = json.loads(result.stdout)
-            for blk in data.get('blockdevices', []):
-                dev_path = f"/dev/{blk['name']}"
-                label = dev_path
-                if blk.get('type'):
-                    label += f" [{blk['type']}]"
-                if blk.get('pkname'):
-                    label += f" (Parent: /dev/{blk['pkname']})"
-                if blk.get('mountpoint'):
-                    label += f" (Mounted: {blk['mountpoint']})"
+        for disk in self.inventory.drives():
+            if disk.kind not in ('disk', 'rom'):  # loop, device-mapper, RAM disks
+                continue
+            label = f"{disk.path} [{disk.kind}]"
+            if disk.mountpoint:
+                label += f" (Mounted: {disk.mountpoint})"
+            if disk.aliases:
+                label += f" (Also: {', '.join(disk.aliases)})"
+            drives.append({
+                'name': disk.path,
+                'size': format_size(disk.size),
+                'model': disk.model or 'Unknown',
+                'serial': disk.serial or 'Unknown',
+                'tran': disk.tran or 'Unknown',
+                'type': disk.kind,
+                'label': label
+            })
+            for part in disk.partitions:
+                part_label = f"{part.path} [part] (Parent: {disk.path})"
+                if part.mountpoint:
+                    part_label += f" (Mounted: {part.mountpoint})"
                 drives.append({
-                    'name': dev_path,
-                    'size': blk.get('size', 'Unknown'),
-                    'model': blk.get('model', 'Unknown'),
-                    'serial': blk.get('serial', 'Unknown'),
-                    'tran': blk.get('tran', 'Unknown'),
-                    'type': blk.get('type', ''),
-                    'label': label
+                    'name': part.path,
+                    'size': format_size(part.size),
+                    'model': 'Unknown',
+                    'serial': 'Unknown',
+                    'tran': 'Unknown',
+                    'type': 'part',
+                    'label': part_label
                 })
-                # Also add children (partitions, etc.)
-                for child in blk.get('children', []):
-                    child_path = f"/dev/{child['name']}"
-                    child_label = child_path
-                    if child.get('type'):
-                        child_label += f" [{child['type']}]"
-                    if child.get('pkname'):
-                        child_label += f" (Parent: /dev/{child['pkname']})"
-                    if child.get('mountpoint'):
-                        child_label += f" (Mounted: {child['mountpoint']})"
-                    drives.append({
-                        'name': child_path,
-                        'size': child.get('size', 'Unknown'),
-                        'model': child.get('model', 'Unknown'),
-                        'serial': child.get('serial', 'Unknown'),
-                        'tran': child.get('tran', 'Unknown'),
-                        'type': child.get('type', ''),
-                        'label': child_label
-                    })
-            # nvme list for NVMe drives (only disks, not partitions)
-            nvme_result = subprocess.run(['nvme', 'list', '-o', 'json'], stdout=subprocess.PIPE, text=True)
-            if nvme_result.returncode == 0:
-                nvme_data = json.loads(nvme_result.stdout)
-                for dev in nvme_data.get('Devices', []):
-                    dev_path = dev.get('DevicePath', '')
-                    drives.append({
-                        'name': dev_path,
-                        'size': dev.get('UsedSize', 'Unknown'),
-                        'model': dev.get('ModelNumber', 'Unknown'),
-                        'serial': dev.get('SerialNumber', 'Unknown'),
-                        'tran': 'nvme',
-                        'type': 'disk',
-                        'label': dev_path + ' [nvme]'
-                    })
-        except Exception:
-            return drives
         return drives
 
     def update_method_info(self):
@@ -583,15 +580,27 @@ class SanitizationEngineGUI(QWidget):
 
     def start_sanitization(self, drive, method):
         self.result_label.setText('')
+        self.progress.setMaximum(0)  # Indeterminate until the first progress report
+        self.progress.resetFormat()
         self.progress.setVisible(True)
         self.start_button.setEnabled(False)
         self.drive_combo.setEnabled(False)
         # Start worker thread
         self.signals = WorkerSignals()
         self.signals.finished.connect(self.on_erase_finished)
+        self.signals.progress.connect(self.on_erase_progress)
         self.worker = EraseWorker(method, drive['name'], drive, self.signals)  # Pass full drive info
         self.worker.start()
 
+    def on_erase_progress(self, percent, status):
+        if percent < 0:
+            self.progress.setMaximum(0)
+        else:
+            self.progress.setMaximum(100)
+            self.progress.setValue(percent)
+        self.progress.setFormat(status.replace('%', '%%'))
+        self.result_label.setText(status)
+
     def on_erase_finished(self, output, success, drive_info):
         self.progress.setVisible(False)
         self.start_button.setEnabled(True)
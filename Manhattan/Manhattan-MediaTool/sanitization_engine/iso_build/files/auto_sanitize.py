@@ -1,38 +1,106 @@
 #!/usr/bin/env python3
-import subprocess
-import json
+import argparse
+import asyncio
+import re
+import signal
 import os
+import sys
+import time
+import weakref
+from collections import namedtuple
 from datetime import datetime
 
-def log(msg):
-    with open('/var/log/sanitization.log', 'a') as f:
-        f.write(f"[{datetime.now()}] {msg}\n")
-    print(msg)
+# drive_tools is installed with the ISO; from the source tree it sits two levels up
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from drive_tools import (DEFAULT_LOG, NVME_SANITIZE_ARGS, POLL_SECONDS, AtaEraseProgress, EventLog, ProgressMonitor,
+                         ata_erase_estimate_async, discover, follow_nvme_sanitize, format_event, run_command,
+                         tagged)
 
-def run(cmd):
+LOG_PATH = DEFAULT_LOG  # JSON Lines; filter with python3 -m drive_tools.logquery
+SYSFS = '/sys'
+# Concurrent sanitize jobs allowed per HBA/controller and per bus (PCI root
+# complex or USB bus). ATA/NVMe erases run inside the drive's firmware, so
+# limits only guard command and power budgets; USB bridges share bandwidth.
+MAX_PER_CONTROLLER = 8
+MAX_PER_BUS = 16
+MAX_PER_USB_BUS = 2
+# Fallback erase rates (bytes/s) when the drive reports no estimate
+HDD_ERASE_RATE = 150 * 1000 * 1000
+SSD_ERASE_RATE = 1000 * 1000 * 1000
+SED_SECONDS = 60
+TIMEOUT_FACTOR = 3  # a job is killed after this many times its estimate
+MIN_TIMEOUT = 3600
+# Watchdogs (seconds) for the quick commands of each method; the erase itself
+# gets the job's timeout, which scales with the drive's estimate
+WATCHDOG = {
+    'nvme': 120,  # nvme sanitize: returns once the drive has accepted it
+    'ata': 60,  # hdparm --security-set-pass
+    'sed': 600,  # cryptsetup luksErase: wipes the key slots
+}
+PROGRESS_LOG_STEP = 0.05  # log progress at every 5%
+
+PCI_ADDRESS = re.compile(r'^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]$')
+
+_console_locks = weakref.WeakKeyDictionary()  # event loop -> asyncio.Lock
+
+SanitizeJob = namedtuple('SanitizeJob', 'dev controller bus estimate')
+JobResult = namedtuple('JobResult', 'dev ok seconds error')
+
+_log = None
+
+def log(msg, when=None, level='info', **fields):
+    """
+    Record one event in the structured log (and echo it to the console).
+    Device, serial, job and phase come from the tagged() blocks around the
+    caller; `when` is a time.time() value, now by default.
+    """
+    global _log
+    if _log is None:
+        _log = EventLog(LOG_PATH, echo=sys.stdout, run=f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}")
+    _log.write(msg, level, when, **fields)
+
+def console_lock():
+    """The lock that lets one command at a time prompt on the console (one per event loop)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _console_locks:
+        _console_locks[loop] = asyncio.Lock()
+    return _console_locks[loop]
+
+async def run(cmd, timeout=None, dev=None, console=False):
+    """
+    Run one command on the event loop, logging its output line by line as it
+    arrives, and return True when it exits 0. A command still running after
+    `timeout` seconds is killed; cancelling the caller kills it as well.
+    With `console` the command keeps our stdin and stdout so it can ask the
+    operator for confirmation; only its stderr is logged.
+    """
+    tag = os.path.basename(dev or cmd[-1])
     log(f"Running: {' '.join(cmd)}")
-    try:
-        result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        log(result.stdout)
-        if result.stderr:
-            log(result.stderr)
-        return True
-    except subprocess.CalledProcessError as e:
-        log(f"Error: {e.stderr}")
-        return False
-
-def detect_devices():
-    # Use lsblk to get all block devices
-    result = subprocess.run(['lsblk', '-o', 'NAME,TYPE,MODEL,TRAN,SERIAL', '-J'], stdout=subprocess.PIPE, text=True, check=True)
-    data = json.loads(result.stdout)
+    result = await run_command(cmd, timeout, lambda line: log(f"{tag} {cmd[0]} {line.stream}: {line.text}", line.time,
+                                                             command=cmd[0], stream=line.stream), console=console)
+    if isinstance(result.error, TimeoutError):
+        log(f"Error: {cmd[0]} on {tag} still running after {timeout:.0f}s, killed", level='error')
+    elif isinstance(result.error, FileNotFoundError):
+        log(f"Error: {cmd[0]} not found", level='error')
+    elif result.error is not None:
+        log(f"Error: {cmd[0]} on {tag}: {result.error}", level='error')
+    elif result.returncode != 0:
+        log(f"Error: {cmd[0]} on {tag} exited with status {result.returncode}", level='error')
+    return result.returncode == 0
+
+def detect_devices(sysfs=SYSFS):
+    """
+    Every physical disk, once (multipath duplicates are folded into one
+    entry), read from sysfs, plus NVMe controllers without a namespace.
+    """
     devices = []
-    for blk in data.get('blockdevices', []):
-        if blk.get('type') == 'disk':
+    for drive in discover(sysfs):
+        if drive.kind == 'disk':
             dev = {
-                'name': f"/dev/{blk['name']}",
-                'model': blk.get('model', ''),
-                'tran': blk.get('tran', ''),
-                'serial': blk.get('serial', ''),
+                'name': drive.path,
+                'model': drive.model,
+                'tran': drive.tran,
+                'serial': drive.serial,
                 'type': 'unknown'
             }
             # NVMe detection
@@ -47,41 +115,237 @@ def detect_devices():
             devices.append(dev)
     return devices
 
-def sanitize_nvme(dev):
+def device_topology(name, sysfs=SYSFS):
+    """
+    (controller, bus) of a block device from its sysfs path, e.g.
+    /sys/devices/pci0000:00/0000:00:17.0/ata3/host2/.../block/sda ->
+    ('0000:00:17.0', 'pci0000:00'). The controller is the PCI function
+    closest to the disk; the bus is the USB bus if the disk hangs off one,
+    otherwise the PCI root complex. Unknown parts fall back to the name.
+    """
+    base = os.path.basename(name)
+    try:
+        parts = os.path.realpath(os.path.join(sysfs, 'block', base)).split(os.sep)
+    except OSError:
+        parts = []
+    pci = [p for p in parts if PCI_ADDRESS.match(p)]
+    usb = [p for p in parts if re.match(r'^usb\d+$', p)]
+    roots = [p for p in parts if p.startswith('pci') and ':' in p]
+    controller = pci[-1] if pci else base
+    bus = usb[0] if usb else (roots[0] if roots else controller)
+    return controller, bus
+
+def bus_limit(bus, max_per_bus=MAX_PER_BUS):
+    return min(max_per_bus, MAX_PER_USB_BUS) if bus.startswith('usb') else max_per_bus
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+async def estimate_seconds(dev, sysfs=SYSFS):
+    """Expected sanitize time: the drive's own ATA estimate, else size / a nominal erase rate"""
+    base = os.path.basename(dev['name'])
+    if dev['type'] == 'sed':
+        return SED_SECONDS
+    if dev['type'] == 'ata':
+        estimate = await ata_erase_estimate_async(dev['name'])
+        if estimate:
+            return estimate
+    sectors = _read_int(os.path.join(sysfs, 'block', base, 'size')) or 0
+    rotational = _read_int(os.path.join(sysfs, 'block', base, 'queue', 'rotational'))
+    rate = SSD_ERASE_RATE if dev['type'] == 'nvme' or rotational == 0 else HDD_ERASE_RATE
+    return sectors * 512 / rate
+
+async def plan_jobs(devices, sysfs=SYSFS, estimate=estimate_seconds):
+    """One SanitizeJob per supported device, longest estimate first; every drive is estimated at once"""
+    supported = []
+    for dev in devices:
+        with tagged(device=dev['name'], serial=dev.get('serial') or None, phase='plan'):
+            log(f"Device: {dev['name']} | Model: {dev['model']} | Type: {dev['type']}", model=dev['model'],
+                type=dev['type'])
+            if dev['type'] not in SANITIZERS:
+                log(f"Unknown device type for {dev['name']}, skipping.", level='warning')
+                continue
+            supported.append(dev)
+    estimates = await asyncio.gather(*(estimate(dev, sysfs) for dev in supported))
+    jobs = [SanitizeJob(dev, *device_topology(dev['name'], sysfs), seconds)
+            for dev, seconds in zip(supported, estimates)]
+    return sorted(jobs, key=lambda job: job.estimate, reverse=True)
+
+def progress_logger():
+    """Progress callback for the headless log: every PROGRESS_LOG_STEP, and when the state changes"""
+    logged = {'step': None}
+
+    def report(event):
+        step = None if event.fraction is None else int(event.fraction / PROGRESS_LOG_STEP)
+        if event.state != 'running' or step != logged['step']:
+            logged['step'] = step
+            log(format_event(event), level='error' if event.state == 'failed' else 'info',
+                fraction=event.fraction, eta=event.eta, state=event.state)
+    return report
+
+async def sanitize_nvme(dev, timeout=None, estimate=None):
     log(f"Sanitizing NVMe device: {dev['name']}")
-    return run(['nvme', 'sanitize', dev['name'], '--sanitize', '1', '--no-deallocate'])
+    # The command only starts the sanitize; the drive reports the rest in its sanitize log
+    with tagged(phase='sanitize-start'):
+        if not await run(['nvme', 'sanitize', dev['name']] + NVME_SANITIZE_ARGS, WATCHDOG['nvme'], dev['name']):
+            return False
+    with tagged(phase='sanitize-wait'):
+        event = await follow_nvme_sanitize(dev['name'], progress_logger(), POLL_SECONDS, timeout)
+    return event.state == 'done'
 
-def sanitize_ata(dev):
+async def sanitize_ata(dev, timeout=None, estimate=None):
     log(f"Sanitizing ATA device: {dev['name']}")
     # Set password NULL, then erase
-    ok1 = run(['hdparm', '--user-master', 'u', '--security-set-pass', 'NULL', dev['name']])
-    ok2 = run(['hdparm', '--user-master', 'u', '--security-erase', 'NULL', dev['name']])
+    with tagged(phase='set-password'):
+        ok1 = await run(['hdparm', '--user-master', 'u', '--security-set-pass', 'NULL', dev['name']],
+                        WATCHDOG['ata'], dev['name'])
+    with tagged(phase='erase'):
+        monitor = ProgressMonitor(AtaEraseProgress(dev['name'], estimate), progress_logger(), POLL_SECONDS)
+        follower = asyncio.ensure_future(monitor.follow())
+        ok2 = False
+        try:
+            ok2 = await run(['hdparm', '--user-master', 'u', '--security-erase', 'NULL', dev['name']], timeout,
+                            dev['name'])
+        finally:
+            follower.cancel()
+            monitor.finish(ok2)
     return ok1 and ok2
 
-def sanitize_sed(dev):
+async def sanitize_sed(dev, timeout=None, estimate=None):
     log(f"Sanitizing SED device: {dev['name']}")
-    return run(['cryptsetup', 'luksErase', dev['name']])
+    # cryptsetup asks for confirmation on a terminal (and, as before, goes
+    # ahead unasked when stdin is not one), so drives prompt one at a time
+    with tagged(phase='erase'):
+        async with console_lock():
+            return await run(['cryptsetup', 'luksErase', dev['name']], WATCHDOG['sed'], dev['name'], console=True)
+
+SANITIZERS = {'nvme': sanitize_nvme, 'ata': sanitize_ata, 'sed': sanitize_sed}
+
+async def run_job(job, sanitizers=SANITIZERS):
+    """Sanitize one device; every failure is caught so it only affects this drive"""
+    start = time.monotonic()
+    timeout = max(MIN_TIMEOUT, job.estimate * TIMEOUT_FACTOR)
+    try:
+        ok, error = bool(await sanitizers[job.dev['type']](job.dev, timeout, job.estimate)), None
+    except Exception as e:
+        ok, error = False, e
+    return JobResult(job.dev['name'], ok, time.monotonic() - start, error)
+
+async def schedule(jobs, max_jobs=None, max_per_controller=MAX_PER_CONTROLLER, max_per_bus=MAX_PER_BUS,
+                   runner=run_job):
+    """
+    Run jobs concurrently on the event loop and yield a JobResult as each
+    finishes. Jobs start in the given (longest-first) order, skipping ahead
+    past any job whose controller or bus is at its limit, so the longest
+    erases start as early as the topology allows and short ones fill the
+    gaps. Closing the generator early cancels the jobs still running, which
+    kills their commands. Each job's records are tagged with its number
+    (1 = first in the given order), device and serial.
+    """
+    pending = list(jobs)
+    numbers = {id(job): n for n, job in enumerate(pending, 1)}
+    max_jobs = max(1, max_jobs or len(pending))
+    max_per_controller = max(1, max_per_controller)
+    max_per_bus = max(1, max_per_bus)
+    per_controller = {}
+    per_bus = {}
+    running = {}
+    try:
+        while pending or running:
+            for job in list(pending):
+                if len(running) >= max_jobs:
+                    break
+                if (per_controller.get(job.controller, 0) >= max_per_controller
+                        or per_bus.get(job.bus, 0) >= bus_limit(job.bus, max_per_bus)):
+                    continue
+                pending.remove(job)
+                per_controller[job.controller] = per_controller.get(job.controller, 0) + 1
+                per_bus[job.bus] = per_bus.get(job.bus, 0) + 1
+                with tagged(job=numbers[id(job)], device=job.dev['name'], serial=job.dev.get('serial') or None,
+                            phase='start'):
+                    log(f"Starting {job.dev['name']} (controller {job.controller}, bus {job.bus}, "
+                        f"estimate {job.estimate / 60:.0f} min)", controller=job.controller, bus=job.bus,
+                        estimate=job.estimate)
+                    # the task copies the tags above into every record it writes
+                    running[asyncio.ensure_future(runner(job))] = job
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                job = running.pop(task)
+                per_controller[job.controller] -= 1
+                per_bus[job.bus] -= 1
+                yield task.result()
+    finally:
+        for task, job in running.items():
+            with tagged(job=numbers[id(job)], device=job.dev['name'], phase='cancel'):
+                log(f"Cancelling {job.dev['name']}; the drive may still complete an erase it has accepted",
+                    level='warning')
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+async def sanitize_all(devices, args):
+    """
+    Plan and run the schedule until it is done, or until SIGINT/SIGTERM
+    cancels it; returns the failed devices
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    jobs = await plan_jobs(devices)
+    failed = []
+    serials = {job.dev['name']: job.dev.get('serial') or None for job in jobs}
+    results = schedule(jobs, args.max_jobs, args.max_per_controller, args.max_per_bus)
+    try:  # closed explicitly, so running jobs are cancelled even when the loop is left early
+        async for result in results:
+            status = "done" if result.ok else f"FAILED{f' ({result.error})' if result.error else ''}"
+            with tagged(device=result.dev, serial=serials.get(result.dev), phase='result'):
+                log(f"{result.dev}: {status} in {result.seconds / 60:.1f} min", level='info' if result.ok else 'error',
+                    ok=result.ok, seconds=result.seconds, error=result.error)
+            if not result.ok:
+                failed.append(result.dev)
+    finally:
+        await results.aclose()
+    return failed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manhattan Project - Auto-Sanitization")
+    parser.add_argument('--max-jobs', type=int, default=None, help="concurrent jobs in total (default: all drives)")
+    parser.add_argument('--max-per-controller', type=int, default=MAX_PER_CONTROLLER,
+                        help=f"concurrent jobs per storage controller (default: {MAX_PER_CONTROLLER})")
+    parser.add_argument('--max-per-bus', type=int, default=MAX_PER_BUS,
+                        help=f"concurrent jobs per PCI root or USB bus (default: {MAX_PER_BUS}; "
+                             f"USB buses at most {MAX_PER_USB_BUS})")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    # SIGTERM outside the event loop exits through atexit, which flushes the log
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    try:
+        with tagged(phase='run'):
+            _main(args)
+    finally:
+        if _log is not None:
+            _log.flush()
+
+def _main(args):
     log("==== Manhattan Project Auto-Sanitization Started ====")
     devices = detect_devices()
     if not devices:
-        log("No block devices found for sanitization.")
+        log("No block devices found for sanitization.", level='warning')
         return
-    for dev in devices:
-        log(f"Device: {dev['name']} | Model: {dev['model']} | Type: {dev['type']}")
-        if dev['type'] == 'nvme':
-            sanitize_nvme(dev)
-        elif dev['type'] == 'sed':
-            sanitize_sed(dev)
-        elif dev['type'] == 'ata':
-            sanitize_ata(dev)
-        else:
-            log(f"Unknown device type for {dev['name']}, skipping.")
+    try:
+        failed = asyncio.run(sanitize_all(devices, args))
+    except asyncio.CancelledError:
+        log("==== Manhattan Project Auto-Sanitization Cancelled ====")
+        return
+    if failed:
+        log(f"Sanitization failed on: {', '.join(failed)}", level='error', failed=failed)
     log("==== Manhattan Project Auto-Sanitization Complete ====")
 
 if __name__ == '__main__':
     main()
-
-
-
@@ -34,6 +34,8 @@ sudo cp -r "$EXTRACT_DIR/casper" "$CUSTOM_DIR/"
 sudo mount --bind /dev "$CUSTOM_DIR/casper/dev"
 # Copy auto_sanitize.py into chroot
 sudo cp "$PWD/../files/auto_sanitize.py" "$CUSTOM_DIR/casper/tmp/auto_sanitize.py"
+# Copy the shared drive_tools package (used by both the GUI and auto_sanitize.py)
+sudo cp -r "$PWD/../../drive_tools" "$CUSTOM_DIR/casper/tmp/drive_tools"
 sudo chroot "$CUSTOM_DIR/casper" /bin/bash <<EOF
 apt-get update
 apt-get install -y python3 python3-pyqt5 hdparm nvme-cli cryptsetup parted lsblk udev
@@ -43,6 +45,8 @@ cp -r "$GUI_SRC_DIR"/* /opt/manhattan_gui/
 # Move auto_sanitize.py to /usr/local/bin and make executable
 mv /tmp/auto_sanitize.py /usr/local/bin/auto_sanitize.py
 chmod +x /usr/local/bin/auto_sanitize.py
+# Install drive_tools where python3 finds it from anywhere
+mv /tmp/drive_tools /usr/lib/python3/dist-packages/drive_tools
 # Set GUI to autostart (for live session)
 echo "[Desktop Entry]
 Type=Application
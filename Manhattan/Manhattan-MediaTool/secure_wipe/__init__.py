@@ -0,0 +1,45 @@
+"""
+Manhattan Project - Secure Wipe Engine
+Shared overwrite engine used by the CLI and GUI secure deletion tools.
+"""
+from .batch import BATCH_FILES, SMALL_FILE_THRESHOLD, SmallFileBatcher
+from .durability import (
+    DURABILITY_POLICIES,
+    DurabilityPolicy,
+    GroupCommit,
+    PerFileSync,
+    PerPassSync,
+    make_policy,
+)
+from .flash import FLASH_MODES, FlashResult, FlashWiper, TrimResult
+from .freespace import DEFAULT_RESERVE, FILL_FILE_BYTES, FillFile, FreeSpaceWiper
+from .engine import (
+    ALIGNMENT,
+    CHUNK_SIZE,
+    IO_MODES,
+    OverwriteEngine,
+    aligned_buffer,
+    data_extents,
+    default_patterns,
+    overwrite_file,
+)
+from .journal import WipeJournal, journal_path
+from .logstream import LogStream
+from .metrics import FileEvent, Histogram, PassEvent, WipeMetrics
+from .patterns import FixedPattern, Keystream, RandomPattern, available_backends
+from .parallel import ParallelWiper, WipeResult, device_queue, device_workers, wipe_file, wipe_files_parallel
+from .plan import WipePlan, WipeProgress, format_bytes, format_duration, plan_wipe
+from .schedules import SCHEDULES, PassSchedule, PassSpec, make_schedule, parse_custom
+from .shard import SHARD_MIN_BYTES, SHARD_WORKERS, ShardedOverwriter, split_extents
+from .verify import (
+    VERIFY_MODES,
+    BackgroundVerifier,
+    VerificationError,
+    Verifier,
+    VerifyResult,
+    describe_verification,
+    make_verifier,
+    sample_size,
+)
+from .vault import KEY_SCOPES, CryptoVault, ShredResult, VaultError, destroy_key_file
+from .walk import TreeWalker, iter_files
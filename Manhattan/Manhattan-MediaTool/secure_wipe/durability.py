@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Durability Policies
+Decide when overwritten data is forced to stable storage, and measure how
+long the wipe spends waiting for it.
+
+  pass  - fdatasync after every pass. Each pass reaches the media before the
+          next one starts, so every pattern is physically written. Slowest.
+  file  - one fdatasync per file after its last pass. Only the final pass is
+          guaranteed to reach the media; earlier passes may be coalesced in
+          the page cache and never written separately.
+  group - syncfs after every N files or M bytes, then the batch is unlinked.
+          Like 'file', only the final pass is guaranteed, but no file is
+          unlinked before its overwrite is durable, and sync cost is shared.
+
+Every policy can also fsync the parent directories once at the end of the
+run (sync_dirs) so the unlinks themselves survive a crash.
+"""
+import ctypes
+import ctypes.util
+import os
+import threading
+import time
+
+DEFAULT_GROUP_FILES = 1000
+DEFAULT_GROUP_BYTES = 256 * 1024 * 1024
+
+_libc = None
+if hasattr(os, 'fdatasync'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        pass
+
+
+def syncfs(fd):
+    """Flush the whole filesystem containing fd (os.sync() where unavailable)"""
+    if _libc is not None and hasattr(_libc, 'syncfs'):
+        if _libc.syncfs(fd) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    elif hasattr(os, 'sync'):
+        os.sync()
+
+
+def datasync(fd):
+    if hasattr(os, 'fdatasync'):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)  # Windows: FlushFileBuffers
+
+
+def sync_fds(fds, timed):
+    """
+    Make the data of many open files durable with as few calls as possible:
+    one syncfs per filesystem, or one datasync per file where syncfs is missing.
+    """
+    if _libc is not None and hasattr(_libc, 'syncfs'):
+        devices = {}
+        for fd in fds:
+            devices.setdefault(os.fstat(fd).st_dev, fd)
+        fds = devices.values()
+        sync = syncfs
+    else:
+        sync = datasync
+    for fd in fds:
+        timed(sync, fd)
+
+
+def fsync_directory(path):
+    """Persist directory entries (unlinks); a no-op on Windows"""
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DurabilityPolicy:
+    """Base policy: bookkeeping, timing and the final directory fsync"""
+    name = None
+    guarantee = None
+    syncs_each_pass = False
+    defers_file_sync = False  # after_file() leaves the sync to a later commit
+
+    def __init__(self, sync_dirs=True):
+        self.sync_dirs = sync_dirs
+        self.sync_seconds = 0.0
+        self.sync_calls = 0
+        self.unlink_seconds = 0.0
+        self.failed = []  # (path, error) for deferred unlinks that failed
+        self._dirs = set()
+        self._lock = threading.Lock()
+
+    def timed(self, func, *args):
+        """Run a sync call and account for the time spent in it"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.sync_seconds += elapsed
+                self.sync_calls += 1
+
+    def after_pass(self, fd):
+        """Called after each overwrite pass, with the file still open"""
+
+    def after_file(self, fd, size):
+        """Called once after the last pass, before the file is closed"""
+
+    def after_batch_pass(self, fds):
+        """Called after each pass over a batch of small files"""
+
+    def after_batch(self, fds, sizes):
+        """Called once after the last pass over a batch of small files"""
+        for fd, size in zip(fds, sizes):
+            self.after_file(fd, size)
+
+    def unlink(self, path):
+        """Remove an overwritten file (possibly deferred until it is durable)"""
+        start = time.perf_counter()
+        try:
+            os.unlink(path)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.unlink_seconds += elapsed
+        self.track_removal(path)
+
+    def track_removal(self, path):
+        """Remember the parent of a removed entry for the final directory fsync"""
+        if self.sync_dirs:
+            with self._lock:
+                self._dirs.add(os.path.dirname(os.path.abspath(path)))
+
+    def finish(self):
+        """Flush anything deferred and fsync every directory that lost files"""
+        with self._lock:
+            dirs, self._dirs = self._dirs, set()
+        for path in dirs:
+            try:
+                self.timed(fsync_directory, path)
+            except FileNotFoundError:
+                pass  # removed along with the tree
+
+    def describe(self):
+        return f"{self.name}: {self.guarantee}"
+
+    def summary(self):
+        return f"{self.sync_calls} sync call(s), {self.sync_seconds:.3f}s spent syncing ({self.name} policy)"
+
+
+class PerPassSync(DurabilityPolicy):
+    name = 'pass'
+    guarantee = "every pass reaches stable storage before the next one starts"
+    syncs_each_pass = True
+
+    def after_pass(self, fd):
+        self.timed(datasync, fd)
+
+    def after_batch_pass(self, fds):
+        sync_fds(fds, self.timed)
+
+
+class PerFileSync(DurabilityPolicy):
+    name = 'file'
+    guarantee = "the final pass of each file is on stable storage before it is unlinked"
+
+    def after_file(self, fd, size):
+        self.timed(datasync, fd)
+
+    def after_batch(self, fds, sizes):
+        sync_fds(fds, self.timed)
+
+
+class GroupCommit(DurabilityPolicy):
+    name = 'group'
+    defers_file_sync = True
+
+    def __init__(self, group_files=DEFAULT_GROUP_FILES, group_bytes=DEFAULT_GROUP_BYTES, sync_dirs=True):
+        super().__init__(sync_dirs)
+        self.group_files = group_files
+        self.group_bytes = group_bytes
+        self.guarantee = (f"final passes are flushed with syncfs every {group_files} files or "
+                          f"{group_bytes // (1024 * 1024)} MiB; files are unlinked only after their flush")
+        self._pending = []
+        self._pending_bytes = 0
+        self._sync_fds = {}  # st_dev -> fd kept open so syncfs can reach that filesystem
+
+    def after_file(self, fd, size):
+        dev = os.fstat(fd).st_dev
+        with self._lock:
+            self._pending_bytes += size
+            if dev not in self._sync_fds:
+                self._sync_fds[dev] = os.dup(fd)
+
+    def unlink(self, path):
+        with self._lock:
+            self._pending.append(path)
+            due = len(self._pending) >= self.group_files or self._pending_bytes >= self.group_bytes
+        if due:
+            self.commit()
+
+    def commit(self):
+        """syncfs every touched filesystem, then unlink the now-durable batch"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._pending_bytes = 0
+            sync_fds = list(self._sync_fds.values())
+        if not batch:
+            return
+        for fd in sync_fds:
+            self.timed(syncfs, fd)
+        for path in batch:
+            try:
+                DurabilityPolicy.unlink(self, path)
+            except OSError as e:
+                self.failed.append((path, e))
+
+    def finish(self):
+        try:
+            self.commit()
+        finally:
+            with self._lock:
+                sync_fds, self._sync_fds = self._sync_fds, {}
+            for fd in sync_fds.values():
+                os.close(fd)
+            super().finish()
+
+
+DURABILITY_POLICIES = {
+    'pass': PerPassSync,
+    'file': PerFileSync,
+    'group': GroupCommit,
+}
+
+
+def make_policy(name='pass', sync_dirs=True, **options):
+    """Build a policy by name; group options: group_files, group_bytes"""
+    try:
+        cls = DURABILITY_POLICIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown durability policy: {name}")
+    if cls is GroupCommit:
+        return cls(sync_dirs=sync_dirs, **options)
+    return cls(sync_dirs=sync_dirs)
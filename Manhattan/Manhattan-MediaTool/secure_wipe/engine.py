@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Streaming Overwrite Engine
+Overwrites files in fixed-size chunks through one reused, page-aligned buffer,
+so memory use stays constant no matter how large the file is. Only allocated
+extents are written: holes in sparse files are skipped, never filled in.
+Random passes are pipelined: a generator thread fills a small pool of
+buffers while the calling thread writes the previous one, so RNG and I/O
+overlap instead of taking turns.
+"""
+import errno
+import mmap
+import os
+import queue
+import threading
+import time
+
+from .durability import PerPassSync
+from .schedules import make_schedule
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB per write call
+ALIGNMENT = mmap.PAGESIZE  # anonymous mappings are always page aligned
+CACHE_WINDOW = 64 * 1024 * 1024  # max dirty bytes kept in 'nocache' mode
+PIPELINE_DEPTH = 2  # chunk buffers per pipelined pass: one being filled, one being written
+
+IO_MODES = ('buffered', 'direct', 'nocache')
+HAVE_DIRECT_IO = hasattr(os, 'O_DIRECT')
+HAVE_FADVISE = hasattr(os, 'posix_fadvise') and hasattr(os, 'fdatasync')
+HAVE_SEEK_DATA = hasattr(os, 'SEEK_DATA')
+
+
+def aligned_buffer(size):
+    """Allocate a zero-filled, page-aligned buffer rounded up to ALIGNMENT"""
+    size = max(ALIGNMENT, -(-size // ALIGNMENT) * ALIGNMENT)
+    return mmap.mmap(-1, size)
+
+
+def _pwrite(fd, data, offset):
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, data, offset)
+    # Windows has no pwrite(); emulate it with an explicit seek
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, data)
+
+
+def pwrite_all(fd, view, offset):
+    """Write the whole memoryview at `offset`, retrying on short writes"""
+    while view:
+        written = _pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def data_extents(fd, size):
+    """
+    List the (offset, length) ranges of an open file that hold data, using
+    SEEK_DATA/SEEK_HOLE. Falls back to one range covering the whole file
+    where the platform or filesystem cannot report holes.
+    """
+    if not size:
+        return []
+    if not HAVE_SEEK_DATA:
+        return [(0, size)]
+    extents = []
+    offset = 0
+    try:
+        while offset < size:
+            try:
+                start = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:  # nothing but holes up to EOF
+                    break
+                raise
+            if start >= size:
+                break
+            end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+            extents.append((start, end - start))
+            offset = end
+    except OSError as e:
+        if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+            raise
+        return [(0, size)]
+    return extents
+
+
+def default_patterns(passes=3):
+    """Zeros, ones, then random data for every remaining pass (the 'standard' schedule)"""
+    return make_schedule('standard', passes).patterns()
+
+
+class OverwriteEngine:
+    """
+    Multi-pass overwrite engine with bounded memory.
+    A single engine can (and should) be reused for many files so the chunk
+    buffer is allocated only once.
+
+    io_mode controls how passes interact with the page cache:
+      'buffered' - plain writes through the page cache (default)
+      'direct'   - O_DIRECT from the aligned buffer; the unaligned tail goes
+                   through the cache and is dropped afterwards. Falls back to
+                   'nocache' when the filesystem rejects direct I/O.
+      'nocache'  - buffered writes, flushed and dropped with
+                   posix_fadvise(DONTNEED) every CACHE_WINDOW bytes
+    `cache_avoided` counts the bytes that never stayed in the page cache and
+    `direct_fallbacks` the files (or passes) that had to fall back.
+
+    `durability` is a DurabilityPolicy deciding when data is synced and how
+    overwritten files are unlinked; the default syncs after every pass.
+    `final_pattern` is the last pattern written, for read-back verification.
+    `allocated` is the number of data bytes (holes excluded) in the last file
+    and `bytes_written` the running total over all passes and files.
+
+    `schedule` is the PassSchedule every file is overwritten with; without
+    one the standard schedule (zeros, ones, random...) of `passes` is used.
+
+    With a WipeJournal every pass is checkpointed, and files the journal
+    shows as interrupted resume from their last checkpoint.
+
+    Time spent generating patterns and in write calls is accumulated in
+    `rng_seconds` and `write_seconds`; with a WipeMetrics collector every
+    pass and file is also reported as an event. With `pipeline` random
+    passes longer than one chunk are generated on a producer thread into
+    `pipeline_depth` buffers and overlap with the writes; the two timers then
+    add up to more than the wall-clock time of the pass. The default (None)
+    pipelines when there is a spare CPU, or in 'direct' mode, where writes
+    wait for the device and leave the CPU free even on a single core.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, io_mode='buffered', durability=None, journal=None, metrics=None,
+                 schedule=None, pipeline=None, pipeline_depth=PIPELINE_DEPTH):
+        if io_mode not in IO_MODES:
+            raise ValueError(f"Unknown I/O mode: {io_mode}")
+        self.chunk_size = max(ALIGNMENT, chunk_size // ALIGNMENT * ALIGNMENT)
+        self.io_mode = io_mode
+        self.cache_avoided = 0
+        self.direct_fallbacks = 0
+        self.final_pattern = None
+        self.allocated = 0
+        self.bytes_written = 0
+        self.durability = durability if durability is not None else PerPassSync()
+        self.journal = journal
+        self.metrics = metrics
+        self.schedule = schedule
+        self.rng_seconds = 0.0
+        self.write_seconds = 0.0
+        if pipeline is None:
+            pipeline = (os.cpu_count() or 1) > 1 or self.effective_io_mode == 'direct'
+        self.pipeline = pipeline
+        self.pipeline_depth = max(2, pipeline_depth)
+        self._buffer = aligned_buffer(self.chunk_size)
+        self._view = memoryview(self._buffer)
+        self._pool = []  # extra (buffer, view) pairs for pipelined passes, allocated on first use
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.durability.finish()
+        if self._buffer is not None:
+            for buffer, view in [(self._buffer, self._view)] + self._pool:
+                try:
+                    view.release()
+                    buffer.close()
+                except BufferError:
+                    pass  # a pending traceback still holds a chunk slice; freed along with it
+            self._buffer = None
+            self._pool = []
+
+    @property
+    def effective_io_mode(self):
+        """The mode actually in use after platform/filesystem fallbacks"""
+        if self.io_mode == 'direct' and not HAVE_DIRECT_IO:
+            return 'nocache' if HAVE_FADVISE else 'buffered'
+        if self.io_mode == 'nocache' and not HAVE_FADVISE:
+            return 'buffered'
+        return self.io_mode
+
+    def patterns(self, passes):
+        """Fresh pattern objects (new random seeds) for one file or batch"""
+        if self.schedule is None:
+            return default_patterns(passes)
+        if passes != len(self.schedule):
+            raise ValueError(f"{self.schedule.name} schedule has {len(self.schedule)} pass(es), not {passes}")
+        return self.schedule.patterns()
+
+    def overwrite(self, file_path, passes=3, on_pass_start=None, on_pass_complete=None):
+        """
+        Overwrite the allocated extents of a file with `passes` patterns,
+        syncing as the durability policy demands. on_pass_complete receives
+        the allocated byte count. Returns the file size; raises OSError.
+        """
+        journal = self.journal
+        patterns = self.patterns(passes)
+        start_pass = start_offset = 0
+        if journal is not None:
+            patterns = journal.patterns(file_path, patterns)
+            if journal.is_done(file_path):  # finished before an interruption
+                self.final_pattern = patterns[-1] if patterns else None
+                self.allocated = 0
+                return os.stat(file_path).st_size
+            start_pass, start_offset = journal.resume_point(file_path)
+        metrics = self.metrics
+        file_start = time.perf_counter()
+        fd = os.open(file_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        direct_fd = None
+        self.final_pattern = None
+        try:
+            if self.effective_io_mode == 'direct':
+                direct_fd = self._open_direct(file_path)
+            size = os.fstat(fd).st_size
+            extents = data_extents(fd, size)
+            self.allocated = sum(length for _, length in extents)
+            for index, pattern in enumerate(patterns):
+                if index < start_pass:
+                    continue
+                start = start_offset if index == start_pass else 0
+                checkpoint = None
+                if journal is not None:
+                    journal.pass_started(file_path, index, pattern)
+                    checkpoint = lambda offset, index=index: journal.checkpoint(file_path, index, offset)
+                if on_pass_start:
+                    on_pass_start(index, pattern)
+                pass_start = time.perf_counter()
+                rng, write = self.rng_seconds, self.write_seconds
+                direct_fd = self.write_pass(fd, size, pattern, direct_fd, extents, start, checkpoint)
+                written = sum(max(0, min(length, offset + length - start)) for offset, length in extents)
+                self.bytes_written += written
+                self.durability.after_pass(fd)
+                if metrics is not None:
+                    metrics.pass_done(file_path, index, pattern.name, written, time.perf_counter() - pass_start,
+                                      self.rng_seconds - rng, self.write_seconds - write)
+                if journal is not None:
+                    journal.checkpoint(file_path, index + 1, 0)
+                self.final_pattern = pattern
+                if on_pass_complete:
+                    on_pass_complete(index, pattern, self.allocated)
+            self.durability.after_file(fd, size)
+            if journal is not None:
+                journal.file_done(file_path)
+            if metrics is not None:
+                metrics.file_done(file_path, size, self.allocated, passes, time.perf_counter() - file_start)
+        finally:
+            if direct_fd is not None:
+                os.close(direct_fd)
+            os.close(fd)
+        return size
+
+    def fill(self, fd, size, passes=1, direct_fd=None):
+        """
+        Write `passes` patterns over [0, size) of an open, preallocated file
+        (aligned chunks through `direct_fd` when given).
+        Unlike overwrite() every byte is written: preallocated extents are
+        unwritten and SEEK_DATA reports them as holes. Used for free-space
+        wipes; not journalled. Returns the direct descriptor to keep using, as
+        write_pass() does. Raises OSError (ENOSPC when the space runs out).
+        """
+        metrics = self.metrics
+        file_start = time.perf_counter()
+        self.final_pattern = None
+        self.allocated = size
+        for index, pattern in enumerate(self.patterns(passes)):
+            pass_start = time.perf_counter()
+            rng, write = self.rng_seconds, self.write_seconds
+            direct_fd = self.write_pass(fd, size, pattern, direct_fd)
+            self.bytes_written += size
+            self.durability.after_pass(fd)
+            if metrics is not None:
+                metrics.pass_done(None, index, pattern.name, size, time.perf_counter() - pass_start,
+                                  self.rng_seconds - rng, self.write_seconds - write)
+            self.final_pattern = pattern
+        self.durability.after_file(fd, size)
+        if metrics is not None:
+            metrics.file_done(None, size, size, passes, time.perf_counter() - file_start)
+        return direct_fd
+
+    def overwrite_batch(self, paths, passes=3):
+        """
+        Overwrite many small files (each at most chunk_size bytes) together.
+        Every pass fills the chunk buffer once and writes it to all files,
+        then syncs the whole batch at once as the durability policy demands.
+        Writes are always buffered. Returns a list of (path, size, error)
+        with error None for files that were overwritten.
+        """
+        results = []
+        files = []  # [path, fd, size, extents]
+        try:
+            for path in paths:
+                try:
+                    fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+                except OSError as e:
+                    # Drop the traceback: its frames would pin the chunk buffer
+                    results.append((path, 0, e.with_traceback(None)))
+                    continue
+                st = os.fstat(fd)
+                if st.st_size > self.chunk_size:  # grew since it was queued
+                    os.close(fd)
+                    results.append((path, st.st_size, ValueError("file is larger than the batch buffer")))
+                    continue
+                files.append([path, fd, st.st_size, [(0, st.st_size)]])
+                # Only probe for holes when the block count says there are some
+                if getattr(st, 'st_blocks', None) is not None and st.st_blocks * 512 < st.st_size:
+                    files[-1][3] = data_extents(fd, st.st_size)
+            largest = max((size for _, _, size, _ in files), default=0)
+            self.final_pattern = None
+            for index, pattern in enumerate(self.patterns(passes)):
+                pass_start = time.perf_counter()
+                written = 0
+                # One fill per pass serves every file in the batch
+                block = self._view[:largest]
+                pattern.fill(block, 0)
+                rng = time.perf_counter() - pass_start
+                self.rng_seconds += rng
+                write_before = self.write_seconds
+                for entry in list(files):
+                    path, fd, size, extents = entry
+                    try:
+                        write_start = time.perf_counter()
+                        for offset, length in extents:
+                            pwrite_all(fd, block[offset:offset + length], offset)
+                        self.write_seconds += time.perf_counter() - write_start
+                    except OSError as e:
+                        files.remove(entry)
+                        os.close(fd)
+                        results.append((path, size, e.with_traceback(None)))
+                        continue
+                    written += sum(length for _, length in extents)
+                self.bytes_written += written
+                self.durability.after_batch_pass([fd for _, fd, _, _ in files])
+                self.final_pattern = pattern
+                if self.metrics is not None:
+                    self.metrics.pass_done(None, index, pattern.name, written, time.perf_counter() - pass_start,
+                                           rng, self.write_seconds - write_before)
+            self.durability.after_batch([fd for _, fd, _, _ in files], [size for _, _, size, _ in files])
+            results.extend((path, size, None) for path, _, size, _ in files)
+            if self.metrics is not None:
+                for path, _, size, extents in files:
+                    self.metrics.file_done(path, size, sum(length for _, length in extents), passes)
+        finally:
+            for _, fd, _, _ in files:
+                os.close(fd)
+        return results
+
+    def write_pass(self, fd, size, pattern, direct_fd=None, extents=None, start=0, checkpoint=None):
+        """
+        Write one pattern over the given (offset, length) extents of an open
+        file descriptor (default: all of [0, size)), skipping everything
+        before `start`. Aligned chunks go to `direct_fd` when given.
+        `checkpoint(offset)` is called whenever the journal's checkpoint
+        interval has been written. Returns the direct descriptor to keep
+        using (None once direct I/O has been rejected).
+        """
+        drop_cache = self.effective_io_mode != 'buffered'
+        if extents is None:
+            extents = [(0, size)] if size else []
+        clock = time.perf_counter
+        chunks = self._chunks(extents, start)
+        if not pattern.refill:
+            blocks = self._fixed_blocks(chunks, pattern, size)
+        elif self.pipeline and sum(length for _, length in extents) > self.chunk_size:
+            blocks = self._pipelined_blocks(chunks, pattern)
+        else:
+            blocks = self._random_blocks(chunks, pattern)
+        pending = None  # start of buffered bytes still held in the page cache
+        dirty = 0  # buffered bytes written since `pending` (holes excluded)
+        interval = self.journal.checkpoint_bytes if checkpoint is not None else 0
+        since_checkpoint = 0
+        offset = 0
+        try:
+            for offset, block in blocks:
+                write_start = clock()
+                direct_len = 0
+                if direct_fd is not None and offset % ALIGNMENT == 0:
+                    direct_len = len(block) // ALIGNMENT * ALIGNMENT
+                if direct_len:
+                    try:
+                        pwrite_all(direct_fd, block[:direct_len], offset)
+                        self.cache_avoided += direct_len
+                    except OSError as e:
+                        if e.errno != errno.EINVAL:
+                            raise
+                        # Filesystem accepted O_DIRECT at open but not for writes
+                        os.close(direct_fd)
+                        self.direct_fallbacks += 1
+                        direct_fd, direct_len = None, 0
+                if direct_len < len(block):
+                    pwrite_all(fd, block[direct_len:], offset + direct_len)
+                    if pending is None:
+                        pending = offset + direct_len
+                    dirty += len(block) - direct_len
+                self.write_seconds += clock() - write_start
+                offset += len(block)
+                since_checkpoint += len(block)
+                if interval and since_checkpoint >= interval:
+                    checkpoint(offset)
+                    since_checkpoint = 0
+                if drop_cache and dirty >= CACHE_WINDOW:
+                    self._drop_cache(fd, pending, offset - pending, dirty)
+                    pending, dirty = None, 0
+        finally:
+            blocks.close()  # stops the producer thread if the pass failed
+        if drop_cache and pending is not None:
+            self._drop_cache(fd, pending, offset - pending, dirty)
+        return direct_fd
+
+    def _chunks(self, extents, start):
+        """(offset, length) of every chunk to write, in file order"""
+        for offset, length in extents:
+            end = offset + length
+            offset = max(offset, start)
+            while offset < end:
+                length = min(self.chunk_size, end - offset)
+                yield offset, length
+                offset += length
+
+    def _fixed_blocks(self, chunks, pattern, size):
+        # Fill the buffer once; every chunk starts in phase with the pattern
+        view = self._view
+        fill_start = time.perf_counter()
+        pattern.fill(view[:min(self.chunk_size, size)], 0)
+        self.rng_seconds += time.perf_counter() - fill_start
+        for offset, length in chunks:
+            yield offset, view[:length]
+
+    def _random_blocks(self, chunks, pattern):
+        view = self._view
+        for offset, length in chunks:
+            block = view[:length]
+            fill_start = time.perf_counter()
+            pattern.fill(block, offset)
+            self.rng_seconds += time.perf_counter() - fill_start
+            yield offset, block
+
+    def _pipelined_blocks(self, chunks, pattern):
+        """
+        Bounded producer/consumer: a generator thread fills the next chunks
+        while the caller writes the current one. Buffers circulate between
+        the `free` and `ready` queues, so at most pipeline_depth chunks exist.
+        """
+        while len(self._pool) < self.pipeline_depth - 1:
+            buffer = aligned_buffer(self.chunk_size)
+            self._pool.append((buffer, memoryview(buffer)))
+        free = queue.SimpleQueue()
+        ready = queue.SimpleQueue()
+        for view in [self._view] + [view for _, view in self._pool[:self.pipeline_depth - 1]]:
+            free.put(view)
+
+        def produce():
+            try:
+                for offset, length in chunks:
+                    view = free.get()
+                    if view is None:  # the writer stopped early
+                        return
+                    block = view[:length]
+                    fill_start = time.perf_counter()
+                    pattern.fill(block, offset)
+                    self.rng_seconds += time.perf_counter() - fill_start
+                    ready.put((offset, block, view))
+                ready.put(None)
+            except BaseException as e:
+                ready.put(e.with_traceback(None))
+
+        producer = threading.Thread(target=produce, name='wipe-rng', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                offset, block, view = item
+                yield offset, block
+                block.release()
+                free.put(view)
+        finally:
+            free.put(None)
+            producer.join()
+
+    def unlink(self, file_path):
+        """Remove an overwritten file through the durability policy"""
+        self.durability.unlink(file_path)
+
+    def _open_direct(self, file_path):
+        try:
+            return os.open(file_path, os.O_WRONLY | os.O_DIRECT)
+        except OSError as e:
+            if e.errno != errno.EINVAL:  # e.g. tmpfs does not support O_DIRECT
+                raise
+            self.direct_fallbacks += 1
+            return None
+
+    def _drop_cache(self, fd, offset, length, written):
+        # Dirty pages cannot be evicted, so write the range back first
+        self.durability.timed(os.fdatasync, fd)
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        self.cache_avoided += written
+
+
+def overwrite_file(file_path, passes=3, chunk_size=CHUNK_SIZE, io_mode='buffered', schedule=None):
+    """Convenience wrapper: overwrite one file with a throwaway engine"""
+    with OverwriteEngine(chunk_size, io_mode, schedule=schedule) as engine:
+        return engine.overwrite(file_path, passes)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Flash-Aware File Wipe
+On SSDs repeated overwrites are slow, wear the cells, and may not even reach
+the old pages: the flash translation layer writes the new data elsewhere.
+What does reach them is a discard (TRIM), which tells the drive the blocks
+are free so it erases them during garbage collection.
+
+For files on non-rotational devices whose queue accepts discards
+(sysfs queue/rotational, queue/discard_granularity and
+queue/discard_max_bytes), FlashWiper maps the
+file's data extents and deallocates them in place:
+  punch      - fallocate(PUNCH_HOLE | KEEP_SIZE) over every extent
+  zero-range - fallocate(ZERO_RANGE | KEEP_SIZE) where holes cannot be punched
+The freed blocks reach the device as discards at once on filesystems mounted
+with `discard`, otherwise by one FITRIM per filesystem when the run finishes.
+A file is only deallocated when one of the two will happen; everything else
+(spinning disks, no discard support, no FITRIM permission, filesystems
+without fallocate modes, or a punch that left data allocated) falls back to
+the engine's normal overwrite, whatever the mode. Deallocated files are
+journalled and counted in the engine's metrics like overwritten ones, and
+with verification on, the old data ranges must read back as zeros before the
+file is unlinked. Each file reports the strategy it got and how long it took.
+
+Garbage collection runs when the drive decides, so a discard is not a
+verified purge of the media; use a device-level sanitize for that.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import time
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .durability import datasync
+from .engine import data_extents
+from .parallel import device_queue
+from .patterns import FixedPattern
+from .verify import make_verifier
+
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+FALLOC_FL_ZERO_RANGE = 0x10
+FITRIM = 0xC0185879  # _IOWR('X', 121, struct fstrim_range)
+FSTRIM_RANGE = struct.Struct('QQQ')  # start, len, minlen
+
+FLASH_MODES = ('off', 'auto', 'always')
+STRATEGIES = ('punch', 'zero-range', 'overwrite')
+
+FlashResult = namedtuple('FlashResult', 'path size strategy seconds reason verify', defaults=(None,))
+TrimResult = namedtuple('TrimResult', 'mount bytes seconds error')
+
+DEALLOCATED = FixedPattern(0x00, "Deallocated", "Punched or zero-ranged; reads back as zeros")
+
+_fallocate = None
+if hasattr(os, 'fdatasync'):
+    try:
+        _fallocate = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True).fallocate
+        _fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong)
+    except (OSError, AttributeError):
+        pass
+
+
+def fallocate(fd, mode, offset, length):
+    """fallocate(2) with a mode; raises OSError(EOPNOTSUPP) where libc lacks it"""
+    if _fallocate is None:
+        raise OSError(errno.EOPNOTSUPP, "fallocate modes are not available on this platform")
+    if _fallocate(fd, mode, offset, length) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def fitrim(mount):
+    """Discard all free space of the filesystem mounted at `mount`; returns the bytes trimmed"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "FITRIM is not available on this platform")
+    fd = os.open(mount, os.O_RDONLY)
+    try:
+        arg = bytearray(FSTRIM_RANGE.pack(0, 2 ** 64 - 1, 0))
+        fcntl.ioctl(fd, FITRIM, arg)
+        return FSTRIM_RANGE.unpack(arg)[1]
+    finally:
+        os.close(fd)
+
+
+def mount_point(path):
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def mount_options(mount):
+    """Options of the filesystem mounted at `mount`, from /proc/mounts"""
+    options = set()
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if fields[1] == mount:
+                    options = set(fields[3].split(','))  # the last mount on top wins
+    except OSError:
+        pass
+    return options
+
+
+def device_profile(st_dev):
+    """(rotational, discards) for the disk holding st_dev; (None, False) when unknown"""
+    queue = device_queue(st_dev)
+    if queue is None:
+        return None, False
+    try:
+        rotational = (queue / 'rotational').read_text().strip() == '1'
+        discards = (int((queue / 'discard_granularity').read_text()) > 0
+                    and int((queue / 'discard_max_bytes').read_text()) > 0)
+    except (OSError, ValueError):
+        return None, False
+    return rotational, discards
+
+
+class FlashWiper:
+    """
+    Deallocate-and-discard wipe for files on flash, with the engine's
+    overwrite as the fallback. mode 'auto' checks each device through sysfs;
+    'always' also deallocates on devices sysfs cannot identify, and without
+    online discard even when FITRIM needs root. Rotational and non-discarding
+    devices are overwritten in every mode. With `verify` set to 'sample' or
+    'full' each file is read back before it is unlinked. wipe() unlinks the
+    file through the engine's durability policy; finish() trims the
+    filesystems that were deallocated on and returns a TrimResult for each.
+    """
+
+    def __init__(self, engine, passes, mode='auto', verify='off', verify_options=None):
+        if mode not in FLASH_MODES:
+            raise ValueError(f"Unknown flash mode: {mode}")
+        self.engine = engine
+        self.passes = passes
+        self.mode = mode
+        self.verifier = make_verifier(verify, **(verify_options or {}))
+        self.counts = dict.fromkeys(STRATEGIES, 0)
+        self.seconds = dict.fromkeys(STRATEGIES, 0.0)
+        self._devices = {}  # st_dev -> (mount, reason to overwrite or None)
+        self._no_punch = set()  # st_dev of filesystems without hole punching
+        self._to_trim = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.verifier is not None:
+            self.verifier.close()
+            self.verifier = None
+
+    def _device(self, path, st_dev):
+        """Cached (mount, fallback reason) for a device; the reason is None for flash"""
+        if st_dev not in self._devices:
+            mount = mount_point(path)
+            rotational, discards = device_profile(st_dev)
+            if rotational is None and self.mode == 'always':
+                rotational, discards = False, True
+            if self.mode == 'off':
+                reason = "flash mode off"
+            elif rotational is None:
+                reason = "device type unknown"
+            elif rotational:
+                reason = "rotational device"
+            elif not discards:
+                reason = "device does not accept discards"
+            elif (self.mode != 'always' and 'discard' not in mount_options(mount)
+                  and getattr(os, 'geteuid', lambda: -1)() != 0):
+                reason = "no online discard and FITRIM needs root"
+            else:
+                reason = None
+            self._devices[st_dev] = (mount, reason)
+        return self._devices[st_dev]
+
+    def _deallocate(self, fd, st_dev, extents):
+        """Punch (or zero-range) every extent; returns the strategy, or None if unsupported"""
+        for strategy, mode in (('punch', FALLOC_FL_PUNCH_HOLE), ('zero-range', FALLOC_FL_ZERO_RANGE)):
+            if strategy == 'punch' and st_dev in self._no_punch:
+                continue
+            try:
+                for offset, length in extents:
+                    fallocate(fd, mode | FALLOC_FL_KEEP_SIZE, offset, length)
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS):
+                    raise
+                if strategy == 'punch':
+                    self._no_punch.add(st_dev)
+                continue
+            return strategy
+        return None
+
+    def accepts(self, path, st_dev):
+        """True when files on this device are deallocated rather than overwritten"""
+        return self._device(path, st_dev)[1] is None
+
+    def wipe(self, path, size=None):
+        """
+        Wipe and unlink one file; returns a FlashResult. A file that fails
+        verification is kept, with the VerifyResult in `verify`.
+        """
+        start = time.perf_counter()
+        st = os.stat(path, follow_symlinks=False)
+        size = st.st_size if size is None else size
+        mount, reason = self._device(path, st.st_dev)
+        journal, metrics = self.engine.journal, self.engine.metrics
+        if reason is None and journal is not None and journal.is_done(path):
+            reason = "finished before an interruption"  # overwrite() skips it
+        strategy = pattern = None
+        if reason is None:
+            fd = os.open(path, os.O_WRONLY)
+            try:
+                extents = data_extents(fd, size)
+                allocated = sum(length for _, length in extents)
+                if journal is not None:
+                    journal.pass_started(path, 0, DEALLOCATED)
+                strategy = self._deallocate(fd, st.st_dev, extents)
+                if strategy is None:
+                    reason = "filesystem cannot punch or zero ranges"
+                else:
+                    datasync(fd)
+                    # A block the range only partly covers is zeroed in place, not freed
+                    left = sum(length for _, length in data_extents(fd, size))
+                    if strategy == 'punch' and left > os.fstat(fd).st_blksize:
+                        strategy, reason = None, "filesystem kept the data allocated"
+            finally:
+                os.close(fd)
+        if strategy is None:
+            self.engine.overwrite(path, self.passes)
+            strategy, pattern, extents = 'overwrite', self.engine.final_pattern, None
+        else:
+            self._to_trim.add(mount)
+            pattern = DEALLOCATED
+            if metrics is not None:
+                seconds = time.perf_counter() - start
+                metrics.pass_done(path, 0, strategy, allocated, seconds, 0.0, seconds)
+                metrics.file_done(path, size, allocated, 1, seconds)
+        verified = None
+        if self.verifier is not None:
+            # The old data ranges, not the file's current extents: punched ones are holes now
+            verified = self.verifier.verify(path, size, pattern, extents)
+        if verified is None or verified.ok:
+            if strategy != 'overwrite' and journal is not None:
+                journal.file_done(path)
+            self.engine.unlink(path)
+        seconds = time.perf_counter() - start
+        self.counts[strategy] += 1
+        self.seconds[strategy] += seconds
+        return FlashResult(path, size, strategy, seconds, reason, verified)
+
+    def finish(self):
+        """
+        FITRIM every filesystem that was deallocated on and is not mounted
+        with online discard. Call it once the durability policy has committed
+        its deferred unlinks, or the blocks are not free yet.
+        """
+        results = []
+        for mount in sorted(self._to_trim):
+            if 'discard' in mount_options(mount):
+                continue
+            start = time.perf_counter()
+            try:
+                trimmed, error = fitrim(mount), None
+            except OSError as e:
+                trimmed, error = 0, e
+            results.append(TrimResult(mount, trimmed, time.perf_counter() - start, error))
+        self._to_trim.clear()
+        return results
+
+    def summary(self):
+        """One line: files and time per strategy, or why no device qualified"""
+        line = ", ".join(f"{strategy} {self.counts[strategy]} file(s) in {self.seconds[strategy]:.3f}s"
+                         for strategy in STRATEGIES if self.counts[strategy])
+        if line:
+            return line
+        return "no files on flash (" + "; ".join(sorted(f"{mount}: {reason}"
+                                                        for mount, reason in self._devices.values())) + ")"
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Free-Space Wipe
+Overwrites the free blocks of a filesystem, where the data of files deleted
+earlier (without a secure wipe) still lives. The free space is claimed with
+large preallocated fill files (posix_fallocate, so the filesystem hands out
+big contiguous extents up front), each written at full sequential throughput
+by the streaming engine, synced, and removed again once the space is full.
+A reserve is always left free so running services do not hit ENOSPC.
+"""
+import errno
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+from .durability import datasync, make_policy
+from .engine import ALIGNMENT, OverwriteEngine
+from .plan import allocated_size
+
+FILL_FILE_BYTES = 1024 * 1024 * 1024  # also keeps FAT32 volumes under their 4 GiB file limit
+MIN_FILL_BYTES = 1024 * 1024
+DEFAULT_RESERVE = 1024 * 1024 * 1024
+FILL_PREFIX = '.manhattan-freespace-'
+
+FillFile = namedtuple('FillFile', 'path size seconds')
+
+
+def preallocate(fd, size):
+    """
+    Reserve `size` bytes for an open file. Returns False when the filesystem
+    has no room for them; filesystems without preallocation get a plain
+    size extension and are filled by the writes instead.
+    """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return True
+        except OSError as e:
+            if e.errno in (errno.ENOSPC, errno.EFBIG):
+                return False
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    os.ftruncate(fd, size)
+    return True
+
+
+class FreeSpaceWiper:
+    """
+    Fill the free space of the filesystem holding `path`, minus `reserve`
+    bytes, with fill files of up to `fill_bytes`. wipe() yields a FillFile
+    as each one is written; the fill files are always removed when the wipe
+    ends, also when it fails or is interrupted. The engine's durability
+    policy applies per pass; every fill file is synced before it is removed.
+    With a `schedule`, `passes` must be its length.
+    """
+
+    def __init__(self, path, passes=1, reserve=DEFAULT_RESERVE, fill_bytes=FILL_FILE_BYTES,
+                 io_mode='buffered', durability=None, metrics=None, schedule=None):
+        self.path = os.fspath(path)
+        self.passes = passes
+        self.reserve = reserve
+        self.fill_bytes = max(MIN_FILL_BYTES, fill_bytes // ALIGNMENT * ALIGNMENT)
+        self.io_mode = io_mode
+        self.durability = durability or make_policy('file')
+        self.metrics = metrics
+        self.schedule = schedule
+        self.free_before = shutil.disk_usage(self.path).free
+        self.target_bytes = max(0, self.free_before - reserve)
+        self.filled = 0
+        self.files = 0
+        self.stopped = None  # why filling stopped early (an OSError), if it did
+
+    def budget(self):
+        """Size of the next fill file: what is free beyond the reserve, capped"""
+        available = shutil.disk_usage(self.path).free - self.reserve
+        size = min(self.fill_bytes, available) // ALIGNMENT * ALIGNMENT
+        return size if size >= MIN_FILL_BYTES else 0
+
+    def wipe(self):
+        scratch = tempfile.mkdtemp(prefix=FILL_PREFIX, dir=self.path)
+        try:
+            with OverwriteEngine(io_mode=self.io_mode, durability=self.durability, metrics=self.metrics,
+                                 schedule=self.schedule) as engine:
+                while True:
+                    size = self.budget()
+                    if not size:
+                        break
+                    fill = self._fill(engine, os.path.join(scratch, f"fill-{self.files:06d}.bin"), size)
+                    if fill is None:
+                        break
+                    yield fill
+                    if self.stopped is not None:
+                        break
+        finally:
+            self.durability.finish()
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def _fill(self, engine, path, size):
+        start = time.perf_counter()
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+        direct_fd = None
+        try:
+            # Fragmented free space may not take one large extent; try smaller ones
+            while not preallocate(fd, size):
+                size = size // 2 // ALIGNMENT * ALIGNMENT
+                if size < MIN_FILL_BYTES:
+                    return None
+            if engine.effective_io_mode == 'direct':
+                direct_fd = engine._open_direct(path)
+            synced = False
+            try:
+                direct_fd = engine.fill(fd, size, self.passes, direct_fd)
+                synced = not self.durability.defers_file_sync  # the policy synced the final pass
+            except OSError as e:
+                if e.errno != errno.ENOSPC:
+                    raise
+                # Out of space mid-write (copy-on-write or compressed
+                # filesystems); the blocks it did get still count
+                self.stopped = e.with_traceback(None)
+                size = min(size, allocated_size(os.fstat(fd)))
+            if not synced:
+                # Group commit syncs at unlink, which fill files never go
+                # through; a fill cut short never reached the policy at all
+                self.durability.timed(datasync, fd)
+        finally:
+            if direct_fd is not None:
+                os.close(direct_fd)
+            os.close(fd)
+        self.files += 1
+        self.filled += size
+        return FillFile(path, size, time.perf_counter() - start)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Resumable Wipe Journal
+An append-only JSON-lines journal kept next to the folder being wiped
+(".<folder>.wipe-journal"). It records which pass each large file has reached,
+with a checkpoint every `checkpoint_bytes` inside a pass, the seed of every
+random pass and which files are finished. Running the same command again
+replays the journal and continues from the last durable checkpoint.
+
+Records are buffered and written in batches. Each flush first syncs the
+target filesystem, then appends the records and syncs the journal, so a record
+that survives a crash never describes data that did not. Small files wiped
+in batches are not journalled; an interrupted batch is simply redone.
+"""
+import json
+import os
+import threading
+import time
+
+from .durability import datasync, syncfs
+from .patterns import RandomPattern
+from .schedules import make_schedule
+
+JOURNAL_SUFFIX = '.wipe-journal'
+CHECKPOINT_BYTES = 256 * 1024 * 1024
+FLUSH_RECORDS = 1000
+FLUSH_SECONDS = 5.0
+
+
+def journal_path(root):
+    """Where the journal for `root` lives: beside it, so it survives the wipe"""
+    root = os.path.abspath(root)
+    return os.path.join(os.path.dirname(root), f".{os.path.basename(root)}{JOURNAL_SUFFIX}")
+
+
+class WipeJournal:
+    """
+    Journal for one folder wipe; shared by every engine of the run.
+    Raises ValueError when an existing journal was written with different
+    settings - pass count or pass schedule (delete it to start over).
+    """
+
+    def __init__(self, root, passes, path=None, checkpoint_bytes=CHECKPOINT_BYTES,
+                 flush_records=FLUSH_RECORDS, flush_seconds=FLUSH_SECONDS, schedule=None):
+        self.root = os.path.abspath(root)
+        self.passes = passes
+        self.schedule = (schedule or make_schedule('standard', passes)).key
+        self.path = path or journal_path(root)
+        self.checkpoint_bytes = checkpoint_bytes
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self.flushes = 0
+        self.resumed = os.path.exists(self.path)
+        self._files = {}  # path -> {'pass': n, 'offset': n, 'seeds': {n: (hex, backend)}, 'done': bool}
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        if self.resumed:
+            self._replay()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o600)
+        try:
+            self._sync_fd = os.open(self.root, os.O_RDONLY) if os.name != 'nt' else None
+        except OSError:
+            self._sync_fd = None
+        if not self.resumed:
+            self._append({'root': self.root, 'passes': passes, 'schedule': self.schedule})
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def files_done(self):
+        return sum(1 for state in self._files.values() if state['done'])
+
+    @property
+    def files_in_progress(self):
+        return sum(1 for state in self._files.values() if not state['done'])
+
+    def _replay(self):
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final write
+                if 'root' in record:
+                    # Journals from before schedules were recorded used the standard one
+                    schedule = record.get('schedule', make_schedule('standard', record['passes']).key)
+                    if record['root'] != self.root or record['passes'] != self.passes or schedule != self.schedule:
+                        raise ValueError(f"{self.path} belongs to a different run "
+                                         f"({record['root']}, {record['passes']} passes, schedule {schedule}); "
+                                         f"delete it to start over")
+                    continue
+                state = self._state(record['f'])
+                if 'seed' in record:
+                    state['seeds'][record['p']] = (record['seed'], record['b'])
+                elif record.get('done'):
+                    state['done'] = True
+                else:
+                    state['pass'], state['offset'] = record['p'], record['o']
+
+    def _state(self, path):
+        state = self._files.get(path)
+        if state is None:
+            state = self._files[path] = {'pass': 0, 'offset': 0, 'seeds': {}, 'done': False}
+        return state
+
+    def _append(self, record):
+        with self._lock:
+            self._buffer.append(json.dumps(record, separators=(',', ':')).encode() + b"\n")
+            due = (len(self._buffer) >= self.flush_records
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    # -- queries used when resuming ------------------------------------------
+
+    def is_done(self, path):
+        state = self._files.get(os.path.abspath(path))
+        return state is not None and state['done']
+
+    def resume_point(self, path):
+        """(pass index, offset) to continue an interrupted file from"""
+        state = self._files.get(os.path.abspath(path))
+        if state is None:
+            return 0, 0
+        return state['pass'], state['offset']
+
+    def patterns(self, path, patterns):
+        """Replace random passes that were already started with their recorded seeds"""
+        state = self._files.get(os.path.abspath(path))
+        if state is None:
+            return patterns
+        patterns = list(patterns)
+        for index, (seed, backend) in state['seeds'].items():
+            if index < len(patterns):
+                old = patterns[index]
+                patterns[index] = RandomPattern(old.name, old.description, bytes.fromhex(seed), backend)
+        return patterns
+
+    # -- records written during the wipe ---------------------------------------
+
+    def pass_started(self, path, index, pattern):
+        """Record the seed of a random pass so a resumed pass writes the same stream"""
+        keystream = getattr(pattern, 'keystream', None)
+        if keystream is None or not keystream.reproducible:
+            return
+        path = os.path.abspath(path)
+        with self._lock:  # ParallelWiper and ShardedOverwriter call in from several threads
+            seeds = self._state(path)['seeds']
+            if index in seeds:
+                return
+            seeds[index] = (keystream.seed.hex(), keystream.backend)
+        self._append({'f': path, 'p': index, 'seed': keystream.seed.hex(), 'b': keystream.backend})
+
+    def checkpoint(self, path, index, offset):
+        """Pass `index` has been written up to `offset` (index + 1, 0 when complete)"""
+        path = os.path.abspath(path)
+        self._append({'f': path, 'p': index, 'o': offset})
+
+    def file_done(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._state(path)['done'] = True
+        self._append({'f': path, 'done': True})
+
+    def flush(self):
+        """Make the target data durable, then append and sync the pending records"""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not records:
+                return
+            if self._sync_fd is not None:
+                syncfs(self._sync_fd)
+            data = memoryview(b"".join(records))
+            while data:
+                data = data[os.write(self._fd, data):]
+            datasync(self._fd)
+            self.flushes += 1
+
+    def close(self, remove=False):
+        """Flush and close; remove=True deletes the journal after a completed run"""
+        if self._fd is None:
+            return
+        try:
+            if not remove:
+                self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            if self._sync_fd is not None:
+                os.close(self._sync_fd)
+                self._sync_fd = None
+        if remove:
+            os.unlink(self.path)
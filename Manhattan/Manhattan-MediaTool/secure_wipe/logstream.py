@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Log Stream
+Thread-safe line sink for long wipe runs. Every line is streamed to a log
+file; only the most recent `max_pending` lines wait in memory until a reader
+(e.g. the GUI's refresh timer) drains them in one batch. Memory therefore
+stays bounded however many files are wiped.
+"""
+import threading
+from collections import deque
+
+MAX_PENDING = 10000
+
+
+class LogStream:
+    """Writer threads call write() (or the stream itself); one reader drains"""
+
+    def __init__(self, path=None, max_pending=MAX_PENDING):
+        self.path = path
+        self.lines = 0
+        self._file = open(path, 'a', encoding='utf-8', buffering=64 * 1024) if path else None
+        self._pending = deque(maxlen=max_pending)
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, message):
+        lines = str(message).split('\n')
+        with self._lock:
+            if self._file is not None:
+                self._file.write('\n'.join(lines) + '\n')
+            overflow = len(self._pending) + len(lines) - self._pending.maxlen
+            if overflow > 0:
+                self._dropped += overflow
+            self._pending.extend(lines)
+            self.lines += len(lines)
+
+    __call__ = write
+
+    def drain(self):
+        """
+        Return (lines, dropped): the lines written since the last drain and
+        how many older ones were discarded because the reader fell behind
+        (they are still in the log file).
+        """
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+            if self._file is not None:
+                self._file.flush()
+        return lines, dropped
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Wipe Metrics
+Structured instrumentation for a wipe run: byte counters, per-pass and
+per-file latency/throughput histograms, and a time breakdown by phase
+(rng, write, sync, unlink). Engines report into a WipeMetrics object, which
+forwards typed events to subscribers as they happen and produces a JSON
+summary at the end of the run.
+"""
+import json
+import math
+import threading
+import time
+from collections import namedtuple
+
+PassEvent = namedtuple('PassEvent', 'path index pattern bytes seconds rng_seconds write_seconds')
+FileEvent = namedtuple('FileEvent', 'path size allocated passes seconds')
+
+PHASES = ('rng', 'write', 'sync', 'unlink')
+ZERO_BUCKET = -1075  # 2.0 ** ZERO_BUCKET == 0.0, below every positive float
+
+
+class Histogram:
+    """Power-of-two buckets: constant memory, values resolved to within 2x"""
+
+    def __init__(self, unit):
+        self.unit = unit
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}  # exponent e -> count of values in (2**(e-1), 2**e]
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        exponent = math.ceil(math.log2(value)) if value > 0 else ZERO_BUCKET
+        self.buckets[exponent] = self.buckets.get(exponent, 0) + 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for exponent in sorted(self.buckets):
+            seen += self.buckets[exponent]
+            if seen >= rank:
+                return min(2.0 ** exponent, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'unit': self.unit,
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': [[2.0 ** exponent, n] for exponent, n in sorted(self.buckets.items())],
+        }
+
+
+class WipeMetrics:
+    """
+    Thread-safe collector shared by every engine of a run. subscribe()
+    registers a callable that receives each PassEvent and FileEvent on the
+    thread that produced it.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.bytes_logical = 0
+        self.bytes_written = 0
+        self.passes = 0
+        self.rng_seconds = 0.0
+        self.write_seconds = 0.0
+        self.patterns = {}  # pattern name -> {'passes', 'bytes', 'seconds'}
+        self.pass_latency = Histogram('s')
+        self.pass_throughput = Histogram('MB/s')
+        self.file_latency = Histogram('s')
+        self.file_throughput = Histogram('MB/s')
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _emit(self, event):
+        for listener in self._listeners:
+            listener(event)
+
+    def pass_done(self, path, index, pattern, nbytes, seconds, rng_seconds, write_seconds):
+        with self._lock:
+            self.passes += 1
+            self.bytes_written += nbytes
+            self.rng_seconds += rng_seconds
+            self.write_seconds += write_seconds
+            stats = self.patterns.setdefault(pattern, {'passes': 0, 'bytes': 0, 'seconds': 0.0})
+            stats['passes'] += 1
+            stats['bytes'] += nbytes
+            stats['seconds'] += seconds
+            self.pass_latency.add(seconds)
+            if seconds > 0:
+                self.pass_throughput.add(nbytes / seconds / 1e6)
+        self._emit(PassEvent(path, index, pattern, nbytes, seconds, rng_seconds, write_seconds))
+
+    def file_done(self, path, size, allocated, passes, seconds=None):
+        """seconds is None for files wiped in a batch (the batch is timed per pass)"""
+        with self._lock:
+            self.files += 1
+            self.bytes_logical += size
+            if seconds is not None:
+                self.file_latency.add(seconds)
+                if seconds > 0:
+                    self.file_throughput.add(allocated * passes / seconds / 1e6)
+        self._emit(FileEvent(path, size, allocated, passes, seconds))
+
+    def summary(self, durability=None):
+        """Everything collected so far as a JSON-serialisable dict"""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            phases = {'rng': self.rng_seconds, 'write': self.write_seconds,
+                      'sync': durability.sync_seconds if durability is not None else 0.0,
+                      'unlink': durability.unlink_seconds if durability is not None else 0.0}
+            busy = sum(phases.values())
+            return {
+                'elapsed_seconds': elapsed,
+                'files': self.files,
+                'passes': self.passes,
+                'bytes_logical': self.bytes_logical,
+                'bytes_written': self.bytes_written,
+                'throughput_mb_s': self.bytes_written / elapsed / 1e6 if elapsed else None,
+                'files_per_second': self.files / elapsed if elapsed else None,
+                'phases': {name: {'seconds': seconds, 'share': seconds / busy if busy else None}
+                           for name, seconds in phases.items()},
+                'sync_calls': durability.sync_calls if durability is not None else None,
+                'patterns': {name: dict(stats) for name, stats in self.patterns.items()},
+                'pass_latency': self.pass_latency.to_dict(),
+                'pass_throughput': self.pass_throughput.to_dict(),
+                'file_latency': self.file_latency.to_dict(),
+                'file_throughput': self.file_throughput.to_dict(),
+            }
+
+    def to_json(self, durability=None, indent=2):
+        return json.dumps(self.summary(durability), indent=indent)
+
+    def describe(self, durability=None):
+        """One-line human summary: throughput and where the time went"""
+        summary = self.summary(durability)
+        phases = ", ".join(f"{name} {info['seconds']:.3f}s ({info['share'] or 0:.0%})"
+                           for name, info in summary['phases'].items())
+        rate = summary['throughput_mb_s'] or 0.0
+        return f"{rate:.1f} MB/s, {summary['files_per_second'] or 0:.0f} files/s; {phases}"
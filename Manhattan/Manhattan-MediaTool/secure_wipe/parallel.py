@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Device-Aware Parallel Wiper
+Groups files by the device they live on (st_dev) and runs a separately sized
+pool of I/O workers per device, so several devices (and the queue depth of
+each SSD/NVMe) are kept busy at once. Results are yielded back to the
+calling thread in completion order.
+"""
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .durability import PerPassSync
+from .engine import OverwriteEngine
+from .verify import VerificationError, make_verifier
+
+ROTATIONAL_WORKERS = 1  # concurrent writers only make a spinning disk seek
+FLASH_WORKERS = 4
+UNKNOWN_WORKERS = 2
+QUEUE_FACTOR = 2  # files queued per worker before the producer blocks
+
+WipeResult = namedtuple('WipeResult', 'path size ok error device verify', defaults=(None,))
+
+
+def device_queue(st_dev):
+    """
+    The sysfs queue directory of the disk holding st_dev (a partition's
+    queue is its parent disk's), or None where there is none (Windows,
+    tmpfs, overlay and other virtual filesystems).
+    """
+    if not hasattr(os, 'major'):  # no sysfs on Windows
+        return None
+    queue = Path(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+    for candidate in (queue / 'queue', queue.resolve().parent / 'queue'):
+        if (candidate / 'rotational').exists():
+            return candidate
+    return None
+
+
+def device_workers(st_dev):
+    """Pick a worker count for a device from its sysfs queue properties"""
+    queue = device_queue(st_dev)
+    if queue is None:
+        return UNKNOWN_WORKERS
+    try:
+        rotational = (queue / 'rotational').read_text().strip()
+    except OSError:
+        return UNKNOWN_WORKERS
+    if rotational == '1':
+        return ROTATIONAL_WORKERS
+    try:
+        depth = int((queue / 'nr_requests').read_text())
+    except (OSError, ValueError):
+        depth = FLASH_WORKERS
+    return max(1, min(FLASH_WORKERS * 2, depth // 16))
+
+
+def wipe_file(engine, path, passes, verifier=None):
+    """
+    Overwrite, optionally read back, and unlink one file. Returns the
+    VerifyResult (None without a verifier); a file that fails verification
+    is kept and VerificationError is raised.
+    """
+    size = engine.overwrite(path, passes)
+    result = None
+    if verifier is not None:
+        result = verifier.verify(path, size, engine.final_pattern)
+        if not result.ok:
+            raise VerificationError(f"{path}: {result.detail}")
+    engine.unlink(path)
+    return result
+
+
+class ParallelWiper:
+    """
+    Bounded, per-device worker pools. Each worker thread owns its own
+    OverwriteEngine (built from `engine_options`) so chunk buffers are never
+    shared between threads; all engines share one durability policy.
+    With `verify` set to 'sample' or 'full' each worker also reads its file
+    back (through its own Verifier) before unlinking it, while the other
+    workers keep writing.
+    """
+
+    def __init__(self, passes=3, workers_per_device=None, durability=None,
+                 verify='off', verify_options=None, **engine_options):
+        self.passes = passes
+        self.workers_per_device = workers_per_device
+        self.durability = durability if durability is not None else PerPassSync()
+        self.verify = verify
+        self.verify_options = verify_options or {}
+        self.engine_options = engine_options
+        self._pools = {}
+        self._local = threading.local()
+        self._engines = []
+        self._verifiers = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def cache_avoided(self):
+        return sum(engine.cache_avoided for engine in self._engines)
+
+    @property
+    def bytes_written(self):
+        return sum(engine.bytes_written for engine in self._engines)
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        self._pools.clear()
+        for engine in self._engines:
+            engine.close()
+        self._engines.clear()
+        for verifier in self._verifiers:
+            verifier.close()
+        self._verifiers.clear()
+        self.durability.finish()
+
+    def _engine(self):
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = self._local.engine = OverwriteEngine(durability=self.durability, **self.engine_options)
+            with self._lock:
+                self._engines.append(engine)
+        return engine
+
+    def _verifier(self):
+        if self.verify == 'off':
+            return None
+        verifier = getattr(self._local, 'verifier', None)
+        if verifier is None:
+            verifier = self._local.verifier = make_verifier(self.verify, **self.verify_options)
+            with self._lock:
+                self._verifiers.append(verifier)
+        return verifier
+
+    def _pool(self, device):
+        pool = self._pools.get(device)
+        if pool is None:
+            workers = self.workers_per_device or device_workers(device)
+            pool = self._pools[device] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"wipe-{device:x}")
+            pool.limit = workers * QUEUE_FACTOR
+        return pool
+
+    def _run(self, path, size, device):
+        try:
+            verified = wipe_file(self._engine(), path, self.passes, self._verifier())
+            return WipeResult(path, size, True, None, device, verified)
+        except Exception as e:
+            return WipeResult(path, size, False, e, device)
+
+    def wipe(self, files):
+        """
+        Wipe an iterable of paths (or DirEntry objects) and yield a WipeResult
+        for each as it completes. Submission is bounded per device, so `files`
+        may be a lazy generator such as a TreeWalker.
+        """
+        pending = {}
+        in_flight = {}
+        for path in files:
+            try:
+                if isinstance(path, os.DirEntry):
+                    st = path.stat(follow_symlinks=False)  # cached by the walker
+                else:
+                    st = os.stat(path)
+            except OSError as e:
+                yield WipeResult(Path(path), 0, False, e, None)
+                continue
+            pool = self._pool(st.st_dev)
+            while in_flight.get(st.st_dev, 0) >= pool.limit:
+                yield from self._drain(pending, in_flight)
+            future = pool.submit(self._run, Path(path), st.st_size, st.st_dev)
+            pending[future] = st.st_dev
+            in_flight[st.st_dev] = in_flight.get(st.st_dev, 0) + 1
+        while pending:
+            yield from self._drain(pending, in_flight)
+
+    def _drain(self, pending, in_flight):
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            in_flight[pending.pop(future)] -= 1
+            yield future.result()
+
+
+def wipe_files_parallel(files, passes=3, workers_per_device=None, durability=None,
+                        verify='off', verify_options=None, **engine_options):
+    """Convenience generator around ParallelWiper"""
+    with ParallelWiper(passes, workers_per_device, durability, verify, verify_options,
+                       **engine_options) as wiper:
+        yield from wiper.wipe(files)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Overwrite Pattern Generators
+Fixed byte patterns and a seekable CSPRNG keystream for the random passes.
+
+The keystream is a pure function of (seed, file offset), so any block can be
+regenerated later without keeping the data around. Backends, fastest first:
+  - 'aes-ctr': AES-256-CTR via the optional `cryptography` package (AES-NI)
+  - 'shake':   SHAKE-256 in counter mode, standard library only
+  - 'urandom': os.urandom refills (fast, but not reproducible from a seed)
+"""
+import hashlib
+import os
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # optional dependency
+    Cipher = None
+
+SEED_SIZE = 32
+AES_BLOCK = 16
+SHAKE_SEGMENT = 64 * 1024
+REUSE_ALIGNMENT = 512  # chunks always start at multiples of a 512-byte sector
+
+
+def available_backends():
+    """Keystream backends usable in this environment, fastest first"""
+    backends = ['shake', 'urandom']
+    if Cipher is not None:
+        backends.insert(0, 'aes-ctr')
+    return backends
+
+
+class Keystream:
+    """Cryptographically secure, seekable keystream"""
+
+    def __init__(self, seed=None, backend=None):
+        self.backend = backend or available_backends()[0]
+        if self.backend not in available_backends():
+            raise ValueError(f"Keystream backend not available: {self.backend}")
+        self.seed = seed if seed is not None else os.urandom(SEED_SIZE)
+        if self.backend == 'aes-ctr':
+            self._key = hashlib.sha256(b"manhattan-keystream-key" + self.seed).digest()
+            self._nonce = int.from_bytes(
+                hashlib.sha256(b"manhattan-keystream-nonce" + self.seed).digest()[:8], 'big') << 64
+            self._zeros = b""
+
+    @property
+    def reproducible(self):
+        return self.backend != 'urandom'
+
+    def fill(self, view, offset):
+        """Fill `view` with the keystream bytes for [offset, offset + len(view))"""
+        if self.backend == 'aes-ctr':
+            self._fill_aes(view, offset)
+        elif self.backend == 'shake':
+            self._fill_shake(view, offset)
+        else:
+            view[:] = os.urandom(len(view))
+
+    def generate(self, offset, length):
+        """Return the keystream for a byte range as a new bytes object"""
+        buf = bytearray(length)
+        self.fill(memoryview(buf), offset)
+        return bytes(buf)
+
+    def _fill_aes(self, view, offset):
+        skip = offset % AES_BLOCK
+        counter = self._nonce | (offset // AES_BLOCK)
+        encryptor = Cipher(algorithms.AES(self._key),
+                           modes.CTR(counter.to_bytes(16, 'big'))).encryptor()
+        needed = skip + len(view)
+        zeros = self._zeros  # read once: shards of one file fill concurrently
+        if len(zeros) < needed:
+            zeros = self._zeros = bytes(needed)
+        stream = encryptor.update(memoryview(zeros)[:needed])
+        view[:] = memoryview(stream)[skip:]
+
+    def _fill_shake(self, view, offset):
+        pos = 0
+        while pos < len(view):
+            segment, skip = divmod(offset + pos, SHAKE_SEGMENT)
+            take = min(SHAKE_SEGMENT - skip, len(view) - pos)
+            block = hashlib.shake_256(self.seed + segment.to_bytes(8, 'little')).digest(skip + take)
+            view[pos:pos + take] = block[skip:]
+            pos += take
+
+
+class FixedPattern:
+    """
+    Repeating byte pattern (one byte or several). The buffer is filled once
+    per pass and reused when the pattern period divides REUSE_ALIGNMENT, so
+    every chunk starts in phase; other periods are refilled per chunk.
+    """
+
+    def __init__(self, value, name, description):
+        self.value = bytes((value,)) if isinstance(value, int) else bytes(value)
+        self.name = name
+        self.description = description
+        self.spec = " ".join(f"0x{b:02X}" for b in self.value)
+        self.refill = REUSE_ALIGNMENT % len(self.value) != 0
+
+    def fill(self, view, offset):
+        period = len(self.value)
+        if period == 1:
+            view[:] = self.value * len(view)
+            return
+        phase = offset % period
+        view[:] = (self.value * (-(-(phase + len(view)) // period)))[phase:phase + len(view)]
+
+
+class RandomPattern:
+    """CSPRNG keystream pattern - the buffer is refilled for every chunk"""
+    refill = True
+
+    def __init__(self, name="Cryptographic Random",
+                 description="Pseudorandom Data Overwrite - NIST Pattern 3",
+                 seed=None, backend=None):
+        self.name = name
+        self.description = description
+        self.keystream = Keystream(seed, backend)
+        self.spec = f"Random bytes (0x00-0xFF, {self.keystream.backend})"
+
+    def fill(self, view, offset):
+        self.keystream.fill(view, offset)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Wipe Planner
+Walks a folder tree in parallel before anything is deleted and reports what
+the wipe will touch: file counts, logical versus allocated bytes and the size
+distribution. A short micro-benchmark on the target device (one file through
+the real engine and pass schedule, plus a small-file batch) turns that into a
+time estimate. WipeProgress then tracks a running wipe against the plan.
+"""
+import errno
+import os
+import shutil
+import tempfile
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .batch import SMALL_FILE_THRESHOLD, SmallFileBatcher
+from .durability import make_policy
+from .engine import OverwriteEngine
+
+PLAN_WORKERS = 8
+BENCH_BYTES = 8 * 1024 * 1024
+BENCH_SMALL_FILES = 64
+BENCH_SMALL_BYTES = 4096
+
+SIZE_CLASSES = (
+    (0, 'empty'),
+    (4 * 1024, '<= 4 KiB'),
+    (64 * 1024, '<= 64 KiB'),
+    (1024 * 1024, '<= 1 MiB'),
+    (64 * 1024 * 1024, '<= 64 MiB'),
+    (1024 * 1024 * 1024, '<= 1 GiB'),
+    (float('inf'), '> 1 GiB'),
+)
+_SIZE_LIMITS = [limit for limit, _ in SIZE_CLASSES]
+
+
+def format_bytes(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024 or unit == 'GiB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    if seconds < 10:
+        return f"{seconds:.1f}s"
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def allocated_size(st):
+    """Bytes actually backed by storage; st_size where block counts are unknown"""
+    blocks = getattr(st, 'st_blocks', None)
+    if blocks is None:
+        return st.st_size
+    return min(blocks * 512, st.st_size)
+
+
+def _scan_dir(path):
+    """List one directory: (subdirectories, file stats, other entries, errors)"""
+    subdirs, stats, other, errors = [], [], 0, []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stats.append(entry.stat(follow_symlinks=False))
+                    else:
+                        other += 1
+                except OSError as e:
+                    errors.append((entry.path, e))
+    except OSError as e:
+        errors.append((path, e))
+    return subdirs, stats, other, errors
+
+
+class WipePlan:
+    """
+    What wiping `root` with `passes` passes involves. Files up to
+    small_threshold bytes are counted as batched (0: no batching).
+    write_rate and small_file_seconds are filled in by calibrate(), which
+    records the schedule it measured in `schedule`.
+    """
+
+    def __init__(self, root, passes=3, small_threshold=SMALL_FILE_THRESHOLD):
+        self.root = os.fspath(root)
+        self.passes = passes
+        self.small_threshold = small_threshold
+        self.files = 0
+        self.directories = 0
+        self.unlink_only = 0  # extra hardlink names, symlinks, special files
+        self.logical_bytes = 0
+        self.allocated_bytes = 0
+        self.small_files = 0
+        self.small_bytes = 0
+        self.size_classes = [[label, 0, 0] for _, label in SIZE_CLASSES]  # label, files, bytes
+        self.errors = []
+        self.scan_seconds = 0.0
+        self.write_rate = None
+        self.small_file_seconds = None
+        self.schedule = None
+
+    @property
+    def total_bytes(self):
+        """Bytes the wipe will write across all passes"""
+        return self.allocated_bytes * self.passes
+
+    @property
+    def estimate_seconds(self):
+        if self.write_rate is None:
+            return None
+        large_bytes = (self.allocated_bytes - self.small_bytes) * self.passes
+        return large_bytes / self.write_rate + self.small_files * (self.small_file_seconds or 0.0)
+
+    def add(self, st):
+        size = st.st_size
+        allocated = allocated_size(st)
+        self.files += 1
+        self.logical_bytes += size
+        self.allocated_bytes += allocated
+        if self.small_threshold and size <= self.small_threshold:
+            self.small_files += 1
+            self.small_bytes += allocated
+        size_class = self.size_classes[bisect_left(_SIZE_LIMITS, size)]
+        size_class[1] += 1
+        size_class[2] += size
+
+    def scratch_parent(self):
+        """The folder holding root when it is writable and on root's device, else None"""
+        parent = os.path.dirname(os.path.abspath(self.root))
+        try:
+            if os.stat(parent).st_dev == os.stat(self.root).st_dev and os.access(parent, os.W_OK):
+                return parent
+        except OSError:
+            pass
+        return None
+
+    def calibrate(self, io_mode='buffered', durability='pass', sample_bytes=BENCH_BYTES,
+                  small_files=BENCH_SMALL_FILES, schedule=None, scratch_parent=None):
+        """
+        Time the real engine on scratch files (removed again): one
+        sample_bytes file for the streaming rate, and a batch of small files
+        for the per-file cost when the plan has any. `schedule` is the
+        PassSchedule of the run (default: the standard one); with one, the
+        plan's passes follow it. The scratch folder goes next to root, so
+        nothing is written into the tree before the wipe is confirmed;
+        pass `scratch_parent` (e.g. root itself, once confirmed) where root
+        is a mount point or its parent is read-only.
+        """
+        self.write_rate = self.small_file_seconds = None  # a failed run leaves no stale estimate
+        scratch_parent = scratch_parent or self.scratch_parent()
+        if scratch_parent is None:
+            raise OSError(errno.EXDEV, "no writable folder next to the target on the same device")
+        if schedule is not None:
+            self.passes = len(schedule)
+        self.schedule = schedule
+        scratch = tempfile.mkdtemp(prefix='.wipe-bench-', dir=scratch_parent)
+        try:
+            policy = make_policy(durability)
+            with OverwriteEngine(io_mode=io_mode, durability=policy, schedule=schedule) as engine:
+                path = os.path.join(scratch, 'stream.bin')
+                with open(path, 'wb') as f:
+                    f.write(os.urandom(sample_bytes))
+                start = time.perf_counter()
+                engine.overwrite(path, self.passes)
+                engine.unlink(path)
+                policy.finish()
+                self.write_rate = sample_bytes * self.passes / max(time.perf_counter() - start, 1e-9)
+                if self.small_files:
+                    paths = []
+                    for i in range(small_files):
+                        paths.append(os.path.join(scratch, f"small{i:03d}.bin"))
+                        with open(paths[-1], 'wb') as f:
+                            f.write(os.urandom(BENCH_SMALL_BYTES))
+                    start = time.perf_counter()
+                    with SmallFileBatcher(engine, self.passes, batch_files=small_files) as batcher:
+                        for path in paths:
+                            batcher.add(path, BENCH_SMALL_BYTES)
+                        batcher.flush()
+                    policy.finish()
+                    self.small_file_seconds = (time.perf_counter() - start) / small_files
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        return self
+
+    def describe(self):
+        """Human-readable plan, one line per item"""
+        lines = [
+            f"Files: {self.files:,} in {self.directories:,} folder(s)"
+            + (f", plus {self.unlink_only:,} link(s)/special file(s) to unlink" if self.unlink_only else ""),
+            f"Size: {format_bytes(self.logical_bytes)} logical, {format_bytes(self.allocated_bytes)} allocated",
+            f"To write: {format_bytes(self.total_bytes)} over {self.passes} pass(es)",
+        ]
+        if self.small_files:
+            lines.append(f"Small files (batched): {self.small_files:,}")
+        lines.append("Size distribution:")
+        for label, count, nbytes in self.size_classes:
+            if count:
+                lines.append(f"  {label:<10} {count:>10,} file(s) {format_bytes(nbytes):>12}")
+        if self.write_rate is not None:
+            lines.append(f"Measured write rate: {self.write_rate / 1e6:.1f} MB/s"
+                         + (f", {self.small_file_seconds * 1000:.2f} ms per small file"
+                            if self.small_file_seconds is not None else ""))
+            lines.append(f"Estimated time: {format_duration(self.estimate_seconds)}")
+        if self.errors:
+            lines.append(f"Unreadable entries: {len(self.errors)}")
+        lines.append(f"Scanned in {self.scan_seconds:.2f}s")
+        return lines
+
+
+def plan_wipe(root, passes=3, small_threshold=SMALL_FILE_THRESHOLD, workers=PLAN_WORKERS):
+    """
+    Walk root with a pool of scandir workers (one directory per task) and
+    return a WipePlan. Hardlinked inodes count once, as they are wiped once.
+    """
+    plan = WipePlan(root, passes, small_threshold)
+    start = time.perf_counter()
+    seen_inodes = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, plan.root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, stats, other, errors = future.result()
+                plan.directories += 1
+                pending.update(pool.submit(_scan_dir, path) for path in subdirs)
+                plan.unlink_only += other
+                plan.errors.extend(errors)
+                for st in stats:
+                    if st.st_nlink > 1:
+                        key = (st.st_dev, st.st_ino)
+                        if key in seen_inodes:
+                            plan.unlink_only += 1
+                            continue
+                        seen_inodes.add(key)
+                    plan.add(st)
+    plan.scan_seconds = time.perf_counter() - start
+    return plan
+
+
+class WipeProgress:
+    """Progress of a running wipe (reporting into `metrics`) against its plan"""
+
+    def __init__(self, plan, metrics):
+        self.plan = plan
+        self.metrics = metrics
+
+    @property
+    def fraction(self):
+        if self.plan.total_bytes:
+            return min(1.0, self.metrics.bytes_written / self.plan.total_bytes)
+        if self.plan.files:
+            return min(1.0, self.metrics.files / self.plan.files)
+        return 1.0
+
+    @property
+    def eta_seconds(self):
+        """Remaining time: extrapolated from the run so far, or the plan's estimate at the start"""
+        fraction = self.fraction
+        elapsed = time.perf_counter() - self.metrics.started
+        if fraction >= 1.0:
+            return 0.0
+        if fraction > 0.01 and elapsed > 1.0:
+            return elapsed * (1 - fraction) / fraction
+        estimate = self.plan.estimate_seconds
+        return None if estimate is None else max(0.0, estimate - elapsed)
+
+    def bar(self, width=30):
+        filled = int(self.fraction * width)
+        return "[" + "#" * filled + "." * (width - filled) + "]"
+
+    def describe(self):
+        return (f"{self.bar()} {self.fraction:.0%} - {self.metrics.files:,}/{self.plan.files:,} files, "
+                f"ETA {format_duration(self.eta_seconds)}")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Pass Schedules
+Declarative overwrite schedules. A schedule is just a list of pass specs
+(a byte pattern, or None for random data); the engine turns it into pattern
+objects and runs every pass through the same write loop, which fills the
+reused chunk buffer once for fixed patterns and generates data per chunk
+only for random passes. Adding a schedule is a matter of listing its passes.
+
+  standard   - zeros, ones, then random data for every further pass (default)
+  nist-clear - NIST SP 800-88 Rev. 1 Clear: a single pass of zeros
+  random     - random data on every pass
+  dod        - DoD 5220.22-M (E): a character, its complement, random
+  dod-ece    - DoD 5220.22-M (ECE): the E passes, a random pass, the E passes
+  custom     - byte patterns given as hex strings, e.g. "55,AA,random"
+"""
+from collections import namedtuple
+
+from .patterns import FixedPattern, RandomPattern
+
+PassSpec = namedtuple('PassSpec', 'value name description')  # value: bytes, or None for random
+
+ZEROS = PassSpec(b"\x00", "Zero Fill (0x00)", "Deterministic Pattern Erasure - NIST Pattern 1")
+ONES = PassSpec(b"\xff", "One Fill (0xFF)", "Complement Pattern Erasure - NIST Pattern 2")
+RANDOM = PassSpec(None, "Cryptographic Random", "Pseudorandom Data Overwrite - NIST Pattern 3")
+
+DOD_E = (
+    PassSpec(b"\x00", "DoD Character (0x00)", "DoD 5220.22-M Pass 1 - Character"),
+    PassSpec(b"\xff", "DoD Complement (0xFF)", "DoD 5220.22-M Pass 2 - Complement"),
+    PassSpec(None, "DoD Random", "DoD 5220.22-M Pass 3 - Random Character"),
+)
+
+
+def _standard(passes):
+    return ([ZEROS, ONES] + [RANDOM] * max(0, passes - 2))[:passes]
+
+
+# name -> (title, fixed pass list, or a builder taking the pass count)
+SCHEDULES = {
+    'standard': ("Zeros, ones, random", _standard),
+    'nist-clear': ("NIST SP 800-88 Rev. 1 Clear", (ZEROS,)),
+    'random': ("Random data", lambda passes: [RANDOM] * passes),
+    'dod': ("DoD 5220.22-M (E)", DOD_E),
+    'dod-ece': ("DoD 5220.22-M (ECE)", DOD_E + (RANDOM,) + DOD_E),
+    'custom': ("Custom patterns", None),
+}
+
+
+def parse_custom(text):
+    """Pass specs from "55,AA,924924,random": hex byte patterns or 'random'"""
+    specs = []
+    for token in text.replace(' ', '').split(','):
+        if token.lower() in ('random', 'r'):
+            specs.append(RANDOM)
+            continue
+        try:
+            value = bytes.fromhex(token[2:] if token.lower().startswith('0x') else token)
+        except ValueError:
+            raise ValueError(f"Invalid pattern {token!r}: use hex bytes such as 55 or 924924, or 'random'")
+        if not value:
+            raise ValueError("Empty pattern in custom schedule")
+        label = " ".join(f"0x{b:02X}" for b in value)
+        specs.append(PassSpec(value, f"Pattern {label}", f"Custom Pattern Erasure ({label})"))
+    return specs
+
+
+class PassSchedule:
+    """A named, ordered list of PassSpecs; patterns() builds fresh pattern objects per file"""
+
+    def __init__(self, name, title, passes):
+        if not passes:
+            raise ValueError("A schedule needs at least one pass")
+        self.name = name
+        self.title = title
+        self.passes = tuple(passes)
+
+    def __len__(self):
+        return len(self.passes)
+
+    @property
+    def key(self):
+        """Canonical content of the schedule, e.g. "00,FF,random" (recorded in journals)"""
+        return ",".join('random' if spec.value is None else spec.value.hex().upper() for spec in self.passes)
+
+    def patterns(self):
+        return [RandomPattern(spec.name, spec.description) if spec.value is None
+                else FixedPattern(spec.value, spec.name, spec.description) for spec in self.passes]
+
+    def describe(self):
+        return f"{self.title} ({len(self)} pass(es): " + ", ".join(spec.name for spec in self.passes) + ")"
+
+
+def make_schedule(name='standard', passes=None, custom=None):
+    """
+    Build a schedule by name. `passes` sets the length of the variable
+    schedules (default 3) and must match the fixed ones when given;
+    `custom` is the pattern list for the 'custom' schedule.
+    """
+    try:
+        title, specs = SCHEDULES[name]
+    except KeyError:
+        raise ValueError(f"Unknown pass schedule: {name}")
+    if name == 'custom':
+        if not custom:
+            raise ValueError("The custom schedule needs a pattern list, e.g. 55,AA,random")
+        specs = parse_custom(custom)
+    elif callable(specs):
+        specs = specs(3 if passes is None else passes)
+    if passes is not None and passes != len(specs):
+        raise ValueError(f"The {name} schedule has {len(specs)} pass(es), not {passes}")
+    return PassSchedule(name, title, specs)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Range-Sharded Overwrite
+Splits the data extents of one large file into contiguous byte ranges and
+overwrites them with several concurrent pwrite workers, so a single huge file
+keeps every member of a striped array (or the queues of an NVMe drive) busy.
+Passes stay strictly ordered: every shard finishes pass N and the file is
+synced before any shard starts pass N+1. The file is reported as one file
+(one pass event per pass, one final pattern for read-back verification).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+from .durability import PerPassSync, datasync
+from .engine import CHUNK_SIZE, OverwriteEngine, data_extents
+
+SHARD_WORKERS = 4
+SHARD_MIN_BYTES = 1024 * 1024 * 1024  # smaller files are not worth splitting
+
+
+def split_extents(extents, shards, align=CHUNK_SIZE):
+    """
+    Divide (offset, length) extents into at most `shards` groups of about
+    equal byte counts, in file order. Cuts fall on multiples of `align`, so
+    each shard's chunks stay aligned for direct I/O.
+    """
+    total = sum(length for _, length in extents)
+    share = -(-total // max(1, shards))
+    groups, current, filled = [], [], 0
+    for offset, length in extents:
+        end = offset + length
+        while offset < end:
+            cut = min(end, -(-(offset + share - filled) // align) * align)
+            current.append((offset, cut - offset))
+            filled += cut - offset
+            offset = cut
+            if filled >= share:
+                groups.append(current)
+                current, filled = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+class ShardedOverwriter:
+    """
+    Drop-in for OverwriteEngine.overwrite() on large files: `shards` worker
+    threads, each owning its own OverwriteEngine (chunk buffers are never
+    shared) and writing one range of the file through pwrite. Direct I/O
+    descriptors are opened per shard. All engines share one durability
+    policy; between passes the file is synced even when the policy would
+    only sync at the end, since otherwise pass N+1 could reach the disk
+    before pass N. A journal records seeds and completed passes; an
+    interrupted pass restarts from its beginning.
+    """
+
+    def __init__(self, shards=SHARD_WORKERS, min_bytes=SHARD_MIN_BYTES, chunk_size=CHUNK_SIZE,
+                 io_mode='buffered', durability=None, journal=None, metrics=None, schedule=None,
+                 **engine_options):
+        self.min_bytes = min_bytes
+        self.durability = durability if durability is not None else PerPassSync()
+        self.journal = journal
+        self.metrics = metrics
+        self.final_pattern = None
+        self.allocated = 0
+        self.bytes_written = 0
+        self._engines = [OverwriteEngine(chunk_size, io_mode, self.durability, schedule=schedule, **engine_options)
+                         for _ in range(max(1, shards))]
+        self.chunk_size = self._engines[0].chunk_size
+        self._pool = ThreadPoolExecutor(max_workers=len(self._engines), thread_name_prefix='wipe-shard')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def shards(self):
+        return len(self._engines)
+
+    @property
+    def cache_avoided(self):
+        return sum(engine.cache_avoided for engine in self._engines)
+
+    @property
+    def rng_seconds(self):
+        return sum(engine.rng_seconds for engine in self._engines)
+
+    @property
+    def write_seconds(self):
+        return sum(engine.write_seconds for engine in self._engines)
+
+    def accepts(self, size):
+        return size >= self.min_bytes
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for engine in self._engines:
+            engine.close()
+        self.durability.finish()
+
+    def overwrite(self, file_path, passes=3, on_pass_start=None, on_pass_complete=None):
+        """
+        Overwrite the allocated extents of a file with `passes` patterns,
+        each pass written by all shards at once. Same contract as
+        OverwriteEngine.overwrite(): returns the file size; raises the first
+        OSError of any shard once every shard has stopped.
+        """
+        journal = self.journal
+        patterns = self._engines[0].patterns(passes)
+        start_pass = 0
+        if journal is not None:
+            patterns = journal.patterns(file_path, patterns)
+            if journal.is_done(file_path):
+                self.final_pattern = patterns[-1] if patterns else None
+                self.allocated = 0
+                return os.stat(file_path).st_size
+            start_pass, _ = journal.resume_point(file_path)
+        metrics = self.metrics
+        file_start = time.perf_counter()
+        fd = os.open(file_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        self.final_pattern = None
+        try:
+            size = os.fstat(fd).st_size
+            extents = data_extents(fd, size)
+            self.allocated = sum(length for _, length in extents)
+            shards = split_extents(extents, len(self._engines), self.chunk_size)
+            for index, pattern in enumerate(patterns):
+                if index < start_pass:
+                    continue
+                if journal is not None:
+                    journal.pass_started(file_path, index, pattern)
+                if on_pass_start:
+                    on_pass_start(index, pattern)
+                pass_start = time.perf_counter()
+                rng, write = self.rng_seconds, self.write_seconds
+                self._write_shards(file_path, fd, size, pattern, shards)
+                self.bytes_written += self.allocated
+                # The pass barrier: all shards are done; make the pass durable
+                if self.durability.syncs_each_pass:
+                    self.durability.after_pass(fd)
+                elif index + 1 < len(patterns):
+                    self.durability.timed(datasync, fd)
+                if metrics is not None:
+                    metrics.pass_done(file_path, index, pattern.name, self.allocated,
+                                      time.perf_counter() - pass_start,
+                                      self.rng_seconds - rng, self.write_seconds - write)
+                if journal is not None:
+                    journal.checkpoint(file_path, index + 1, 0)
+                self.final_pattern = pattern
+                if on_pass_complete:
+                    on_pass_complete(index, pattern, self.allocated)
+            self.durability.after_file(fd, size)
+            if journal is not None:
+                journal.file_done(file_path)
+            if metrics is not None:
+                metrics.file_done(file_path, size, self.allocated, passes, time.perf_counter() - file_start)
+        finally:
+            os.close(fd)
+        return size
+
+    def _write_shards(self, file_path, fd, size, pattern, shards):
+        futures = [self._pool.submit(self._write_shard, engine, file_path, fd, size, pattern, extents)
+                   for engine, extents in zip(self._engines, shards)]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        finally:
+            wait(futures)  # never leave a shard writing into the next pass or a closed fd
+
+    @staticmethod
+    def _write_shard(engine, file_path, fd, size, pattern, extents):
+        direct_fd = engine._open_direct(file_path) if engine.effective_io_mode == 'direct' else None
+        try:
+            direct_fd = engine.write_pass(fd, size, pattern, direct_fd, extents)
+        finally:
+            if direct_fd is not None:
+                os.close(direct_fd)
+
+    def unlink(self, file_path):
+        """Remove an overwritten file through the durability policy"""
+        self.durability.unlink(file_path)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Crypto-Shredding Vault
+Files that will have to be destroyed later are stored encrypted, so that
+destroying them means destroying a few bytes of key material instead of
+overwriting every byte of data. Shredding takes the same time for 1 KiB as
+for 1 TiB.
+
+Layout of a vault directory:
+  vault.json        - key scope, chunk size and keystream backend
+  master.key        - 32-byte master key (may live elsewhere, e.g. removable media)
+  keys/<id>.key     - data keys, each wrapped (XOR pad + MAC) by the master key
+  dirs.json         - 'directory' scope: the random key id of each vault directory
+  data/<name>       - encrypted files: header, then chunks of ciphertext + tag
+
+Each data key covers one file ('file' scope) or every file stored in one
+directory ('directory' scope); key ids are random. Storing over an existing
+name in 'file' scope destroys the old file's key first. Every file derives
+its own encryption and MAC keys from the data key and a random per-file
+nonce. Chunks are encrypted with the seekable Keystream ('aes-ctr' or 'shake') and authenticated with a
+truncated HMAC-SHA256 over the header, chunk index, a final-chunk flag and the
+ciphertext, so chunks cannot be reordered, swapped or cut off. Encryption and
+decryption stream one chunk at a time with a single chunk of look-ahead.
+
+Destroying a key overwrites the key file in place with a synced pass per
+pattern, unlinks it and syncs the directory; destroy() does the same to the
+master key, which renders every data key in the vault unrecoverable at once.
+File names and sizes are not hidden.
+"""
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import struct
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from .durability import datasync, fsync_directory
+from .engine import CHUNK_SIZE, overwrite_file
+from .patterns import Keystream, available_backends
+
+VAULT_VERSION = 1
+VAULT_MAGIC = b"MHVAULT1"
+KEY_SIZE = 32
+KEY_ID_SIZE = 16
+NONCE_SIZE = 16
+TAG_SIZE = 16
+KEY_SCOPES = ('file', 'directory')
+KEY_PASSES = 3  # overwrite passes for key material before it is unlinked
+BACKENDS = ('aes-ctr', 'shake')  # backend index is stored in every file header
+
+# magic, backend index, key id, file nonce, chunk size
+HEADER = struct.Struct(f">{len(VAULT_MAGIC)}sB{KEY_ID_SIZE}s{NONCE_SIZE}sI")
+
+# key_seconds: until the data was unrecoverable; seconds: including removing the files
+ShredResult = namedtuple('ShredResult', 'name keys files bytes key_seconds seconds')
+
+
+class VaultError(Exception):
+    """Raised for a missing or corrupt vault, a wrong master key or tampered data"""
+
+
+def _derive(key, label, *parts):
+    return hmac.new(key, label + b"".join(parts), hashlib.sha256).digest()
+
+
+def _xor(data, pad):
+    n = len(data)
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(pad[:n], 'little')).to_bytes(n, 'little')
+
+
+def _write_durably(path, data):
+    """Create `path` with `data`, sync it and its directory (fails if it exists)"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+    try:
+        os.write(fd, data)
+        datasync(fd)
+    finally:
+        os.close(fd)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def destroy_key_file(path, passes=KEY_PASSES):
+    """Overwrite key material in place (a sync per pass), unlink it and sync the directory"""
+    overwrite_file(path, passes)
+    os.unlink(path)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class StreamCipher:
+    """Chunked encrypt-then-MAC for one file, keyed from a data key and a file nonce"""
+
+    def __init__(self, data_key, header, backend, nonce, chunk_size):
+        file_key = _derive(data_key, b"manhattan-vault-file", nonce)
+        self.keystream = Keystream(_derive(file_key, b"manhattan-vault-enc"), backend)
+        self._mac_key = _derive(file_key, b"manhattan-vault-mac")
+        self.header = header
+        self.chunk_size = chunk_size
+
+    def tag(self, index, final, ciphertext):
+        mac = hmac.new(self._mac_key, self.header, hashlib.sha256)
+        mac.update(struct.pack(">Q?", index, final))
+        mac.update(ciphertext)
+        return mac.digest()[:TAG_SIZE]
+
+    def encrypt(self, index, final, plaintext):
+        ciphertext = _xor(plaintext, self.keystream.generate(index * self.chunk_size, len(plaintext)))
+        return ciphertext + self.tag(index, final, ciphertext)
+
+    def decrypt(self, index, final, block):
+        ciphertext, tag = block[:-TAG_SIZE], block[-TAG_SIZE:]
+        if not hmac.compare_digest(tag, self.tag(index, final, ciphertext)):
+            raise VaultError(f"Chunk {index} failed authentication (tampered, truncated or wrong key)")
+        return _xor(ciphertext, self.keystream.generate(index * self.chunk_size, len(ciphertext)))
+
+
+def _chunks(f, size):
+    """Yield (index, final, block) for fixed-size reads, looking one block ahead"""
+    block = f.read(size)
+    index = 0
+    while True:
+        following = f.read(size)
+        yield index, not following, block
+        if not following:
+            return
+        block = following
+        index += 1
+
+
+class CryptoVault:
+    """
+    An encrypted store whose contents are destroyed by destroying keys.
+    Open an existing vault with CryptoVault(root); create one with
+    CryptoVault.create(root). `master_key_path` defaults to root/master.key.
+    Names are vault-relative paths using '/' separators.
+    """
+
+    def __init__(self, root, master_key_path=None):
+        self.root = Path(root)
+        self.master_key_path = Path(master_key_path) if master_key_path else self.root / "master.key"
+        try:
+            config = json.loads((self.root / "vault.json").read_text())
+            self._master = self.master_key_path.read_bytes()
+        except FileNotFoundError as e:
+            raise VaultError(f"Not a vault or master key missing: {e.filename}")
+        if config.get('version') != VAULT_VERSION or len(self._master) != KEY_SIZE:
+            raise VaultError(f"Unsupported vault or malformed master key in {self.root}")
+        self.key_scope = config['key_scope']
+        self.chunk_size = config['chunk_size']
+        self.backend = config['backend']
+        self.keys_dir = self.root / "keys"
+        self.data_dir = self.root / "data"
+
+    @classmethod
+    def create(cls, root, key_scope='file', master_key_path=None, chunk_size=CHUNK_SIZE, backend=None):
+        if key_scope not in KEY_SCOPES:
+            raise ValueError(f"Unknown key scope: {key_scope}")
+        backend = backend or next(b for b in available_backends() if b in BACKENDS)
+        if backend not in BACKENDS:
+            raise ValueError(f"Vault backend must be reproducible: {', '.join(BACKENDS)}")
+        root = Path(root)
+        (root / "keys").mkdir(parents=True, exist_ok=True)
+        (root / "data").mkdir(exist_ok=True)
+        if (root / "vault.json").exists():
+            raise VaultError(f"A vault already exists in {root}")
+        master_key_path = Path(master_key_path) if master_key_path else root / "master.key"
+        _write_durably(master_key_path, os.urandom(KEY_SIZE))
+        config = {'version': VAULT_VERSION, 'key_scope': key_scope, 'chunk_size': chunk_size, 'backend': backend}
+        _write_durably(root / "vault.json", json.dumps(config).encode())
+        return cls(root, master_key_path)
+
+    # --- keys ---------------------------------------------------------------
+
+    def _key_path(self, key_id):
+        return self.keys_dir / f"{key_id.hex()}.key"
+
+    def _wrap(self, key_id, data_key):
+        wrapped = _xor(data_key, _derive(self._master, b"manhattan-vault-wrap", key_id))
+        return wrapped + _derive(self._master, b"manhattan-vault-tag", key_id, wrapped)[:TAG_SIZE]
+
+    def _unwrap(self, key_id):
+        try:
+            blob = self._key_path(key_id).read_bytes()
+        except FileNotFoundError:
+            raise VaultError(f"Key {key_id.hex()} has been destroyed")
+        wrapped, tag = blob[:KEY_SIZE], blob[KEY_SIZE:]
+        if not hmac.compare_digest(tag, _derive(self._master, b"manhattan-vault-tag", key_id, wrapped)[:TAG_SIZE]):
+            raise VaultError(f"Key {key_id.hex()} failed authentication (wrong master key?)")
+        return _xor(wrapped, _derive(self._master, b"manhattan-vault-wrap", key_id))
+
+    def _directory_keys(self):
+        """{vault directory: key id (hex)} for a 'directory' scope vault"""
+        try:
+            return json.loads((self.root / "dirs.json").read_text())
+        except FileNotFoundError:
+            return {}
+
+    def _save_directory_keys(self, keys):
+        temp = self.root / "dirs.json.tmp"
+        if temp.exists():
+            temp.unlink()
+        _write_durably(temp, json.dumps(keys, sort_keys=True).encode())
+        os.replace(temp, self.root / "dirs.json")
+        fsync_directory(self.root)
+
+    def _key_for_store(self, name):
+        """
+        (key id, data key) for a new file: a fresh key, or its directory's
+        shared key. Key ids are random, so a directory re-created after
+        shred_dir() never gets its old key id (and wrap pad) back.
+        """
+        key_id = os.urandom(KEY_ID_SIZE)
+        if self.key_scope == 'directory':
+            directory = name.rpartition('/')[0]
+            keys = self._directory_keys()
+            if directory in keys and self._key_path(bytes.fromhex(keys[directory])).exists():
+                shared = bytes.fromhex(keys[directory])
+                return shared, self._unwrap(shared)
+            keys[directory] = key_id.hex()
+        data_key = os.urandom(KEY_SIZE)
+        _write_durably(self._key_path(key_id), self._wrap(key_id, data_key))
+        if self.key_scope == 'directory':
+            self._save_directory_keys(keys)
+        return key_id, data_key
+
+    def _read_header(self, f, name):
+        raw = f.read(HEADER.size)
+        try:
+            magic, backend, key_id, nonce, chunk_size = HEADER.unpack(raw)
+        except struct.error:
+            raise VaultError(f"{name}: not a vault file")
+        if magic != VAULT_MAGIC or backend >= len(BACKENDS):
+            raise VaultError(f"{name}: not a vault file")
+        return raw, BACKENDS[backend], key_id, nonce, chunk_size
+
+    # --- files --------------------------------------------------------------
+
+    def path(self, name):
+        path = (self.data_dir / name).resolve()
+        if self.data_dir.resolve() not in path.parents:
+            raise ValueError(f"Name escapes the vault: {name}")
+        return path
+
+    def names(self, prefix=''):
+        """Stored names, sorted, optionally below a vault directory"""
+        base = self.path(prefix) if prefix else self.data_dir
+        return sorted(p.relative_to(self.data_dir).as_posix() for p in base.rglob('*') if p.is_file())
+
+    def store(self, source, name):
+        """
+        Encrypt the file at `source` into the vault as `name`; returns its
+        size. In 'file' scope an existing `name` loses its key before it is
+        overwritten, so its old ciphertext cannot be decrypted.
+        """
+        target = self.path(name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if self.key_scope == 'file' and target.exists():
+            try:
+                old_key = self._key_path(self._key_id_of(target))
+            except VaultError:  # not a vault file; nothing to destroy
+                old_key = None
+            if old_key is not None and old_key.exists():
+                destroy_key_file(old_key)
+        key_id, data_key = self._key_for_store(name)
+        nonce = os.urandom(NONCE_SIZE)
+        header = HEADER.pack(VAULT_MAGIC, BACKENDS.index(self.backend), key_id, nonce, self.chunk_size)
+        cipher = StreamCipher(data_key, header, self.backend, nonce, self.chunk_size)
+        size = 0
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            dst.write(header)
+            for index, final, block in _chunks(src, self.chunk_size):
+                dst.write(cipher.encrypt(index, final, block))
+                size += len(block)
+            dst.flush()
+            datasync(dst.fileno())
+        return size
+
+    def store_tree(self, folder, prefix=''):
+        """Encrypt every file below `folder` under `prefix`; returns (files, bytes)"""
+        folder = Path(folder)
+        files = total = 0
+        for dirpath, _, filenames in os.walk(folder):
+            for filename in sorted(filenames):
+                path = Path(dirpath) / filename
+                name = path.relative_to(folder).as_posix()
+                total += self.store(path, f"{prefix.rstrip('/')}/{name}" if prefix else name)
+                files += 1
+        return files, total
+
+    def read(self, name):
+        """Yield the plaintext of `name` chunk by chunk, authenticating each chunk"""
+        with open(self.path(name), 'rb') as f:
+            header, backend, key_id, nonce, chunk_size = self._read_header(f, name)
+            cipher = StreamCipher(self._unwrap(key_id), header, backend, nonce, chunk_size)
+            for index, final, block in _chunks(f, chunk_size + TAG_SIZE):
+                if len(block) < TAG_SIZE:
+                    raise VaultError(f"{name}: truncated")
+                yield cipher.decrypt(index, final, block)
+
+    def extract(self, name, dest):
+        """Decrypt `name` to the file `dest`; returns its size"""
+        size = 0
+        with open(dest, 'wb') as f:
+            for chunk in self.read(name):
+                f.write(chunk)
+                size += len(chunk)
+        return size
+
+    # --- destruction --------------------------------------------------------
+
+    def _key_id_of(self, path):
+        with open(path, 'rb') as f:
+            return self._read_header(f, path.name)[2]
+
+    def shred(self, name):
+        """
+        Destroy one file: its data key first, then the ciphertext is unlinked.
+        In a 'directory' scope vault only whole directories can be shredded.
+        """
+        if self.key_scope == 'directory':
+            raise VaultError("Keys are shared per directory in this vault; use shred_dir()")
+        start = time.perf_counter()
+        path = self.path(name)
+        size = path.stat().st_size
+        key_path = self._key_path(self._key_id_of(path))
+        if key_path.exists():
+            destroy_key_file(key_path)
+        destroyed = time.perf_counter()
+        path.unlink()
+        fsync_directory(path.parent)
+        return ShredResult(name, 1, 1, size, destroyed - start, time.perf_counter() - start)
+
+    def shred_dir(self, prefix):
+        """Destroy a vault directory: every key it uses, then its files"""
+        start = time.perf_counter()
+        base = self.path(prefix)
+        paths = [p for p in base.rglob('*') if p.is_file()]
+        key_ids = {self._key_id_of(p) for p in paths}
+        for key_id in key_ids:
+            key_path = self._key_path(key_id)
+            if key_path.exists():
+                destroy_key_file(key_path)
+        destroyed = time.perf_counter()
+        size = sum(p.stat().st_size for p in paths)
+        shutil.rmtree(base)
+        fsync_directory(base.parent)
+        if self.key_scope == 'directory':
+            top = base.relative_to(self.data_dir.resolve()).as_posix()
+            keys = self._directory_keys()
+            self._save_directory_keys({d: k for d, k in keys.items() if d != top and not d.startswith(top + '/')})
+        return ShredResult(prefix, len(key_ids), len(paths), size, destroyed - start, time.perf_counter() - start)
+
+    def destroy(self):
+        """Destroy the master key, which makes the whole vault unreadable, then remove it"""
+        start = time.perf_counter()
+        destroy_key_file(self.master_key_path)
+        self._master = None
+        destroyed = time.perf_counter()
+        paths = [p for p in self.data_dir.rglob('*') if p.is_file()]
+        size = sum(p.stat().st_size for p in paths)
+        shutil.rmtree(self.root)
+        fsync_directory(self.root.parent)
+        return ShredResult(str(self.root), 1, len(paths), size, destroyed - start, time.perf_counter() - start)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Read-Back Verification
+Re-reads the final overwrite pass and compares it with the expected pattern.
+Random passes are regenerated from their keystream seed, so nothing written
+has to be kept in memory. Only allocated extents are checked; holes were
+never written.
+
+  full   - every byte of the file is read back and compared
+  sample - a random sample of blocks is checked. The sample size is chosen
+           so that, if at least `defect_rate` of the blocks were not
+           overwritten, at least one of them is found with probability
+           `confidence`.
+
+Verification runs on its own thread (BackgroundVerifier) so it overlaps with
+writing the next file.
+"""
+import bisect
+import errno
+import math
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .engine import ALIGNMENT, CHUNK_SIZE, HAVE_DIRECT_IO, HAVE_FADVISE, aligned_buffer, data_extents
+
+VERIFY_MODES = ('off', 'sample', 'full')
+SAMPLE_BLOCK = 4096
+DEFAULT_CONFIDENCE = 0.99
+DEFAULT_DEFECT_RATE = 0.01
+
+VerifyResult = namedtuple('VerifyResult', 'path size ok mode checked mismatches source detail')
+
+
+class VerificationError(Exception):
+    """Raised when read-back finds data that does not match the final pass"""
+
+
+def sample_size(confidence=DEFAULT_CONFIDENCE, defect_rate=DEFAULT_DEFECT_RATE):
+    """Blocks to check so a defect_rate share of bad blocks is caught with `confidence`"""
+    return max(1, math.ceil(math.log(1 - confidence) / math.log(1 - defect_rate)))
+
+
+def describe_verification(mode, confidence=DEFAULT_CONFIDENCE, defect_rate=DEFAULT_DEFECT_RATE):
+    if mode == 'full':
+        return "full read-back of the final pass"
+    if mode == 'sample':
+        return (f"{sample_size(confidence, defect_rate)} random {SAMPLE_BLOCK}-byte blocks per file: "
+                f"{confidence:.0%} confidence that fewer than {defect_rate:.1%} of blocks were missed")
+    return "off"
+
+
+def _pread(fd, view, offset):
+    if hasattr(os, 'preadv'):
+        return os.preadv(fd, [view], offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    data = os.read(fd, len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+class Verifier:
+    """Reads files back through its own pair of aligned buffers"""
+
+    def __init__(self, mode='full', confidence=DEFAULT_CONFIDENCE,
+                 defect_rate=DEFAULT_DEFECT_RATE, chunk_size=CHUNK_SIZE):
+        if mode not in VERIFY_MODES or mode == 'off':
+            raise ValueError(f"Unknown verification mode: {mode}")
+        self.mode = mode
+        self.confidence = confidence
+        self.defect_rate = defect_rate
+        self.chunk_size = max(ALIGNMENT, chunk_size // ALIGNMENT * ALIGNMENT)
+        self._read = aligned_buffer(self.chunk_size)
+        self._expected = aligned_buffer(self.chunk_size)
+        self._rng = random.SystemRandom()
+
+    def close(self):
+        self._read.close()
+        self._expected.close()
+
+    def verify(self, path, size, pattern, extents=None):
+        """
+        Compare the file with `pattern`; returns a VerifyResult. `extents`
+        are the (offset, length) ranges to check, by default the file's
+        allocated data. A file that cannot be read back fails verification
+        with the error in `detail`.
+        """
+        if pattern is None:
+            return VerifyResult(path, size, True, self.mode, 0, 0, None, "skipped: no pass was written")
+        if getattr(pattern, 'keystream', None) is not None and not pattern.keystream.reproducible:
+            return VerifyResult(path, size, True, self.mode, 0, 0, None,
+                                "skipped: urandom passes cannot be regenerated")
+        checked = mismatches = 0
+        try:
+            fd, direct_fd = self._open(path)
+        except OSError as e:  # e.g. the file went away before a background check
+            return VerifyResult(path, size, False, self.mode, 0, 0, None, f"read-back failed: {e}")
+        source = 'buffered' if direct_fd is None else 'direct'
+        try:
+            if extents is None:
+                extents = data_extents(fd, size)
+            if self.mode == 'full':
+                ranges = self._split(extents, self.chunk_size)
+            else:
+                ranges = self._sample(extents)
+            for offset, length in ranges:
+                try:
+                    same = self._check(fd, direct_fd, offset, length, pattern)
+                except OSError as e:
+                    if direct_fd is None or e.errno != errno.EINVAL:
+                        raise
+                    # Filesystem accepted O_DIRECT at open but not for reads
+                    os.close(direct_fd)
+                    direct_fd, source = None, 'buffered'
+                    same = self._check(fd, None, offset, length, pattern)
+                if not same:
+                    mismatches += 1
+                checked += length
+        except OSError as e:
+            return VerifyResult(path, size, False, self.mode, checked, mismatches, source, f"read-back failed: {e}")
+        finally:
+            if direct_fd is not None:
+                os.close(direct_fd)
+            os.close(fd)
+        detail = None if not mismatches else f"{mismatches} range(s) differ from the final pass"
+        return VerifyResult(path, size, mismatches == 0, self.mode, checked, mismatches, source, detail)
+
+    @staticmethod
+    def _split(extents, step):
+        for start, length in extents:
+            for offset in range(start, start + length, step):
+                yield offset, min(step, start + length - offset)
+
+    def _sample(self, extents):
+        """Pick random SAMPLE_BLOCK ranges spread evenly over the allocated data"""
+        starts = []
+        total = 0
+        for _, length in extents:
+            starts.append(total)
+            total += -(-length // SAMPLE_BLOCK)
+        picks = self._rng.sample(range(total), min(total, sample_size(self.confidence, self.defect_rate)))
+        for block in sorted(picks):
+            i = bisect.bisect_right(starts, block) - 1
+            start, length = extents[i]
+            offset = start + (block - starts[i]) * SAMPLE_BLOCK
+            yield offset, min(SAMPLE_BLOCK, start + length - offset)
+
+    def _open(self, path):
+        """A buffered descriptor plus an O_DIRECT one where supported"""
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        direct_fd = None
+        if HAVE_DIRECT_IO:
+            try:
+                direct_fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    os.close(fd)
+                    raise
+        if HAVE_FADVISE:
+            # Drop clean cached pages so buffered reads come from the device
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return fd, direct_fd
+
+    def _check(self, fd, direct_fd, offset, length, pattern):
+        # O_DIRECT needs an aligned offset; extents on small-block filesystems may not be
+        if direct_fd is not None and offset % ALIGNMENT == 0:
+            fd, read_len = direct_fd, -(-length // ALIGNMENT) * ALIGNMENT
+        else:
+            read_len = length
+        got = memoryview(self._read)[:read_len]
+        expected = memoryview(self._expected)[:length]
+        try:
+            n = _pread(fd, got, offset)
+            pattern.fill(expected, offset)
+            return n >= length and got[:length] == expected
+        finally:
+            got.release()
+            expected.release()
+
+
+def make_verifier(mode='off', **options):
+    """Build a Verifier, or None when verification is off"""
+    if mode == 'off':
+        return None
+    return Verifier(mode, **options)
+
+
+class BackgroundVerifier:
+    """
+    Runs a Verifier on one background thread. submit() returns the results
+    that have finished so far and blocks only when `max_pending` files are
+    already waiting, keeping memory and open handles bounded.
+    """
+
+    def __init__(self, mode='sample', max_pending=2, **options):
+        self.verifier = Verifier(mode, **options)
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='verify')
+        self._pending = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.verifier.close()
+
+    def submit(self, path, size, pattern):
+        self._pending.add(self._executor.submit(self.verifier.verify, path, size, pattern))
+        return self._collect(block=len(self._pending) > self.max_pending)
+
+    def finish(self):
+        """Wait for every outstanding verification and return the results"""
+        results = []
+        while self._pending:
+            results.extend(self._collect(block=True))
+        return results
+
+    def _collect(self, block):
+        done, self._pending = wait(self._pending, timeout=None if block else 0,
+                                   return_when=FIRST_COMPLETED)
+        return [future.result() for future in done]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Manhattan Project - Streaming Tree Walker
+Depth-first traversal built on os.scandir with an explicit stack. Regular
+files are yielded as DirEntry objects the moment they are found, so a wipe
+can start immediately and memory does not grow with the number of files.
+Cleanup streams as well: entries that need no wipe are unlinked as they are
+reached and directories are removed as the walk leaves them.
+"""
+import os
+
+
+class TreeWalker:
+    """
+    Iterate over the regular files below `root`.
+
+    Symlinks are never followed. Only the first name of a hardlinked inode is
+    yielded for overwriting. With `cleanup` (the default) the walk removes
+    what needs no wipe as it goes, so nothing is collected per entry:
+    symlinks and special files are unlinked when reached (their data is not
+    ours to wipe), an extra hardlink name is unlinked when reached if the
+    first name is already gone (wiped and removed), and each directory is
+    removed post-order as the stack unwinds if it is empty by then.
+    remove_leftovers() finishes what was still in flight. Only the first
+    name of each hardlinked inode is remembered.
+    """
+
+    def __init__(self, root, cleanup=True, keep_root=False):
+        self.root = os.fspath(root)
+        self.cleanup = cleanup
+        self.keep_root = keep_root
+        self.removed = 0  # directories removed so far
+        self.errors = []
+        self._first_names = {}  # (st_dev, st_ino) -> first name, hardlinked inodes only
+
+    def __iter__(self):
+        stack = [(self.root, False)]
+        while stack:
+            path, scanned = stack.pop()
+            if scanned:  # every entry below path has been handled
+                self._remove_dir(path)
+                continue
+            if self.cleanup:
+                stack.append((path, True))
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, False))
+                            elif not entry.is_file(follow_symlinks=False):
+                                self._unlink(entry.path)
+                            elif self._first_link(entry):
+                                yield entry
+                            elif self._primary_gone(entry):
+                                self._unlink(entry.path)
+                        except OSError as e:
+                            self.errors.append((entry.path, e))
+            except OSError as e:
+                self.errors.append((path, e))
+
+    def _first_link(self, entry):
+        st = entry.stat(follow_symlinks=False)  # cached on the DirEntry
+        key = (st.st_dev, st.st_ino)
+        # Look up every file: by the time the second name is reached the
+        # first may already be unlinked, dropping st_nlink back to 1
+        first = self._first_names.get(key)
+        if first is not None and first != entry.path:
+            return False
+        if st.st_nlink > 1:
+            self._first_names[key] = entry.path
+        return True
+
+    def _primary_gone(self, entry):
+        """An extra name whose first name was wiped and unlinked; False while that is pending or failed"""
+        st = entry.stat(follow_symlinks=False)
+        return not os.path.lexists(self._first_names[(st.st_dev, st.st_ino)])
+
+    def _unlink(self, path):
+        if not self.cleanup:
+            return
+        try:
+            os.unlink(path)
+        except OSError as e:
+            self.errors.append((path, e))
+
+    def _remove_dir(self, path):
+        if self.keep_root and path == self.root:
+            return
+        try:
+            os.rmdir(path)
+            self.removed += 1
+        except OSError:
+            pass  # still holds files whose wipe is in flight or failed
+
+    def _remove_extra_name(self, entry):
+        st = entry.stat(follow_symlinks=False)
+        first = self._first_names.get((st.st_dev, st.st_ino))
+        if first is None or first == entry.path:
+            return  # a file whose wipe failed; it stays
+        if os.path.lexists(first):
+            self.errors.append((entry.path, "kept: the wipe of its other name did not finish"))
+        else:
+            os.unlink(entry.path)
+
+    def remove_leftovers(self):
+        """
+        Walk the tree again bottom-up once every wipe has finished: unlink
+        the extra names of inodes whose first name was wiped, and remove the
+        directories that are empty now. Extra names of inodes whose wipe
+        failed are kept and reported in `errors`, since unlinking them would
+        leave the data on disk with no name to reach it. Returns the number
+        of directories removed over the whole run.
+        """
+        stack = [(self.root, False)]
+        while stack:
+            path, scanned = stack.pop()
+            if scanned:
+                self._remove_dir(path)
+                continue
+            stack.append((path, True))
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, False))
+                            elif entry.is_file(follow_symlinks=False):
+                                self._remove_extra_name(entry)
+                        except OSError as e:
+                            self.errors.append((entry.path, e))
+            except OSError:
+                pass
+        return self.removed
+
+
+def iter_files(root):
+    """Yield the DirEntry of every regular file below root (no cleanup)"""
+    return iter(TreeWalker(root, cleanup=False))
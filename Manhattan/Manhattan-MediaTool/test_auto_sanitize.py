@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Test script for the ISO's auto-sanitization scheduler, command supervisor,
+erase progress and event log. Runs against a fake sysfs tree, stub sanitizers and stub
+nvme/hdparm executables on PATH, so no drive is touched.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import aclosing, contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "sanitization_engine" / "iso_build" / "files"))
+
+import auto_sanitize
+from drive_tools import (AtaEraseProgress, DriveInventory, EventLog, NvmeSanitizeProgress, SanitizeStatus,
+                         ata_erase_estimate, discover, format_event, format_size, log_files, query, run_command,
+                         tagged, wait_for_nvme_sanitize)
+from drive_tools.progress import IDLE_GRACE_POLLS
+from drive_tools import logquery
+
+auto_sanitize.LOG_PATH = os.devnull
+auto_sanitize.POLL_SECONDS = 0.01
+
+NVME_STUB = """#!{python}
+# sanitize-log reports SPROG advancing by 1/4 per call, then SSTAT {final}
+import json, sys
+from pathlib import Path
+calls = Path(__file__).with_name("nvme.calls")
+if sys.argv[1] == "sanitize":
+    calls.write_text("0")
+    sys.exit(0)
+count = int(calls.read_text()) + 1
+calls.write_text(str(count))
+running = count < 4
+print(json.dumps({{"nvme0": {{"sprog": min(count * 16384, 65535) if running else 65535,
+                              "sstat": 2 if running else {final},
+                              "time_block_erase": 600, "time_block_erase_no_dealloc": 4294967295}}}}))
+"""
+
+HDPARM_STUB = """#!{python}
+import os, sys, time
+if sys.argv[1] == "-I":
+    time.sleep(float(os.environ.get("HDPARM_IDENTIFY_DELAY", "0")))
+    print("    2min for SECURITY ERASE UNIT. 4min for ENHANCED SECURITY ERASE UNIT.")
+elif "--security-erase" in sys.argv:
+    time.sleep(0.1)
+"""
+
+
+def _fake_sysfs(root, disks):
+    """disks: name -> device path below /sys/devices; creates the /sys/block symlinks"""
+    (Path(root) / "block").mkdir(parents=True, exist_ok=True)
+    for name, device_path in disks.items():
+        target = Path(root) / "devices" / device_path / "block" / name
+        (target / "queue").mkdir(parents=True)
+        (target / "size").write_text("7814037168\n")
+        (target / "queue" / "rotational").write_text("1\n")
+        os.symlink(target, Path(root) / "block" / name)
+
+
+def _write_attrs(directory, attrs):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, value in attrs.items():
+        (directory / name).write_bytes(value if isinstance(value, bytes) else f"{value}\n".encode())
+
+
+def _fake_drive(root, name, device_path, dev, device=None, parts=(), **attrs):
+    """A disk below /sys/devices/<device_path> with its /sys/block link; NVMe namespaces sit in the controller"""
+    device_dir = Path(root) / "devices" / device_path
+    _write_attrs(device_dir, device or {})
+    nvme = name.startswith("nvme")
+    block = device_dir / name if nvme else device_dir / "block" / name
+    _write_attrs(block, {'dev': dev, 'size': 7814037168, 'removable': 0, 'ro': 0, **attrs})
+    _write_attrs(block / "queue", {'rotational': 0 if nvme else 1})
+    (block / "device").symlink_to(".." if nvme else "../..")
+    major, minor = dev.split(":")
+    for n, part in enumerate(parts, 1):
+        _write_attrs(block / part, {'dev': f"{major}:{int(minor) + n}", 'size': 2048000, 'partition': n})
+    (Path(root) / "block").mkdir(parents=True, exist_ok=True)
+    os.symlink(block, Path(root) / "block" / name)
+    return device_dir
+
+
+@contextmanager
+def _stubs_on_path(directory, final_sstat=1):
+    """Put stub nvme and hdparm executables first on PATH"""
+    for name, source in (('nvme', NVME_STUB), ('hdparm', HDPARM_STUB)):
+        path = Path(directory) / name
+        path.write_text(source.format(python=sys.executable, final=final_sstat))
+        path.chmod(0o755)
+    saved = os.environ.get('PATH', '')
+    os.environ['PATH'] = f"{directory}{os.pathsep}{saved}"
+    try:
+        yield
+    finally:
+        os.environ['PATH'] = saved
+
+
+async def _collect(jobs, sanitizer):
+    """Every JobResult of a schedule run with one sanitizer for all jobs"""
+    runner = lambda job: auto_sanitize.run_job(job, {'ata': sanitizer})
+    async with aclosing(auto_sanitize.schedule(jobs, runner=runner)) as results:
+        return [result async for result in results]
+
+
+def _dev(name, kind='ata'):
+    return {'name': f"/dev/{name}", 'model': "WDC", 'tran': 'sata', 'serial': name, 'type': kind}
+
+
+def test_topology_from_sysfs():
+    with tempfile.TemporaryDirectory() as tmp:
+        _fake_sysfs(tmp, {
+            'sda': "pci0000:00/0000:00:17.0/ata1/host0/target0:0:0/0:0:0:0",
+            'sdb': "pci0000:00/0000:00:14.0/usb2/2-1/2-1:1.0/host6/target6:0:0/6:0:0:0",
+            'nvme0n1': "pci0000:40/0000:40:01.1/0000:41:00.0/nvme/nvme0",
+        })
+        assert auto_sanitize.device_topology("/dev/sda", tmp) == ("0000:00:17.0", "pci0000:00")
+        assert auto_sanitize.device_topology("/dev/sdb", tmp) == ("0000:00:14.0", "usb2")
+        assert auto_sanitize.device_topology("/dev/nvme0n1", tmp) == ("0000:41:00.0", "pci0000:40")
+        assert auto_sanitize.device_topology("/dev/sdz", tmp) == ("sdz", "sdz")
+        assert asyncio.run(auto_sanitize.estimate_seconds(_dev('nvme0n1', 'nvme'), tmp)) == 7814037168 * 512 / 1e9
+    print("[OK] Topology: controller and bus derived from sysfs paths")
+
+
+def test_scheduler_respects_limits_and_isolates_failures():
+    """Longest jobs start first, limits hold, and one bad drive does not stop the rest"""
+    Job = auto_sanitize.SanitizeJob
+    jobs = [Job(_dev(f"sd{c}"), 'hba0' if i < 4 else 'hba1', 'pci0000:00', 10 - i) for i, c in enumerate("abcdef")]
+    jobs.append(Job(_dev("sdg"), 'usbhba', 'usb1', 1))
+    jobs.append(Job(_dev("sdh"), 'usbhba', 'usb1', 0.5))
+    jobs.append(Job(_dev("sdi"), 'usbhba', 'usb1', 0.1))
+    started = []
+    active = {}
+    peak = {}
+
+    async def sanitizer(dev, timeout, estimate):
+        job = next(job for job in jobs if job.dev is dev)
+        started.append(dev['name'])
+        for key in (job.controller, job.bus):
+            active[key] = active.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), active[key])
+        try:
+            await asyncio.sleep(0.02)
+            if dev['name'] == "/dev/sdb":
+                raise RuntimeError("drive stopped responding")
+            return dev['name'] != "/dev/sdc"
+        finally:
+            for key in (job.controller, job.bus):
+                active[key] -= 1
+
+    async def collect():
+        safe = lambda job: auto_sanitize.run_job(job, {'ata': sanitizer})
+        return [r async for r in auto_sanitize.schedule(jobs, max_per_controller=2, max_per_bus=3, runner=safe)]
+
+    results = asyncio.run(collect())
+    assert sorted(r.dev for r in results) == sorted(j.dev['name'] for j in jobs)
+    assert {r.dev for r in results if not r.ok} == {"/dev/sdb", "/dev/sdc"}
+    assert started[0] == "/dev/sda"
+    assert peak['hba0'] <= 2 and peak['hba1'] <= 2 and peak['usbhba'] <= 2
+    assert peak['pci0000:00'] <= 3 and peak['usb1'] <= auto_sanitize.MAX_PER_USB_BUS
+    print("[OK] Scheduler: longest-first, per-controller/bus limits, failures isolated")
+
+
+def test_nvme_sanitize_progress_from_sanitize_log():
+    """SPROG is polled until SSTAT reports the outcome, with an ETA from the rate"""
+    with tempfile.TemporaryDirectory() as tmp, _stubs_on_path(tmp):
+        events = []
+        (Path(tmp) / "nvme.calls").write_text("0")
+        final = wait_for_nvme_sanitize("/dev/nvme0n1", events.append, interval=0.01)
+        assert final.state == 'done' and final.fraction == 1.0
+        running = [e for e in events if e.state == 'running']
+        assert [round(e.fraction, 2) for e in running] == [0.25, 0.5, 0.75]
+        assert 590 < running[0].eta <= 600  # the drive's estimate until SPROG has moved
+        assert running[-1].eta is not None and running[-1].eta < running[0].eta
+        assert "nvme0n1" in format_event(running[1]) and "50.0%" in format_event(running[1])
+
+        logged = []
+        auto_sanitize.log, saved = (lambda msg, *args, **fields: logged.append(msg)), auto_sanitize.log
+        try:
+            assert asyncio.run(auto_sanitize.sanitize_nvme(_dev('nvme0n1', 'nvme')))
+        finally:
+            auto_sanitize.log = saved
+        assert any("75.0%" in line for line in logged) and "done" in logged[-1]
+    with tempfile.TemporaryDirectory() as tmp, _stubs_on_path(tmp, final_sstat=3):
+        (Path(tmp) / "nvme.calls").write_text("0")
+        assert wait_for_nvme_sanitize("/dev/nvme0n1", lambda e: None, interval=0.01).state == 'failed'
+    # An idle log right after the command is not a failure until it stays idle
+    source = NvmeSanitizeProgress("/dev/nvme0n1")
+    idle, running = SanitizeStatus(None, 'idle', None), SanitizeStatus(0.5, 'running', None)
+    assert [source.update(idle, 1)[1] for _ in range(IDLE_GRACE_POLLS)] == ['running'] * IDLE_GRACE_POLLS
+    assert source.update(running, 2)[:2] == (0.5, 'running')
+    assert all(source.update(idle, 3)[1] == 'running' for _ in range(IDLE_GRACE_POLLS))
+    assert source.update(idle, 4) == (None, 'failed', None)
+    print("[OK] NVMe: progress and ETA from sanitize-log, failure reported")
+
+
+def test_ata_erase_progress_from_hdparm_estimate():
+    """The hdparm -I estimate drives a capped progress model until the erase returns"""
+    with tempfile.TemporaryDirectory() as tmp, _stubs_on_path(tmp):
+        assert ata_erase_estimate("/dev/sda") == 120
+        assert ata_erase_estimate("/dev/sda", enhanced=True) == 240
+        model = AtaEraseProgress("/dev/sda", 120)
+        assert model.poll(30) == (0.25, 'running', 90)
+        assert model.poll(500) == (0.99, 'running', None)
+
+        logged = []
+        auto_sanitize.log, saved = (lambda msg, *args, **fields: logged.append(msg)), auto_sanitize.log
+        try:
+            assert asyncio.run(auto_sanitize.sanitize_ata(_dev('sda'), estimate=ata_erase_estimate("/dev/sda")))
+        finally:
+            auto_sanitize.log = saved
+        progress = [line for line in logged if line.startswith("sda:")]
+        assert "about 2 min left" in progress[0] and "done" in progress[-1]
+
+        # Planning asks every ATA drive for its estimate at once
+        os.environ['HDPARM_IDENTIFY_DELAY'] = "0.5"
+        auto_sanitize.log = lambda msg, *args, **fields: None
+        try:
+            start = time.monotonic()
+            jobs = asyncio.run(auto_sanitize.plan_jobs([_dev(f"sd{c}") for c in "abcdef"], tmp))
+            seconds = time.monotonic() - start
+        finally:
+            del os.environ['HDPARM_IDENTIFY_DELAY']
+            auto_sanitize.log = saved
+        assert [job.estimate for job in jobs] == [120] * 6
+        assert seconds < 2, seconds
+    print("[OK] ATA: progress modelled from the drive's erase estimate")
+
+
+def test_supervisor_streams_lines_and_enforces_watchdog():
+    """Lines arrive timestamped while the command runs; an overdue command is killed"""
+    script = "import sys, time\nprint('start', flush=True)\nprint('warn', file=sys.stderr, flush=True)\n" \
+             "time.sleep(0.3)\nprint('end')"
+    lines = []
+    start = time.time()
+    result = asyncio.run(run_command([sys.executable, "-c", script], timeout=5, on_line=lines.append))
+    assert result.returncode == 0 and result.error is None
+    assert result.stdout == ['start', 'end'] and result.stderr == ['warn']
+    assert {(l.stream, l.text) for l in lines[:2]} == {('stdout', 'start'), ('stderr', 'warn')}
+    assert lines[0].time - start < 0.25 and lines[-1].time - lines[0].time >= 0.25  # streamed, not buffered
+
+    result = asyncio.run(run_command([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.2, grace=1))
+    assert isinstance(result.error, TimeoutError) and result.returncode != 0 and result.seconds < 5
+    assert isinstance(asyncio.run(run_command(["no-such-tool-xyz"])).error, FileNotFoundError)
+    # A console command writes to our stdout; only its stderr is captured
+    script = "import sys; print('prompt', file=sys.stderr)"
+    result = asyncio.run(run_command([sys.executable, "-c", script], timeout=5, console=True))
+    assert result.returncode == 0 and result.stdout == [] and result.stderr == ["prompt"]
+    print("[OK] Supervisor: streamed, timestamped output and watchdog kill")
+
+
+def test_supervisor_runs_drives_concurrently_and_cancels_cleanly():
+    """Many commands run at once on one event loop; cancelling a run kills every command"""
+    async def many():
+        start = time.monotonic()
+        results = await asyncio.gather(*(run_command([sys.executable, "-c", "import time; time.sleep(0.5)"])
+                                         for _ in range(16)))
+        return results, time.monotonic() - start
+
+    results, seconds = asyncio.run(many())
+    assert all(r.returncode == 0 for r in results) and seconds < 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pids = Path(tmp) / "pids"
+        script = f"import os, time\nopen({str(pids)!r}, 'a').write(f'{{os.getpid()}}\\n')\ntime.sleep(30)"
+        jobs = [auto_sanitize.SanitizeJob(_dev(f"sd{c}"), 'hba0', 'pci0000:00', 1) for c in "abc"]
+
+        async def sanitizer(dev, timeout, estimate):
+            return await auto_sanitize.run([sys.executable, "-c", script], timeout, dev['name'])
+
+        async def cancel_midway():
+            task = asyncio.ensure_future(_collect(jobs, sanitizer))
+            while not pids.exists() or len(pids.read_text().split()) < 3:
+                await asyncio.sleep(0.02)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+
+        assert asyncio.run(cancel_midway())
+        for pid in map(int, pids.read_text().split()):
+            try:
+                os.kill(pid, 0)
+                raise AssertionError(f"command {pid} outlived the cancelled run")
+            except ProcessLookupError:
+                pass
+    print("[OK] Supervisor: one event loop for all drives, cancellation kills every command")
+
+
+def test_event_log_is_structured_bounded_and_rotated():
+    """Threads and tasks log concurrently; every record lands, tagged, across rotated files"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sanitize.jsonl")
+        with EventLog(path, max_bytes=20000, backups=50, max_buffer=16, interval=0.01, run="r1") as log:
+            def drive(n):
+                with tagged(device=f"/dev/sd{n}", serial=f"SER{n}", job=n, phase='erase'):
+                    for i in range(100):
+                        log(f"line {i}", seq=i)
+
+            async def drives():
+                async def one(n):
+                    with tagged(device=f"/dev/nvme{n}n1", serial=f"NV{n}", job=10 + n, phase='wait'):
+                        for i in range(100):
+                            log(f"line {i}", seq=i)
+                            await asyncio.sleep(0)
+                await asyncio.gather(*(one(n) for n in range(3)))
+
+            threads = [threading.Thread(target=drive, args=(c,)) for c in "abc"]
+            for t in threads:
+                t.start()
+            asyncio.run(drives())
+            for t in threads:
+                t.join()
+            log("drive lost", level='error', device="/dev/sdz")
+            deadline = time.monotonic() + 2
+            while not any("drive lost" in Path(f).read_text() for f in log_files(path)):
+                assert time.monotonic() < deadline, "error record was not flushed at once"
+                time.sleep(0.01)
+        files = log_files(path)
+        assert len(files) > 2 and all(os.path.getsize(f) <= 20000 for f in files)
+        records = [json.loads(line) for f in files for line in Path(f).read_text().splitlines()]
+        assert len(records) == 601 and all(r['run'] == "r1" for r in records)
+        for device in ["/dev/sda", "/dev/sdb", "/dev/sdc", "/dev/nvme0n1", "/dev/nvme2n1"]:
+            seqs = [r['seq'] for r in records if r.get('device') == device]
+            assert seqs == list(range(100)), device  # complete and in order
+        sdb = list(query(path, device="sdb"))
+        assert len(sdb) == 100 and {(r['serial'], r['job'], r['phase']) for r in sdb} == {("SERb", "b", 'erase')}
+        assert len(list(query(path, serial="NV1"))) == 100
+        assert [r['msg'] for r in query(path, level='error')] == ["drive lost"]
+        assert logquery.main([path, "--device", "/dev/nvme1n1", "--phase", "wait"]) == 100
+    print("[OK] Event log: tagged JSON lines, bounded buffer, rotation, queries")
+
+
+def test_event_log_flushes_on_crash_and_tags_jobs():
+    """Buffered records survive an uncaught exception; scheduled jobs tag their own records"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "crash.jsonl")
+        script = (f"import sys; sys.path.insert(0, {str(Path(auto_sanitize.__file__).parents[2])!r})\n"
+                  f"from drive_tools import EventLog\n"
+                  f"log = EventLog({path!r}, interval=3600)\n"
+                  f"for i in range(500): log('record', seq=i)\n"
+                  f"raise RuntimeError('crash')")
+        proc = subprocess.run([sys.executable, "-c", script], stderr=subprocess.PIPE, text=True)
+        assert proc.returncode != 0 and "crash" in proc.stderr
+        assert [r['seq'] for r in query(path)] == list(range(500))
+
+        path = os.path.join(tmp, "jobs.jsonl")
+        saved = auto_sanitize._log
+        auto_sanitize._log = EventLog(path, interval=0.01)
+        try:
+            async def sanitizer(dev, timeout, estimate):
+                with tagged(phase='erase'):
+                    auto_sanitize.log(f"erasing {dev['name']}")
+                return True
+
+            jobs = [auto_sanitize.SanitizeJob(_dev(f"sd{c}"), 'hba0', 'pci0000:00', 1) for c in "abc"]
+            asyncio.run(_collect(jobs, sanitizer))
+        finally:
+            auto_sanitize._log.close()
+            auto_sanitize._log = saved
+        erase = [(r['job'], r['device'], r['serial']) for r in query(path, phase='erase')]
+        assert sorted(erase) == [(1, "/dev/sda", "sda"), (2, "/dev/sdb", "sdb"), (3, "/dev/sdc", "sdc")]
+        assert [r['phase'] for r in query(path, serial="sdb")] == ['start', 'erase']
+
+        # The log keeps the old plain-text log's path; lines left from it are skipped
+        path = os.path.join(tmp, "sanitization.log")
+        Path(path).write_text("[2024-01-01T00:00:00] Sanitizing ATA device: /dev/sda\n")
+        with EventLog(path) as log:
+            log("erasing", device="/dev/sda")
+        assert [r['msg'] for r in query(path, device="sda")] == ["erasing"]
+
+        # Serials that JSON escapes still pass the raw-line prefilter
+        path = os.path.join(tmp, "escaped.jsonl")
+        serials = ['WD "A"\\1', "Šérial-ü"]
+        with EventLog(path) as log:
+            for serial in serials:
+                log("erasing", serial=serial)
+        assert [[r['serial'] for r in query(path, serial=serial)] for serial in serials] == [[s] for s in serials]
+    print("[OK] Event log: flushed on crash, records tagged per job")
+
+
+def _fake_station(root):
+    """sysfs, udev database and mount table of a small wipe station"""
+    sysfs = Path(root) / "sys"
+    sata = "pci0000:00/0000:00:17.0/ata1/host0/target0:0:0/0:0:0:0"
+    serial = b"WD-WCC7K0000001"
+    _fake_drive(sysfs, "sda", sata, "8:0", parts=("sda1", "sda2"),
+                device={'model': "WDC WD40EFRX-68N32N0", 'vpd_pg80': bytes([0, 0x80, 0, len(serial)]) + serial})
+    for port, name in enumerate(("sdb", "sdc")):  # one SAS disk seen through both ports
+        _fake_drive(sysfs, name, f"pci0000:00/0000:03:00.0/host1/port-1:{port}/end_device-1:{port}/"
+                                 f"target1:0:{port}/1:0:{port}:0", f"8:{16 * (port + 1)}",
+                    device={'model': "ST4000NM0025", 'wwid': "naa.5000c500a1b2c3d4"})
+    _fake_drive(sysfs, "sdd", "pci0000:00/0000:00:14.0/usb1/1-2/1-2:1.0/host4/target4:0:0/4:0:0:0", "8:48",
+                device={'model': "Cruzer Blade"}, removable=1)
+    ctrl = _fake_drive(sysfs, "nvme0n1", "pci0000:00/0000:01:00.0/nvme/nvme0", "259:0", parts=("nvme0n1p1",),
+                       device={'model': "Samsung SSD 980 PRO 2TB", 'serial': "S6B0NL0T0000001"},
+                       wwid="eui.002538b011b1c2d3")
+    idle = Path(sysfs) / "devices/pci0000:00/0000:02:00.0/nvme/nvme1"
+    _write_attrs(idle, {'model': "INTEL SSDPE2KX040T8", 'serial': "PHLJ0000001"})
+    (sysfs / "class" / "nvme").mkdir(parents=True)
+    (sysfs / "class" / "nvme" / "nvme0").symlink_to(ctrl)
+    (sysfs / "class" / "nvme" / "nvme1").symlink_to(idle)
+    loop = sysfs / "devices" / "virtual" / "block" / "loop0"
+    _write_attrs(loop, {'dev': "7:0", 'size': 0})
+    os.symlink(loop, sysfs / "block" / "loop0")
+    udev = Path(root) / "udev"
+    _write_attrs(udev, {'b8:48': "S:disk/by-id/usb-SanDisk_Cruzer\nE:ID_BUS=usb\nE:ID_SERIAL_SHORT=4C530001\n"})
+    mounts = Path(root) / "mounts"
+    mounts.write_text("/dev/sda1 /boot ext4 rw 0 0\n/dev/nvme0n1p1 /mnt/my\\040data xfs rw 0 0\n")
+    return str(sysfs), str(udev), str(mounts)
+
+
+def test_discovery_reads_sysfs_and_dedupes():
+    with tempfile.TemporaryDirectory() as tmp:
+        sysfs, udev, mounts = _fake_station(tmp)
+        saved = os.environ.get('PATH', '')
+        os.environ['PATH'] = ''  # no lsblk, nvme or udevadm: discovery must not need them
+        try:
+            drives = {d.name: d for d in discover(sysfs, udev, mounts)}
+        finally:
+            os.environ['PATH'] = saved
+        assert sorted(drives) == ["loop0", "nvme0n1", "nvme1", "sda", "sdb", "sdd"]
+        sda = drives["sda"]
+        assert (sda.kind, sda.tran, sda.serial, sda.rotational) == ('disk', 'sata', "WD-WCC7K0000001", True)
+        assert [(p.path, p.mountpoint) for p in sda.partitions] == [("/dev/sda1", "/boot"), ("/dev/sda2", "")]
+        assert (drives["sdb"].tran, drives["sdb"].aliases) == ('sas', ("/dev/sdc",))
+        assert (drives["sdd"].tran, drives["sdd"].serial, drives["sdd"].removable) == ('usb', "4C530001", True)
+        nvme = drives["nvme0n1"]
+        assert (nvme.tran, nvme.serial, nvme.controller, nvme.rotational) == ('nvme', "S6B0NL0T0000001", "nvme0", False)
+        assert nvme.partitions[0].mountpoint == "/mnt/my data"
+        assert (drives["nvme1"].path, drives["nvme1"].serial, drives["nvme1"].size) == ("/dev/nvme1", "PHLJ0000001", 0)
+        assert drives["loop0"].kind == 'loop'
+        assert format_size(sda.size) == "3.6T" and format_size(sda.partitions[0].size) == "1000M"
+
+        devices = {d['name']: d['type'] for d in auto_sanitize.detect_devices(sysfs)}
+        assert devices == {"/dev/sda": 'ata', "/dev/sdb": 'unknown', "/dev/sdd": 'unknown',
+                           "/dev/nvme0n1": 'nvme', "/dev/nvme1": 'nvme'}
+    print("[OK] Discovery: sysfs attributes normalized, multipath disks listed once")
+
+
+def test_inventory_rescans_only_on_topology_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        sysfs, udev, mounts = _fake_station(tmp)
+        inventory = DriveInventory(sysfs, udev, mounts)
+        first = inventory.drives()
+        assert inventory.drives() == first and inventory.scans == 1
+
+        with open(mounts, 'a') as f:
+            f.write("/dev/sda2 /home ext4 rw 0 0\n")
+        home = [p for d in inventory.drives() if d.name == "sda" for p in d.partitions][1]
+        assert (home.mountpoint, inventory.scans) == ("/home", 2)
+
+        _fake_drive(sysfs, "sde", "pci0000:00/0000:00:17.0/ata5/host4/target4:0:0/4:0:0:0", "8:64",
+                    device={'model': "WDC WD40EFRX-68N32N0", 'wwid': "t10.ATA WD-WCC7K0000005"})
+        assert "sde" in [d.name for d in inventory.drives()] and inventory.scans == 3
+        inventory.drives()
+        assert inventory.scans == 3
+    print("[OK] Inventory: cached until drives, partitions or mounts change")
+
+
+if __name__ == '__main__':
+    print("Testing Auto-Sanitization Scheduler...\n")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"[ERROR] {test.__name__}: {e!r}")
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"[FAILED] {failed}/{len(tests)} test(s) failed.")
+        sys.exit(1)
+    print("[SUCCESS] All auto-sanitization tests passed!")
+    sys.exit(0)
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared secure wipe engine.
+Runs on plain temp files, so it works on both Windows and Linux.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from secure_wipe import (
+    IO_MODES, CryptoVault, FlashWiper, FreeSpaceWiper, BackgroundVerifier, FileEvent, Keystream, LogStream, OverwriteEngine, PassEvent,
+    ShardedOverwriter, SmallFileBatcher, TreeWalker, split_extents,
+    VaultError, Verifier, WipeJournal, WipeMetrics, WipeProgress, available_backends, make_policy, plan_wipe,
+    data_extents, make_schedule, overwrite_file, sample_size, wipe_files_parallel,
+)
+
+
+def _make_file(directory, name, size):
+    path = Path(directory) / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def test_overwrite_streams_in_chunks():
+    """A file larger than the chunk buffer is fully overwritten, size unchanged"""
+    with tempfile.TemporaryDirectory() as tmp:
+        size = 3 * 65536 + 123  # several chunks plus an unaligned tail
+        path = _make_file(tmp, "large.bin", size)
+        with OverwriteEngine(chunk_size=65536) as engine:
+            written = engine.overwrite(path, passes=2)
+        assert written == size
+        assert path.stat().st_size == size
+        assert path.read_bytes() == b"\xff" * size
+    print("[OK] Overwrite engine: chunked passes cover the whole file")
+
+
+def test_engine_is_reusable():
+    """One engine instance can wipe many files with its single buffer"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_make_file(tmp, f"f{i}.bin", 1000 * i) for i in range(4)]
+        with OverwriteEngine(chunk_size=4096) as engine:
+            for path in paths:
+                engine.overwrite(path, passes=1)
+        for path in paths:
+            assert path.read_bytes() == b"\x00" * path.stat().st_size
+    print("[OK] Overwrite engine: buffer reused across files")
+
+
+def test_random_pass_changes_content():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _make_file(tmp, "secret.txt", 10000)
+        original = path.read_bytes()
+        overwrite_file(path, passes=3)
+        data = path.read_bytes()
+        assert len(data) == len(original)
+        assert data != original
+        assert data != b"\xff" * len(data)
+    print("[OK] Overwrite engine: random pass replaces content")
+
+
+def test_io_modes_handle_unaligned_tail():
+    """Direct and nocache modes write the unaligned tail and count avoided cache"""
+    for mode in IO_MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            size = 2 * 65536 + 1234
+            path = _make_file(tmp, "tail.bin", size)
+            with OverwriteEngine(chunk_size=65536, io_mode=mode) as engine:
+                engine.overwrite(path, passes=2)
+                if engine.effective_io_mode == 'buffered':
+                    assert engine.cache_avoided == 0
+                else:
+                    assert engine.cache_avoided == 2 * size, mode
+            assert path.read_bytes() == b"\xff" * size, mode
+    print("[OK] I/O modes: buffered, direct and nocache produce identical results")
+
+
+def test_durability_policies():
+    """Sync counts follow the policy; group commit unlinks only after syncfs"""
+    for name, expected_syncs in [('pass', 3 * 5), ('file', 5), ('group', 2)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [_make_file(tmp, f"f{i}.bin", 4096) for i in range(5)]
+            policy = make_policy(name, sync_dirs=False, **({'group_files': 3} if name == 'group' else {}))
+            with OverwriteEngine(durability=policy) as engine:
+                for i, path in enumerate(paths):
+                    engine.overwrite(path, passes=3)
+                    engine.unlink(path)
+                    if name == 'group' and i < 2:
+                        assert path.exists()  # still waiting for the group commit
+            assert not any(p.exists() for p in paths)
+            assert policy.sync_calls == expected_syncs, (name, policy.sync_calls)
+    print("[OK] Durability: pass/file/group sync counts and deferred unlinks")
+
+
+def test_small_file_batches_share_syncs():
+    """Small files are wiped in batches with one sync per pass, then unlinked"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_make_file(tmp, f"f{i}.txt", 10 * i) for i in range(10)]
+        missing = Path(tmp) / "missing.txt"
+        policy = make_policy('pass', sync_dirs=False)
+        with OverwriteEngine(durability=policy) as engine, \
+                SmallFileBatcher(engine, passes=3, batch_files=6, verify='full') as batcher:
+            assert batcher.accepts(4096) and not batcher.accepts(10 ** 6)
+            results = []
+            for path in paths[:5] + [missing] + paths[5:]:
+                results += batcher.add(path, 0)
+            assert len(results) == 6 and all(p.exists() for p in paths[5:])
+            results += batcher.flush()
+        assert batcher.batches == 2
+        assert [r.path for r in results if not r.ok] == [missing]
+        assert all(r.verify.ok for r in results if r.ok)
+        assert not any(p.exists() for p in paths)
+        if os.name != 'nt':  # one syncfs per pass and batch instead of one fdatasync per file
+            assert policy.sync_calls == 2 * 3, policy.sync_calls
+    print("[OK] Small-file batches: shared pattern buffer and amortized syncs")
+
+
+def test_journal_resumes_interrupted_pass():
+    """A wipe killed mid-pass resumes from its last checkpoint with the same seed"""
+
+    class Crash(Exception):
+        pass
+
+    class CrashingJournal(WipeJournal):
+        def checkpoint(self, path, index, offset):
+            super().checkpoint(path, index, offset)
+            if index == 2 and offset == 3 * 65536:
+                self.flush()
+                raise Crash()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "target"
+        root.mkdir()
+        size = 8 * 65536
+        path = _make_file(root, "big.bin", size)
+        journal = CrashingJournal(root, passes=3, checkpoint_bytes=65536)
+        try:
+            with OverwriteEngine(chunk_size=65536, journal=journal) as engine:
+                engine.overwrite(path, passes=3)
+        except Crash:
+            pass
+        journal.close()  # the process "dies" here, journal left behind
+
+        journal = WipeJournal(root, passes=3, checkpoint_bytes=65536)
+        assert journal.resumed and journal.resume_point(path) == (2, 3 * 65536)
+        started = []
+        with OverwriteEngine(chunk_size=65536, journal=journal) as engine:
+            engine.overwrite(path, passes=3, on_pass_start=lambda index, pattern: started.append(index))
+            assert started == [2] and engine.bytes_written == size - 3 * 65536
+            final = engine.final_pattern
+        assert journal.is_done(path)
+        verifier = Verifier('full', chunk_size=65536)
+        assert verifier.verify(path, size, final).ok  # both halves use the recorded seed
+        verifier.close()
+        journal.close(remove=True)
+        assert not Path(journal.path).exists()
+    print("[OK] Journal: interrupted pass resumed from its checkpoint")
+
+
+def test_metrics_events_and_summary():
+    """Every pass and file is reported; the summary breaks time down by phase"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_make_file(tmp, f"f{i}.bin", 200000) for i in range(3)]
+        metrics = WipeMetrics()
+        events = []
+        metrics.subscribe(events.append)
+        policy = make_policy('file', sync_dirs=False)
+        with OverwriteEngine(chunk_size=65536, durability=policy, metrics=metrics) as engine:
+            for path in paths:
+                engine.overwrite(path, passes=3)
+                engine.unlink(path)
+        passes = [e for e in events if isinstance(e, PassEvent)]
+        files = [e for e in events if isinstance(e, FileEvent)]
+        assert len(passes) == 9 and len(files) == 3
+        assert all(e.bytes == 200000 for e in passes) and [e.index for e in passes[:3]] == [0, 1, 2]
+        summary = json.loads(metrics.to_json(policy))
+        assert summary['bytes_written'] == 3 * 3 * 200000 and summary['files'] == 3
+        assert set(summary['phases']) == {'rng', 'write', 'sync', 'unlink'}
+        assert summary['phases']['write']['seconds'] > 0 and summary['sync_calls'] == 3
+        assert summary['pass_latency']['count'] == 9
+        assert summary['pass_latency']['p50'] <= summary['pass_latency']['max']
+    print("[OK] Metrics: typed pass/file events and JSON phase breakdown")
+
+
+def test_keystream_is_seekable():
+    """Any sub-range of the keystream can be regenerated from the seed alone"""
+    for backend in available_backends():
+        keystream = Keystream(seed=b"s" * 32, backend=backend)
+        if not keystream.reproducible:
+            continue
+        full = keystream.generate(0, 200000)
+        assert Keystream(seed=b"s" * 32, backend=backend).generate(0, 200000) == full
+        for offset, length in [(0, 1), (7, 33), (4096, 65536), (65530, 100), (131071, 68929)]:
+            assert keystream.generate(offset, length) == full[offset:offset + length], backend
+        assert Keystream(seed=b"t" * 32, backend=backend).generate(0, 64) != full[:64]
+    print("[OK] Keystream: reproducible and seekable for", ", ".join(available_backends()))
+
+def _make_sparse(directory, name, size, regions):
+    """Sparse file of `size` bytes with random data only in the (offset, length) regions"""
+    path = Path(directory) / name
+    with open(path, 'wb') as f:
+        for offset, length in regions:
+            f.seek(offset)
+            f.write(os.urandom(length))
+        f.truncate(size)
+    return path
+
+
+def test_sparse_files_keep_their_holes():
+    """Only allocated extents are overwritten; holes stay unallocated zeros"""
+    with tempfile.TemporaryDirectory() as tmp:
+        regions = [(0, 65536), (4 * 1024 * 1024, 65536 + 100)]
+        size = 16 * 1024 * 1024
+        path = _make_sparse(tmp, "disk.img", size, regions)
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            extents = data_extents(fd, size)
+        finally:
+            os.close(fd)
+        if extents == [(0, size)]:
+            print("[SKIP] Sparse files: filesystem does not report holes")
+            return
+        blocks = path.stat().st_blocks if hasattr(os.stat_result, 'st_blocks') else None
+        for mode in IO_MODES:
+            with OverwriteEngine(chunk_size=65536, io_mode=mode) as engine:
+                engine.overwrite(path, passes=2)
+                assert engine.allocated == sum(length for _, length in extents), mode
+                assert engine.bytes_written == 2 * engine.allocated, mode
+                final = engine.final_pattern
+            data = path.read_bytes()
+            assert len(data) == size
+            for offset, length in regions:
+                assert data[offset:offset + length] == b"\xff" * length, mode
+            assert data[65536:4 * 1024 * 1024].count(0) == 4 * 1024 * 1024 - 65536, mode
+            if blocks is not None:
+                assert path.stat().st_blocks == blocks, mode  # no holes filled in
+        for mode in ('full', 'sample'):
+            verifier = Verifier(mode, chunk_size=65536)
+            assert verifier.verify(path, size, final).ok, mode
+            verifier.close()
+    print("[OK] Sparse files: holes skipped, allocation unchanged")
+
+
+def test_read_back_verification():
+    """Full and sampled read-back accept a clean wipe and catch a skipped one"""
+    assert sample_size(0.99, 0.01) == 459
+    with tempfile.TemporaryDirectory() as tmp:
+        size = 5 * 65536 + 777
+        path = _make_file(tmp, "verify.bin", size)
+        with OverwriteEngine(chunk_size=65536) as engine:
+            engine.overwrite(path, passes=3)
+            final = engine.final_pattern
+        for mode in ('full', 'sample'):
+            verifier = Verifier(mode, chunk_size=65536)
+            result = verifier.verify(path, size, final)
+            assert result.ok and result.mismatches == 0, (mode, result)
+            assert result.checked == size if mode == 'full' else result.checked > 0
+            verifier.close()
+        # A file the wipe never touched fails both modes
+        path.write_bytes(os.urandom(size))
+        for mode in ('full', 'sample'):
+            with BackgroundVerifier(mode, chunk_size=65536) as verifier:
+                results = verifier.submit(path, size, final) + verifier.finish()
+            assert len(results) == 1 and not results[0].ok, mode
+    print("[OK] Verification: full and sampled read-back of the final pass")
+
+
+def test_read_back_errors_fail_only_that_file():
+    """O_DIRECT reads rejected with EINVAL fall back to buffered; unreadable files fail verification"""
+    from secure_wipe import verify as verify_module
+    with tempfile.TemporaryDirectory() as tmp:
+        size = 3 * 65536
+        path = _make_file(tmp, "readback.bin", size)
+        with OverwriteEngine(chunk_size=65536) as engine:
+            engine.overwrite(path, passes=1)
+            final = engine.final_pattern
+        if hasattr(os, 'O_DIRECT'):
+            import errno
+            import fcntl
+            real_pread = verify_module._pread
+
+            def pread(fd, view, offset):
+                if fcntl.fcntl(fd, fcntl.F_GETFL) & os.O_DIRECT:
+                    raise OSError(errno.EINVAL, "Invalid argument")
+                return real_pread(fd, view, offset)
+
+            verify_module._pread = pread
+            verifier = Verifier('full', chunk_size=65536)
+            try:
+                result = verifier.verify(path, size, final)
+            finally:
+                verify_module._pread = real_pread
+                verifier.close()
+            assert result.ok and result.source == 'buffered' and result.checked == size, result
+        os.unlink(path)
+        with BackgroundVerifier('full', chunk_size=65536) as verifier:
+            results = verifier.submit(path, size, final) + verifier.finish()
+        assert len(results) == 1 and not results[0].ok, results
+        assert results[0].detail.startswith("read-back failed"), results[0]
+    print("[OK] Verification: read errors reported per file")
+
+
+def test_parallel_wipe_reports_every_file():
+    """Parallel mode wipes and unlinks every file, streaming results back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_make_file(tmp, f"f{i}.bin", 5000 + i) for i in range(20)]
+        missing = Path(tmp) / "missing.bin"
+        results = list(wipe_files_parallel(iter(paths + [missing]), passes=2, workers_per_device=3))
+        assert len(results) == 21
+        assert sorted(r.path for r in results if r.ok) == sorted(paths)
+        assert [r.path for r in results if not r.ok] == [missing]
+        assert not any(p.exists() for p in paths)
+    print("[OK] Parallel wiper: all files wiped, failures isolated")
+
+
+def test_tree_walker_recurses_and_dedups_hardlinks():
+    """Nested files are streamed, hardlinks wiped once, symlinks never followed"""
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as outside:
+        root = Path(tmp) / "target"
+        (root / "a" / "b").mkdir(parents=True)
+        files = [_make_file(root, "top.bin", 100), _make_file(root / "a", "mid.bin", 200),
+                 _make_file(root / "a" / "b", "deep.bin", 300)]
+        keep = _make_file(outside, "keep.bin", 50)
+        keep_data = keep.read_bytes()
+        if hasattr(os, 'link') and hasattr(os, 'symlink'):
+            os.link(files[2], root / "a" / "hardlink.bin")
+            os.symlink(keep, root / "a" / "b" / "outside_link")
+        walker = TreeWalker(root)
+        wiped = [Path(entry.path) for entry in walker]
+        # Exactly one name per inode, whichever link the walk reached first
+        assert sorted(p.stat().st_ino for p in wiped) == sorted(p.stat().st_ino for p in files)
+        results = list(wipe_files_parallel(wiped, passes=1, verify='full'))
+        assert all(r.ok and r.verify.ok for r in results)
+        walker.remove_leftovers()
+        assert not root.exists()
+        assert keep.read_bytes() == keep_data
+
+        # Wiping while walking empties each folder as the walk leaves it
+        (root / "a" / "b").mkdir(parents=True)
+        for path in (_make_file(root, "top.bin", 100), _make_file(root / "a" / "b", "deep.bin", 300)):
+            if hasattr(os, 'link'):
+                os.link(path, path.with_suffix(".link"))
+        walker = TreeWalker(root)
+        for entry in walker:
+            if Path(entry.path).parent != root:  # a failed wipe at the top: the file stays
+                overwrite_file(entry.path, passes=1)
+                os.unlink(entry.path)
+        assert walker.removed == 2 and not (root / "a").exists()
+        assert walker.remove_leftovers() == 2 and (root / "top.bin").exists()
+        # The other name of the unwiped inode is kept too, with a note
+        if hasattr(os, 'link'):
+            assert sorted(os.listdir(root)) == ["top.bin", "top.link"] and len(walker.errors) == 1
+    print("[OK] Tree walker: recursive, hardlink-aware, bottom-up removal")
+
+def test_log_stream_bounds_memory_not_the_file():
+    """Every line reaches the log file; only the newest max_pending wait for the reader"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "wipe.log"
+        with LogStream(path, max_pending=100) as log:
+            log("header\nsecond")
+            for i in range(1000):
+                log(f"line {i}")
+            lines, dropped = log.drain()
+            assert len(lines) == 100 and lines[-1] == "line 999"
+            assert dropped == 902
+            assert log.drain() == ([], 0)
+            log("tail")
+            assert log.drain() == (["tail"], 0)
+        written = path.read_text(encoding='utf-8').splitlines()
+        assert written[:2] == ["header", "second"] and len(written) == 1003 and log.lines == 1003
+    print("[OK] LogStream: file gets every line, pending queue stays bounded")
+
+
+def test_plan_counts_allocated_bytes_and_estimates_time():
+    """The planner sees every file once, counts holes as unallocated and predicts a duration"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "target"
+        (root / "a" / "b").mkdir(parents=True)
+        for i in range(20):
+            _make_file(root / "a", f"small{i}.bin", 1000)
+        big = _make_file(root / "a" / "b", "big.bin", 2 * 1024 * 1024)
+        sparse = _make_sparse(root, "sparse.img", 32 * 1024 * 1024, [(0, 65536)])
+        if hasattr(os, 'link'):
+            os.link(big, root / "big-link.bin")
+        plan = plan_wipe(root, passes=2, workers=4)
+        assert plan.files == 22 and plan.directories == 3 and not plan.errors
+        assert plan.unlink_only == (1 if hasattr(os, 'link') else 0)
+        assert plan.logical_bytes == 20 * 1000 + 2 * 1024 * 1024 + 32 * 1024 * 1024
+        if getattr(sparse.stat(), 'st_blocks', None) is not None and sparse.stat().st_blocks * 512 < 32 * 1024 * 1024:
+            assert plan.allocated_bytes < plan.logical_bytes - 16 * 1024 * 1024
+        assert plan.small_files == 20
+        assert {label: count for label, count, _ in plan.size_classes if count} == \
+            {'<= 4 KiB': 20, '<= 64 MiB': 2}
+        assert plan.estimate_seconds is None
+        before = sorted(os.listdir(tmp))
+        plan.calibrate(sample_bytes=1024 * 1024, small_files=8)
+        assert plan.write_rate > 0 and plan.small_file_seconds > 0 and plan.estimate_seconds > 0
+        assert sorted(os.listdir(tmp)) == before  # scratch files went next to the tree and are gone
+        assert sorted(os.listdir(root)) == sorted(["a", "sparse.img"] + (["big-link.bin"] if hasattr(os, 'link') else []))
+        metrics = WipeMetrics()
+        progress = WipeProgress(plan, metrics)
+        assert progress.fraction == 0 and progress.eta_seconds is not None
+        metrics.pass_done(str(big), 0, 'zeros', plan.total_bytes // 2, 0.1, 0.0, 0.1)
+        assert progress.fraction == 0.5 and "50%" in progress.describe()
+        metrics.pass_done(str(big), 1, 'ones', plan.total_bytes, 0.1, 0.0, 0.1)
+        assert progress.fraction == 1.0 and progress.eta_seconds == 0.0
+    print("[OK] Planner: parallel scan, allocated bytes, calibrated estimate, progress")
+
+
+def test_free_space_wipe_fills_up_to_the_reserve():
+    """Fill files claim the free space beyond the reserve, are fully written, then removed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Preallocated extents read as holes; fill() must write them anyway
+        with OverwriteEngine() as engine:
+            fd = os.open(Path(tmp) / "prealloc.bin", os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+            try:
+                os.ftruncate(fd, 3 * 65536)
+                if hasattr(os, 'posix_fallocate'):
+                    os.posix_fallocate(fd, 0, 3 * 65536)
+                engine.fill(fd, 3 * 65536, passes=2)
+            finally:
+                os.close(fd)
+        assert (Path(tmp) / "prealloc.bin").read_bytes() == b"\xff" * (3 * 65536)
+        free = shutil.disk_usage(tmp).free
+        metrics = WipeMetrics()
+        wiper = FreeSpaceWiper(tmp, passes=1, reserve=free - 8 * 1024 * 1024, fill_bytes=2 * 1024 * 1024,
+                               metrics=metrics)
+        fills = list(wiper.wipe())
+        # Other processes share the filesystem, so allow some slack
+        assert 4 * 1024 * 1024 <= wiper.filled <= 10 * 1024 * 1024 and wiper.stopped is None
+        assert len(fills) == wiper.files and all(fill.size <= 2 * 1024 * 1024 for fill in fills)
+        assert metrics.bytes_written == wiper.filled and metrics.files == wiper.files
+        assert wiper.durability.sync_calls == wiper.files  # one sync per fill file, from the policy
+        assert sorted(os.listdir(tmp)) == ["prealloc.bin"]
+    print("[OK] Free-space wipe: preallocated fill files written up to the reserve and removed")
+
+
+def test_pass_schedules_share_one_write_loop():
+    """Built-in and custom schedules run through the engine; multi-byte patterns stay in phase"""
+    assert [len(make_schedule(name)) for name in ('standard', 'nist-clear', 'random', 'dod', 'dod-ece')] == [3, 1, 3, 3, 7]
+    assert len(make_schedule('standard', 5)) == 5 and make_schedule('standard').key == "00,FF,random"
+    for bad in [('dod', 4, None), ('custom', None, None), ('custom', None, "55,zz"), ('gutmann', None, None)]:
+        try:
+            make_schedule(*bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} accepted")
+    with tempfile.TemporaryDirectory() as tmp:
+        size = 3 * 1024 * 1024 + 123
+        # 3-byte period: refilled per chunk so every chunk continues the pattern
+        schedule = make_schedule('custom', custom="55, 0xAA, random, 924924")
+        assert [p.refill for p in schedule.patterns()] == [False, False, True, True]
+        path = _make_sparse(tmp, "mixed.img", size, [(0, 70000), (2 * 1024 * 1024 + 4096, 500000)])
+        with OverwriteEngine(chunk_size=64 * 1024, schedule=schedule) as engine:
+            engine.overwrite(path, len(schedule))
+            try:
+                engine.overwrite(path, 3)
+                raise AssertionError("pass count mismatch accepted")
+            except ValueError:
+                pass
+        data = path.read_bytes()
+        with open(path, 'rb') as f:
+            extents = data_extents(f.fileno(), size)
+        expected = b"\x92\x49\x24" * (size // 3 + 1)
+        for offset, length in extents:
+            assert data[offset:offset + length] == expected[offset:offset + length]
+        # A journal refuses to resume with a different schedule
+        root = Path(tmp) / "target"
+        root.mkdir()
+        WipeJournal(root, 3, schedule=make_schedule('random')).close()
+        try:
+            WipeJournal(root, 3)
+            raise AssertionError("schedule mismatch accepted")
+        except ValueError:
+            pass
+    print("[OK] Pass schedules: built-in, custom and multi-byte patterns through one write loop")
+
+
+def test_pipelined_random_passes_match_the_keystream():
+    """Producer/consumer passes write exactly the seeded keystream and surface producer errors"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _make_file(tmp, "big.bin", 3 * 1024 * 1024 + 777)
+        schedule = make_schedule('random', 2)
+        with OverwriteEngine(chunk_size=64 * 1024, schedule=schedule, pipeline=True) as engine:
+            size = engine.overwrite(path, 2)
+            assert Verifier('full').verify(path, size, engine.final_pattern).ok
+            assert len(engine._pool) == engine.pipeline_depth - 1
+
+            class Broken:
+                refill = True
+
+                def fill(self, view, offset):
+                    if offset >= 1024 * 1024:
+                        raise RuntimeError("rng failure")
+                    view[:] = bytes(len(view))
+
+            fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+            try:
+                engine.write_pass(fd, size, Broken())
+                raise AssertionError("producer error swallowed")
+            except RuntimeError:
+                pass
+            finally:
+                os.close(fd)
+        assert not any(t.name == 'wipe-rng' and t.is_alive() for t in threading.enumerate())
+    print("[OK] Pipeline: overlapped random passes are exact; producer errors propagate")
+
+
+def test_sharded_overwrite_keeps_passes_in_order():
+    """Range workers split one file; each pass is complete and synced before the next"""
+    with tempfile.TemporaryDirectory() as tmp:
+        extents = [(0, 300000), (1048576, 70000)]
+        shards = split_extents(extents, 3, 65536)
+        assert len(shards) == 3
+        covered = sorted(piece for shard in shards for piece in shard)
+        assert sum(length for _, length in covered) == 370000
+        assert all(offset % 65536 == 0 for shard in shards[1:] for offset, _ in shard[:1])
+
+        size = 5 * 65536 + 321
+        path = _make_file(tmp, "huge.bin", size)
+        seen = []
+
+        class Barrier(type(make_policy('pass'))):
+            def after_pass(self, fd):
+                # Every shard has finished when the pass is synced
+                with open(path, 'rb') as f:
+                    seen.append(set(f.read()))
+                super().after_pass(fd)
+
+        metrics = WipeMetrics()
+        events = []
+        metrics.subscribe(events.append)
+        schedule = make_schedule('custom', custom='55,AA,random')
+        with ShardedOverwriter(4, 0, chunk_size=65536, durability=Barrier(), metrics=metrics,
+                               schedule=schedule) as sharder:
+            assert sharder.accepts(size)
+            written = sharder.overwrite(path, 3)
+            assert written == size and sharder.bytes_written == 3 * size
+            assert Verifier('full').verify(path, size, sharder.final_pattern).ok
+        assert seen[:2] == [{0x55}, {0xAA}] and len(seen[2]) > 2
+        assert [type(e).__name__ for e in events] == ['PassEvent'] * 3 + ['FileEvent']
+        assert all(e.bytes == size for e in events[:3])
+    print("[OK] Sharding: range workers keep pass order and report one file")
+
+
+
+def test_vault_shreds_by_destroying_keys():
+    """Vault files round-trip in chunks, reject tampering and die with their key"""
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src"
+        (src / "sub").mkdir(parents=True)
+        data = {"a.bin": os.urandom(3 * 4096 + 7), "sub/b.bin": os.urandom(4096), "sub/empty": b""}
+        for name, content in data.items():
+            (src / name).write_bytes(content)
+        vault = CryptoVault.create(Path(tmp) / "vault", chunk_size=4096)
+        assert vault.store_tree(src) == (3, sum(map(len, data.values())))
+        vault = CryptoVault(Path(tmp) / "vault")
+        for name, content in data.items():
+            assert b"".join(vault.read(name)) == content
+            assert not content or content not in vault.path(name).read_bytes()
+        # Dropping the last chunk must not go unnoticed
+        path = vault.path("a.bin")
+        path.write_bytes(path.read_bytes()[:-(7 + 16)])
+        try:
+            list(vault.read("a.bin"))
+            assert False, "truncation not detected"
+        except VaultError:
+            pass
+        keys = len(list(vault.keys_dir.iterdir()))
+        result = vault.shred("sub/b.bin")
+        assert result.keys == 1 and not vault.path("sub/b.bin").exists()
+        assert len(list(vault.keys_dir.iterdir())) == keys - 1
+        assert vault.names() == ["a.bin", "sub/empty"]
+        # Replacing a file destroys the key of the old version
+        vault.store(src / "sub" / "b.bin", "a.bin")
+        assert len(list(vault.keys_dir.iterdir())) == keys - 1
+        assert b"".join(vault.read("a.bin")) == data["sub/b.bin"]
+        assert vault.destroy().files == 2
+        assert not (Path(tmp) / "vault").exists()
+
+        # Directory scope: one random key per directory, never reused after a shred
+        vault = CryptoVault.create(Path(tmp) / "dirvault", key_scope='directory', chunk_size=4096)
+        vault.store_tree(src, "box")
+        first = {vault._key_id_of(vault.path(name)) for name in ("box/sub/b.bin", "box/sub/empty")}
+        assert len(first) == 1 and len(list(vault.keys_dir.iterdir())) == 2
+        assert vault.shred_dir("box").keys == 2 and not list(vault.keys_dir.iterdir())
+        vault.store(src / "sub" / "b.bin", "box/sub/b.bin")
+        assert vault._key_id_of(vault.path("box/sub/b.bin")) not in first
+        assert b"".join(vault.read("box/sub/b.bin")) == data["sub/b.bin"]
+    print("[OK] Vault: streaming encryption, tamper checks and key-destroying shred")
+
+
+def test_flash_wiper_reports_strategy_per_file():
+    """Flash files are deallocated and read back as zeros; spinning or non-discarding disks are overwritten"""
+    import secure_wipe.flash as flash_module
+    real_profile = flash_module.device_profile
+    with tempfile.TemporaryDirectory() as tmp:
+        size = 3 * 4096 + 10
+        try:
+            for profile, mode, accepts in (((None, False), 'always', True), ((True, True), 'always', False),
+                                           ((False, False), 'always', False), ((False, True), 'off', False)):
+                flash_module.device_profile = lambda st_dev, profile=profile: profile
+                path = _make_file(tmp, f"{mode}.bin", size)
+                metrics = WipeMetrics()
+                with OverwriteEngine(chunk_size=65536, metrics=metrics) as engine, \
+                        FlashWiper(engine, 2, mode, verify='full') as flash:
+                    assert flash.accepts(path, path.stat().st_dev) == accepts
+                    result = flash.wipe(path)
+                    assert not path.exists() and result.size == size and result.verify.ok
+                    assert flash.counts[result.strategy] == 1 and metrics.files == 1
+                    if result.strategy == 'overwrite':
+                        assert result.reason and engine.bytes_written == 2 * size
+                    else:
+                        assert accepts and engine.bytes_written == 0 and metrics.bytes_written >= size
+                    assert accepts or result.reason in ("rotational device", "device does not accept discards",
+                                                        "flash mode off")
+                    assert all(trim.mount for trim in flash.finish())
+        finally:
+            flash_module.device_profile = real_profile
+    print("[OK] Flash: deallocate on flash, overwrite elsewhere, strategy reported")
+
+if __name__ == '__main__':
+    print("Testing Secure Wipe Engine...\n")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"[ERROR] {test.__name__}: {e!r}")
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"[FAILED] {failed}/{len(tests)} test(s) failed.")
+        sys.exit(1)
+    print("[SUCCESS] All secure wipe tests passed!")
+    sys.exit(0)